@@ -1,4 +1,4 @@
-import ast
+import json
 import os
 import subprocess
 import sys
@@ -12,11 +12,10 @@ def test_cyclic_region(monkeypatch):
     expected_nodes_in_cycle = ['cyclic-stack-b', 'cyclic-stack-a']
 
     monkeypatch.setenv('AWS_DEFAULT_REGION', region)
-    expected_prefix = 'cycle found between nodes: '
     env = os.environ.copy()
 
     result = subprocess.run(
-        [sys.executable, '-m', 'cycl', 'check'],
+        [sys.executable, '-m', 'cycl', 'check', '--format', 'ndjson'],
         capture_output=True,
         text=True,
         env=env,
@@ -24,11 +23,11 @@ def test_cyclic_region(monkeypatch):
     )
 
     assert result.returncode == expected_return_code, f'Non-zero exit: {result.returncode}\nStderr: {result.stderr}'
-    assert result.stdout.startswith(expected_prefix), result.stdout
 
-    node_str = result.stdout[len(expected_prefix) :].strip()
-    node_list = ast.literal_eval(node_str)
-    assert is_circular_reversible_permutation(expected_nodes_in_cycle, node_list), f'Return: {result.stdout}'
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    cycles = [record['nodes'] for record in records if record['type'] == 'cycle']
+    assert len(cycles) == 1, result.stdout
+    assert is_circular_reversible_permutation(expected_nodes_in_cycle, cycles[0]), f'Return: {result.stdout}'
 
 
 def test_acyclic_region(monkeypatch):
@@ -1,6 +1,10 @@
 from importlib.metadata import PackageNotFoundError, version
 
 from .cycl import build_graph, get_graph_data
+from .utils.critical_path import critical_path
+from .utils.cuts import suggest_cuts
+from .utils.diff import diff_graphs
+from .utils.variants import Variant, check_variants
 
 try:
     __version__ = version('cycl')
@@ -3,12 +3,30 @@ import json
 import logging
 import pathlib
 import sys
+import time
 from logging import getLogger
+from typing import TYPE_CHECKING, Any, cast
 
 import networkx as nx
 
-from cycl import build_graph
+from cycl import build_graph, diff_graphs, get_graph_data, suggest_cuts
+from cycl.cycl import COLLECTORS
+from cycl.models import StackCache
+from cycl.utils.backends import BACKENDS, available_backends, get_backend, is_acyclic, topological_generations
+from cycl.utils.cdk import get_stack_templates
+from cycl.utils.cfn import get_cfn_client
+from cycl.utils.critical_path import critical_path, get_deploy_durations, load_durations
+from cycl.utils.cycles import iter_cycles
+from cycl.utils.graph import SELFLOOP_POLICIES, edge_weights
+from cycl.utils.local_cfn import DEFAULT_PAGE_SIZE, LocalCloudFormationClient, LocalCloudFormationServer
 from cycl.utils.log_config import configure_log
+from cycl.utils.metrics import METRICS, MetricsStore, graph_account, graph_metrics
+from cycl.utils.output import OUTPUT_FORMATS, OutputWriter, get_writer
+from cycl.utils.snapshot import load_snapshot, save_snapshot
+from cycl.utils.watch import IncrementalCycleChecker, iter_template_changes
+
+if TYPE_CHECKING:
+    from mypy_boto3_cloudformation import CloudFormationClient
 
 log = getLogger(__name__)
 
@@ -32,28 +50,225 @@ log = getLogger(__name__)
 #     return node_key_map.get(node_key, lambda x: x.stack_name)
 
 
+def __positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        err_msg = f'must be a positive integer: {value}'
+        raise argparse.ArgumentTypeError(err_msg)
+    return number
+
+
+def __add_crawl_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        '--low-memory',
+        action='store_true',
+        help=(
+            'Collect exports and imports a page at a time into compact, interned tables instead of holding an '
+            'object per import, for very large accounts. Only supported by the ``exports`` collector.'
+        ),
+    )
+    p.add_argument(
+        '--focus',
+        nargs='+',
+        metavar='STACK',
+        help=(
+            'Only crawl the deployed stacks reached from these stacks by following imports, which is enough to '
+            'find every cycle through them at a fraction of the API calls. Only supported by the ``exports`` '
+            'collector.'
+        ),
+    )
+    p.add_argument(
+        '--radius',
+        type=__positive_int,
+        help=(
+            'The most imports followed from a ``--focus`` stack, every cycle through it of at most radius + 1 '
+            'stacks is found. By default, stacks are crawled until no new stack is reached.'
+        ),
+    )
+
+
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog='cycl', description='Check circular dependencies between imports and exports.')
     sp = parser.add_subparsers(dest='cmd', required=True)
 
     check_p = sp.add_parser('check', help='Check for cycles between AWS stack imports and exports.')
     check_p.add_argument('--exit-zero', action='store_true', help='Exit zero regardless of cyclic check result.')
+    check_p.add_argument(
+        '--suggest-cuts',
+        action='store_true',
+        help='Suggest a small set of edges, weighted by their number of imports, to remove to break every cycle.',
+    )
+    check_p.add_argument(
+        '--show-exports',
+        action='store_true',
+        help='Show the exports on each edge of a cycle, ex. ``A -[vpc-id]-> B -[subnet-id]-> A``.',
+    )
+    check_p.add_argument(
+        '--max-cycle-length',
+        type=__positive_int,
+        help='Only report cycles through at most this many stacks, which is much faster on large, dense graphs.',
+    )
+    check_p.add_argument(
+        '--watch',
+        action='store_true',
+        help=(
+            'Check again each time ``--cdk-out`` is re-synthesized. Deployed exports are collected once, only changed '
+            'templates are parsed again and only the cycles of affected stacks are searched again.'
+        ),
+    )
 
     topo_p = sp.add_parser('topo', help='Find topological generations, if dependencies are acyclic')
 
+    snapshot_p = sp.add_parser('snapshot', help='Save graph data to, or load it from, a snapshot file.')
+    snapshot_sp = snapshot_p.add_subparsers(dest='snapshot_cmd', required=True)
+    snapshot_save_p = snapshot_sp.add_parser('save', help='Collect graph data and save it to a snapshot file.')
+    snapshot_save_p.add_argument('path', type=pathlib.Path, help='Path the snapshot is written to.')
+    snapshot_save_p.add_argument(
+        '--compress',
+        action='store_true',
+        help='Compress the snapshot. Compressed snapshots are smaller but can not be memory-mapped when loaded.',
+    )
+    snapshot_load_p = snapshot_sp.add_parser('load', help='Load a snapshot file and print its graph data as JSON.')
+    snapshot_load_p.add_argument('path', type=pathlib.Path, help='Path to a snapshot file.')
+
+    diff_p = sp.add_parser('diff', help='Compare the dependency graphs of two snapshot files.')
+    diff_p.add_argument('old', type=pathlib.Path, help='Path to the earlier snapshot file.')
+    diff_p.add_argument('new', type=pathlib.Path, help='Path to the later snapshot file.')
+    diff_p.add_argument('--exit-code', action='store_true', help='Exit with 1 if there are differences, 0 otherwise.')
+
+    serve_p = sp.add_parser('serve', help='Serve graph data over a local CloudFormation compatible endpoint.')
+    serve_p.add_argument('--host', default='127.0.0.1', help='Address the endpoint listens on.')
+    serve_p.add_argument('--port', type=int, default=8080, help='Port the endpoint listens on, 0 picks a free port.')
+    serve_p.add_argument(
+        '--page-size',
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help='Number of exports, or importing stacks, returned per page.',
+    )
+
+    stats_p = sp.add_parser('stats', help='Show how dependency graphs evolved, from runs recorded with ``--metrics-db``.')
+    stats_p.add_argument('path', type=pathlib.Path, help='Path to a metrics database.')
+    stats_p.add_argument('--account', help='Only show the runs of this account.')
+    stats_p.add_argument('--days', type=__positive_int, help='Only show the runs of the last this many days.')
+    stats_p.add_argument('--format', choices=('text', 'json'), default='text', help='Output format.')
+
+    critical_p = sp.add_parser(
+        'critical-path',
+        help='Find the chain of dependencies which takes the longest to deploy, if dependencies are acyclic.',
+    )
+    critical_p.add_argument(
+        '--durations',
+        type=pathlib.Path,
+        help=(
+            'JSON file of the deploy duration of each stack, in seconds. By default, durations are taken from the '
+            'events of the last successful create or update of each stack.'
+        ),
+    )
+    critical_p.add_argument(
+        '--durations-cache',
+        type=pathlib.Path,
+        help='JSON file the durations taken from stack events are cached in, they are fetched again after a day.',
+    )
+    critical_p.add_argument(
+        '--default-duration',
+        type=float,
+        default=0.0,
+        help='Deploy duration, in seconds, of stacks without one.',
+    )
+    critical_p.add_argument('--format', choices=('text', 'json'), default='text', help='Output format.')
+
     # global options
-    for p in [check_p, topo_p]:
+    for p in [check_p, topo_p, snapshot_save_p, snapshot_load_p, diff_p, serve_p, stats_p, critical_p]:
         p.add_argument(
             '--log-level',
             choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
             default='INFO',
             help='Sets the logging level.',
         )
+
+    for p in [check_p, topo_p, snapshot_save_p, serve_p, critical_p]:
         p.add_argument(
             '--cdk-out',
             type=pathlib.Path,
             help='EXPERIMENTAL: Path to cdk.out/, where the cdk synthesizes the cloud assembly output.',
         )
+
+    for p in [check_p, topo_p, snapshot_save_p, critical_p]:
+        p.add_argument(
+            '--offline',
+            action='store_true',
+            help='Build the graph from ``--cdk-out`` alone, without making any AWS API calls.',
+        )
+        p.add_argument(
+            '--collector',
+            choices=COLLECTORS,
+            default='exports',
+            help=(
+                'How deployed exports are collected. ``stacks`` describes every stack in bulk, which adds parent and '
+                'root ids, tags and outputs to the graph data and avoids calls for exports which do not exist.'
+            ),
+        )
+        p.add_argument(
+            '--endpoint-url',
+            help='CloudFormation endpoint to collect exports and imports from, ex. one started by ``cycl serve``.',
+        )
+
+    for p in [check_p, topo_p, critical_p]:
+        p.add_argument(
+            '--collapse-nested',
+            action='store_true',
+            help=(
+                'Collapse nested stacks into their root stack. Root stacks are only known when collected with '
+                '``--collector stacks``, which is implied, or from a snapshot saved with it. Imports between stacks '
+                'of the same root are dropped, unless ``--selfloops report`` counts them.'
+            ),
+        )
+
+    for p in [check_p, topo_p]:
+        __add_crawl_args(p)
+        p.add_argument(
+            '--backend',
+            choices=('auto', *BACKENDS),
+            default='auto',
+            help=(
+                'Graph library cycles and generations are found with. ``auto`` uses rustworkx or igraph when installed, '
+                'falling back to networkx. Every backend gives identical results.'
+            ),
+        )
+        p.add_argument(
+            '--metrics-db',
+            type=pathlib.Path,
+            help=(
+                'Record the size, largest strongly connected component, depth and cycles of the graph to a local '
+                'SQLite database, created if it does not exist. See ``cycl stats``.'
+            ),
+        )
+        p.add_argument(
+            '--metrics-account',
+            help='Account the run is recorded under, by default the account of the stack ids in the graph.',
+        )
+        p.add_argument(
+            '--format',
+            choices=OUTPUT_FORMATS,
+            default='text',
+            help=(
+                'Output format. Results are streamed as they are found, ``ndjson`` writes a record per line and '
+                '``sarif`` can be uploaded as code scanning results in CI, given --cdk-out to locate results at '
+                'the templates of their stacks.'
+            ),
+        )
+
+    for p in [check_p, topo_p, serve_p, critical_p]:
+        p.add_argument(
+            '--from-snapshot',
+            type=pathlib.Path,
+            help=(
+                'Build the graph from a snapshot file, created by ``cycl snapshot save``, instead of collecting it. '
+                'With ``--cdk-out`` or ``--focus``, the snapshot stands in for the deployed exports.'
+            ),
+        )
+
+    for p in [check_p, topo_p, diff_p, critical_p]:
         p.add_argument(
             '--ignore-nodes',
             nargs='+',
@@ -75,6 +290,16 @@ def create_parser() -> argparse.ArgumentParser:
                 'repeated for each edge provided.'
             ),
         )
+        p.add_argument(
+            '--selfloops',
+            choices=SELFLOOP_POLICIES,
+            default='keep',
+            help=(
+                'What to do with stacks importing their own exports. ``keep`` them as cycles of a single node, '
+                '``drop`` them from the graph, or ``report`` how many imports each stack has of its own exports '
+                'without adding them to the graph.'
+            ),
+        )
         # p.add_argument(  # TODO
         #     '--node-key',
         #     type=str,
@@ -92,36 +317,341 @@ def create_parser() -> argparse.ArgumentParser:
     return parser
 
 
-def app() -> None:
-    parser = create_parser()
+def __snapshot(args: argparse.Namespace) -> None:
+    if args.snapshot_cmd == 'save':
+        graph_data = get_graph_data(
+            cdk_out_path=args.cdk_out, endpoint_url=args.endpoint_url, offline=args.offline, collector=args.collector
+        )
+        save_snapshot(graph_data, args.path, compress=args.compress)
+    elif args.snapshot_cmd == 'load':
+        graph_data = load_snapshot(args.path)
+        output = {
+            export_name: {
+                'stack_name': export.stack_name,
+                'stack_id': export.stack_id,
+                'export_value': export.export_value,
+                'importing_stacks': sorted(importing_stack.stack_name for importing_stack in export.importing_stacks),
+            }
+            for export_name, export in graph_data.items()
+        }
+        print(json.dumps(output, indent=2, sort_keys=True))
 
-    if len(sys.argv) == 1:
-        parser.print_help()
-        sys.exit(0)
 
-    args = parser.parse_args()
-    configure_log(getattr(logging, args.log_level))
+def __diff(args: argparse.Namespace) -> int:
+    graph_diff = diff_graphs(
+        *(
+            build_graph(
+                graph_data=load_snapshot(path),
+                nodes_to_ignore=args.ignore_nodes,
+                edges_to_ignore=args.ignore_edge,
+                selfloops=args.selfloops,
+                weighted=True,
+            )
+            for path in (args.old, args.new)
+        )
+    )
+    for line in graph_diff.report():
+        print(line)
+    return 1 if graph_diff and args.exit_code else 0
+
+
+def __serve(args: argparse.Namespace) -> None:
+    if args.from_snapshot:
+        client = LocalCloudFormationClient.from_snapshot(args.from_snapshot, page_size=args.page_size)
+    else:
+        client = LocalCloudFormationClient.from_assembly(args.cdk_out, page_size=args.page_size)
+    server = LocalCloudFormationServer(client, host=args.host, port=args.port)
+    print(f'serving {len(client.export_names)} exports at {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def __validate_crawl_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if getattr(args, 'low_memory', False) and (
+        args.from_snapshot or args.collector != 'exports' or args.collapse_nested or getattr(args, 'watch', False)
+    ):
+        parser.error(
+            'argument --low-memory: not allowed with argument --from-snapshot, --collector stacks, --collapse-nested '
+            'or --watch'
+        )
+    if getattr(args, 'focus', None) and (
+        args.offline or args.collector != 'exports' or args.collapse_nested or getattr(args, 'watch', False)
+    ):
+        parser.error(
+            'argument --focus: not allowed with argument --offline, --collector stacks, --collapse-nested or --watch'
+        )
+    if getattr(args, 'radius', None) and not args.focus:
+        parser.error('argument --radius: requires argument --focus')
 
-    dep_graph = build_graph(
+
+def __validate_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if getattr(args, 'offline', False) and not args.cdk_out:
+        parser.error('argument --offline: requires argument --cdk-out')
+    if getattr(args, 'offline', False) and (getattr(args, 'from_snapshot', None) or args.endpoint_url):
+        parser.error('argument --offline: not allowed with argument --from-snapshot or --endpoint-url')
+    __validate_crawl_args(parser, args)
+    if getattr(args, 'backend', 'auto') not in ('auto', *available_backends()):
+        parser.error(f'argument --backend: {args.backend} is not installed, ex. pip install cycl[{args.backend}]')
+    if getattr(args, 'watch', False) and args.metrics_db:
+        parser.error('argument --metrics-db: not allowed with argument --watch')
+    if getattr(args, 'watch', False) and not args.cdk_out:
+        parser.error('argument --watch: requires argument --cdk-out')
+    if args.cmd == 'critical-path' and not args.durations and (args.offline or args.from_snapshot):
+        parser.error('argument --durations: required with argument --offline or --from-snapshot')
+    if args.cmd == 'serve' and bool(args.from_snapshot) == bool(args.cdk_out):
+        parser.error('exactly one of the arguments --from-snapshot --cdk-out is required')
+    if args.cmd == 'stats' and not args.path.is_file():
+        # connecting would create an empty database, reporting no runs instead of the typo
+        parser.error(f'argument path: metrics database does not exist: {args.path}')
+
+
+def __graph_stats(dep_graph: nx.DiGraph) -> dict[str, int]:
+    stats = {
+        'nodes': dep_graph.number_of_nodes(),
+        'edges': dep_graph.number_of_edges(),
+        'imports': sum(edge_weights(dep_graph).values()),
+    }
+    if 'selfloops' in dep_graph.graph:
+        stats['selfloop_imports'] = sum(dep_graph.graph['selfloops'].values())
+    return stats
+
+
+def __report_selfloops(dep_graph: nx.DiGraph) -> None:
+    for node, imports in sorted(dep_graph.graph.get('selfloops', {}).items(), key=lambda item: str(item[0])):
+        log.warning('%s imports %s of its own exports', node, imports)
+
+
+def __print_table(columns: list[str], rows: list[list[str]]) -> None:
+    rows = [columns, *rows]
+    widths = [max(len(row[idx]) for row in rows) for idx in range(len(columns))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def __build_dep_graph(args: argparse.Namespace) -> nx.DiGraph:
+    graph_data = None
+    cfn_client = None
+    if args.from_snapshot and (args.cdk_out or getattr(args, 'focus', None)):
+        # the snapshot stands in for the deployed exports, which are merged with the cloud assembly or crawled
+        cfn_client = cast('CloudFormationClient', LocalCloudFormationClient.from_snapshot(args.from_snapshot))
+    elif args.from_snapshot:
+        graph_data = load_snapshot(args.from_snapshot)
+
+    return build_graph(
+        graph_data=graph_data,
         cdk_out_path=args.cdk_out,
         nodes_to_ignore=args.ignore_nodes,
         edges_to_ignore=args.ignore_edge,
+        cfn_client=cfn_client,
+        endpoint_url=args.endpoint_url,
+        offline=args.offline,
+        collector=args.collector,
+        collapse_nested=args.collapse_nested,
+        selfloops=args.selfloops,
+        weighted=True,
+        low_memory=getattr(args, 'low_memory', False),
+        focus=getattr(args, 'focus', None),
+        focus_radius=getattr(args, 'radius', None),
     )
 
-    cycles = list(nx.simple_cycles(dep_graph))
-    for cycle in cycles:
-        print(f'cycle found between nodes: {cycle}')
+
+def __get_writer(args: argparse.Namespace, dep_graph: nx.DiGraph) -> OutputWriter:
+    templates = get_stack_templates(args.cdk_out) if args.format == 'sarif' and args.cdk_out else None
+    return get_writer(args.format, dep_graph, show_exports=getattr(args, 'show_exports', False), templates=templates)
+
+
+def __check_or_topo(args: argparse.Namespace) -> int:
+    dep_graph = __build_dep_graph(args)
+    __report_selfloops(dep_graph)
+    writer = __get_writer(args, dep_graph)
+    try:
+        code, stats = __write_check_or_topo(args, dep_graph, writer)
+    finally:
+        writer.close()
+    if args.metrics_db:
+        store = MetricsStore(args.metrics_db)
+        try:
+            account = args.metrics_account or graph_account(dep_graph)
+            store.record(
+                account, args.cmd, {**graph_metrics(dep_graph), 'cycles': stats['cycles'], 'cyclic': stats['cyclic']}
+            )
+        finally:
+            store.close()
+    return code
+
+
+def __write_check_or_topo(
+    args: argparse.Namespace, dep_graph: nx.DiGraph, writer: OutputWriter
+) -> tuple[int, dict[str, Any]]:
+    max_cycle_length = getattr(args, 'max_cycle_length', None)
+    backend = get_backend(args.backend)
+    cycles_found = writer.write_cycles(iter_cycles(dep_graph, max_length=max_cycle_length, backend=backend.name))
+    cyclic = cycles_found > 0 or not is_acyclic(dep_graph, backend)
+    if cyclic and not cycles_found:
+        log.warning('graph is cyclic, but no cycle is through at most %s nodes', max_cycle_length)
+    stats = {**__graph_stats(dep_graph), 'cycles': cycles_found, 'cyclic': cyclic}
 
     if args.cmd == 'check':
-        if cycles and not args.exit_zero:
-            sys.exit(1)
-    elif args.cmd == 'topo':
-        if cycles:
-            log.error('graph is cyclic, topological generations can only be computed on an acyclic graph')
-            sys.exit(1)
-        generations = [sorted(generation) for generation in nx.topological_generations(dep_graph)]
-        print(json.dumps(generations, indent=2))
-    sys.exit(0)
+        if cyclic and args.suggest_cuts:
+            stats['cuts'] = writer.write_cuts(suggest_cuts(dep_graph))
+        writer.write_stats(stats)
+        return (1 if cyclic and not args.exit_zero else 0), stats
+
+    if cyclic:
+        writer.write_stats(stats)
+        log.error('graph is cyclic, topological generations can only be computed on an acyclic graph')
+        return 1, stats
+    stats['generations'] = writer.write_generations(
+        sorted(cast('list[Any]', generation)) for generation in topological_generations(dep_graph, backend)
+    )
+    writer.write_stats(stats)
+    return 0, stats
+
+
+def __stats(args: argparse.Namespace) -> None:
+    store = MetricsStore(args.path)
+    try:
+        trends = store.trends(account=args.account, days=args.days)
+    finally:
+        store.close()
+    if args.format == 'json':
+        print(json.dumps(trends, indent=2))
+        return
+
+    columns = ['account', 'day', 'runs', *METRICS[:-1], 'cyclic_runs']
+    __print_table(columns, [[str(trend[column]) for column in columns] for trend in trends])
+
+
+def __critical_path(args: argparse.Namespace) -> int:
+    dep_graph = __build_dep_graph(args)
+    __report_selfloops(dep_graph)
+    if not nx.is_directed_acyclic_graph(dep_graph):
+        log.error('graph is cyclic, the critical path can only be computed on an acyclic graph')
+        return 1
+    if args.durations:
+        durations = load_durations(args.durations)
+    else:
+        durations = get_deploy_durations(
+            [str(node) for node in dep_graph],
+            cfn_client=get_cfn_client(endpoint_url=args.endpoint_url),
+            cache_path=args.durations_cache,
+        )
+    result = critical_path(dep_graph, durations, default_duration=args.default_duration)
+
+    timings = sorted(result.timings.items(), key=lambda item: (item[1].earliest_start, str(item[0])))
+    if args.format == 'json':
+        stacks = [
+            {
+                'stack': str(node),
+                'duration': timing.duration,
+                'earliest_start': timing.earliest_start,
+                'latest_start': timing.latest_start,
+                'slack': timing.slack,
+            }
+            for node, timing in timings
+        ]
+        print(json.dumps({'path': [str(node) for node in result.path], 'duration': result.duration, 'stacks': stacks}))
+        return 0
+
+    print(f'critical path ({result.duration:g}s): {" -> ".join(str(node) for node in result.path)}')
+    __print_table(
+        ['stack', 'duration', 'earliest_start', 'latest_start', 'slack'],
+        [[str(node), *(f'{value:g}' for value in (*timing, timing.slack))] for node, timing in timings],
+    )
+    return 0
+
+
+def __watch(args: argparse.Namespace) -> int:
+    cfn_client = None
+    # root ids are only collected by the stacks collector, which build_graph implies when collapsing nested stacks
+    collector = 'stacks' if args.collapse_nested else args.collector
+    # the stacks importing stacks resolve to are listed once, like the deployed exports
+    stack_cache = StackCache()
+    if args.from_snapshot:
+        cfn_client = cast('CloudFormationClient', LocalCloudFormationClient.from_snapshot(args.from_snapshot))
+    elif not args.offline:
+        # deployed exports don't change on a synth, so they are collected once and served locally afterwards
+        deployed = get_graph_data(endpoint_url=args.endpoint_url, collector=collector, stack_cache=stack_cache)
+        cfn_client = cast('CloudFormationClient', LocalCloudFormationClient(deployed))
+
+    template_cache: dict = {}
+    checker = IncrementalCycleChecker(max_length=args.max_cycle_length, backend=args.backend)
+
+    def check() -> None:
+        start = time.perf_counter()
+        graph_data = get_graph_data(
+            cdk_out_path=args.cdk_out,
+            cfn_client=cfn_client,
+            offline=args.offline,
+            collector=collector,
+            template_cache=template_cache,
+            stack_cache=stack_cache,
+        )
+        dep_graph = build_graph(
+            graph_data=graph_data,
+            nodes_to_ignore=args.ignore_nodes,
+            edges_to_ignore=args.ignore_edge,
+            collapse_nested=args.collapse_nested,
+            selfloops=args.selfloops,
+            weighted=True,
+        )
+        __report_selfloops(dep_graph)
+        cycles, searched = checker.check(dep_graph)
+        writer = __get_writer(args, dep_graph)
+        try:
+            stats = {**__graph_stats(dep_graph), 'cycles': writer.write_cycles(cycles), 'searched': searched}
+            if cycles and args.suggest_cuts:
+                stats['cuts'] = writer.write_cuts(suggest_cuts(dep_graph))
+            elapsed = time.perf_counter() - start
+            writer.write_stats({**stats, 'seconds': round(elapsed, 3)})
+        finally:
+            writer.close()
+        log.info('%s cycles found, searched %s components in %.2fs', len(cycles), searched, elapsed)
+
+    try:
+        check()
+        for changed in iter_template_changes(args.cdk_out):
+            log.info('%s templates changed, checking again', len(changed))
+            try:
+                check()
+            except Exception:  # a broken synth shouldn't stop watching
+                log.exception('check failed, waiting for the next change')
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def app() -> None:
+    parser = create_parser()
+
+    if len(sys.argv) == 1:
+        parser.print_help()
+        sys.exit(0)
+
+    args = parser.parse_args()
+    configure_log(getattr(logging, args.log_level))
+    __validate_args(parser, args)
+
+    if args.cmd == 'snapshot':
+        __snapshot(args)
+        sys.exit(0)
+    if args.cmd == 'diff':
+        sys.exit(__diff(args))
+    if args.cmd == 'serve':
+        __serve(args)
+        sys.exit(0)
+    if args.cmd == 'stats':
+        __stats(args)
+        sys.exit(0)
+    if args.cmd == 'critical-path':
+        sys.exit(__critical_path(args))
+    if getattr(args, 'watch', False):
+        sys.exit(__watch(args))
+    sys.exit(__check_or_topo(args))
 
 
 if __name__ == '__main__':
@@ -1,46 +1,45 @@
 from __future__ import annotations
 
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from logging import getLogger
 from pathlib import Path
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
-import boto3
 import networkx as nx
-from botocore.config import Config
-from botocore.session import Session
 
-from cycl.models import NodeData
-from cycl.utils.cdk import get_exports_from_assembly
+from cycl.models import NodeData, StackCache
+from cycl.utils.cdk import get_assembly_data
+from cycl.utils.cfn import IMPORT_FETCH_WORKERS, get_cfn_client, parse_name_from_id
+from cycl.utils.edge_store import EdgeStore
+from cycl.utils.graph import selfloop_policy
 
 if TYPE_CHECKING:
     from collections.abc import Hashable
 
+    from botocore.session import Session
+    from mypy_boto3_cloudformation import CloudFormationClient
+
 
 log = getLogger(__name__)
 
+COLLECTORS = ('exports', 'stacks')
 
-def get_graph_data(
-    cdk_out_path: Path | None = None,
-    aws_session: Session | None = None,
-    aws_profile_name: str | None = None,
-) -> dict[str, NodeData]:
-    cdk_out_imports: dict[str, list[NodeData]] = (
-        get_exports_from_assembly(Path(cdk_out_path)) if cdk_out_path is not None else {}
+
+def __merge_assembly_data(
+    exports: dict[str, NodeData], cdk_out_path: Path, template_cache: dict[Path, Any] | None = None
+) -> dict[str, list[NodeData]]:
+    """Add the exports declared in the cloud assembly which are not deployed yet, returning its imports."""
+    assembly_exports, cdk_out_imports = get_assembly_data(
+        cdk_out_path, known_export_names=set(exports), template_cache=template_cache
     )
-    log.info('cdk_out_imports: %s', cdk_out_imports)
-
-    # this logic should move to a module
-    # profile and session should not be able to be provided
-    boto_config = Config(retries={'max_attempts': 10, 'mode': 'adaptive'})
-    if aws_session:
-        cfn_client = aws_session.client('cloudformation', config=boto_config)  # type: ignore[attr-defined]
-    elif aws_profile_name:
-        cfn_client = Session(profile_name=aws_profile_name).client('cloudformation', config=boto_config)  # type: ignore[attr-defined,call-arg]
-    else:
-        cfn_client = boto3.client('cloudformation', config=boto_config)
-
-    log.info('getting all exports')
-    exports = NodeData.get_all_exports(cfn_client=cfn_client)
+    log.info('found imports of %s export names in the cloud assembly', len(cdk_out_imports))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('cdk_out_imports: %s', cdk_out_imports)
+    for export_name, export in assembly_exports.items():
+        if export_name not in exports:
+            log.debug('found an export (%s) in the cloud assembly which has not been deployed yet', export_name)
+            exports[export_name] = export
     for export_name, importing_stacks in cdk_out_imports.items():
         if export_name not in exports:
             log.debug(
@@ -48,18 +47,174 @@ def get_graph_data(
                 export_name,
                 importing_stacks,
             )
+    return cdk_out_imports
+
+
+class _ImportFetcher:
+    """Fetches the imports of exports in a pool of threads, starting as soon as each page of exports arrives."""
+
+    def __init__(self, cfn_client: CloudFormationClient, max_workers: int = IMPORT_FETCH_WORKERS) -> None:
+        self.cfn_client = cfn_client
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures: dict[str, Future[NodeData]] = {}
+
+    def close(self) -> None:
+        """Stop the pool, cancelling fetches which have not started."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, exports: dict[str, NodeData]) -> None:
+        for export_name, export in exports.items():
+            if export.export_name and export_name not in self.futures:
+                self.futures[export_name] = self.executor.submit(export.get_all_imports, cfn_client=self.cfn_client)
+
+    def wait(self) -> None:
+        """Wait for every fetch, raising the first error."""
+        for future in as_completed(self.futures.values()):
+            future.result()
+
+
+def __get_deployed_exports(cfn_client: CloudFormationClient, collector: str, stack_cache: StackCache) -> dict[str, NodeData]:
+    """Collect the deployed exports and their imports, fetching imports while later pages are still paged.
+
+    Also adds the stacks of the account, which importing stacks are resolved to, to the stack cache. They are
+    described in bulk by the ``stacks`` collector, or otherwise listed once, unless the cache already holds them.
+    """
+    fetcher = _ImportFetcher(cfn_client)
+    try:
+        if collector == 'stacks':
+            log.info('getting all stacks')
+            exports, stacks = NodeData.get_all_stacks(cfn_client=cfn_client, on_page=fetcher.submit)
+            stack_cache.stacks.update(stacks)
+        else:
+            log.info('getting all exports')
+            exports = NodeData.get_all_exports(cfn_client=cfn_client, on_page=fetcher.submit)
+            if stack_cache:
+                log.info('reusing %s cached stacks', len(stack_cache))
+            else:
+                stack_cache.stacks.update(StackCache.from_list_stacks(cfn_client=cfn_client).stacks)
+        fetcher.submit(exports)
+        log.info('getting imports for %s exports', len(fetcher.futures))
+        fetcher.wait()
+    finally:
+        fetcher.close()
+    return exports
+
+
+def get_graph_data(  # noqa: PLR0913
+    cdk_out_path: Path | None = None,
+    aws_session: Session | None = None,
+    aws_profile_name: str | None = None,
+    cfn_client: CloudFormationClient | None = None,
+    endpoint_url: str | None = None,
+    *,
+    offline: bool = False,
+    collector: str = 'exports',
+    template_cache: dict[Path, Any] | None = None,
+    stack_cache: StackCache | None = None,
+) -> dict[str, NodeData]:
+    """Collect every export, and the stacks which import it, from the account and the cloud assembly.
+
+    Exports declared in the cloud assembly which have not been deployed yet are merged with the deployed exports,
+    so export to import chains within a single synth are part of the graph before they are deployed.
+
+    The ``exports`` collector pages ``list_exports``. The ``stacks`` collector pages ``describe_stacks`` instead,
+    which also fills in the parent and root ids, tags and outputs of exporting and importing stacks, and only
+    calls ``list_imports`` for outputs of stacks whose exports exist.
+
+    Args:
+        cdk_out_path: Path to cdk.out/, where the cdk synthesizes the cloud assembly output.
+        aws_session: Session used to create the CloudFormation client.
+        aws_profile_name: Profile used to create the CloudFormation client, if no session is provided.
+        cfn_client: The source of deployed exports and imports, a CloudFormation client or a stand-in for one like
+            ``LocalCloudFormationClient``. Created from the session or profile if not provided.
+        endpoint_url: CloudFormation endpoint the created client calls, ex. a ``LocalCloudFormationServer``.
+        offline: Only read the cloud assembly, without making any AWS API calls. Requires ``cdk_out_path``.
+        collector: How deployed exports are collected, one of ``COLLECTORS``.
+        template_cache: Parsed cloud assembly templates, see ``get_assembly_data``, so repeated calls only parse
+            the templates which changed.
+        stack_cache: The stacks importing stacks are resolved to, which is updated in place, so repeated calls with
+            the ``exports`` collector only list the stacks of the account once.
+
+    Returns:
+        A dictionary mapping export names to NodeData, with the importing stacks of each export.
+    """
+    if offline and cdk_out_path is None:
+        err_msg = 'cdk_out_path is required in offline mode'
+        raise ValueError(err_msg)
+    if collector not in COLLECTORS:
+        err_msg = f'collector must be one of {COLLECTORS}, not {collector!r}'
+        raise ValueError(err_msg)
+
+    exports: dict[str, NodeData] = {}
+    stack_cache = StackCache() if stack_cache is None else stack_cache
+    if not offline:
+        cfn_client = cfn_client or get_cfn_client(
+            aws_session=aws_session, aws_profile_name=aws_profile_name, endpoint_url=endpoint_url
+        )
+        exports = __get_deployed_exports(cfn_client, collector, stack_cache)
+
+    cdk_out_imports = __merge_assembly_data(exports, Path(cdk_out_path), template_cache) if cdk_out_path is not None else {}
 
-    log.info('getting imports for %s exports', len(exports))
     for export in exports.values():
         if export.export_name:  # TODO: i think this is a given, maybe enforce at object level, add unit test
-            export.get_all_imports(cfn_client=cfn_client)
-            export.importing_stacks += cdk_out_imports.get(export.export_name, [])  # TODO: should we convert to method?
+            # every import of a stack refers to its one shared instance, as listed or described in bulk
+            export.importing_stacks = [
+                stack_cache.get(stack.stack_name)
+                for stack in [*export.importing_stacks, *cdk_out_imports.get(export.export_name, [])]
+            ]
         if len(export.importing_stacks) == 0:
             log.warning('Export found with no import: %s from %s', export.export_name, export.stack_name)
     return exports
 
 
-def __add_node_data(graph: nx.MultiDiGraph, key: Hashable, data: NodeData) -> None:
+def __collect_edge_store(  # noqa: PLR0913
+    graph_data: dict[str, NodeData] | None,
+    cdk_out_path: Path | None,
+    aws_session: Session | None,
+    aws_profile_name: str | None,
+    cfn_client: CloudFormationClient | None,
+    endpoint_url: str | None,
+    *,
+    offline: bool,
+    collector: str,
+    collapse_nested: bool = False,
+    focus: list[str] | None = None,
+    focus_radius: int | None = None,
+) -> EdgeStore:
+    """Collect straight into an edge store, so graph data is never built. With a focus, only the stacks around it."""
+    option = 'focus' if focus else 'low_memory'
+    conflicts = {
+        'graph_data': graph_data is not None,
+        'collapse_nested': collapse_nested,
+        f'collector={collector!r}': collector != 'exports' and not collapse_nested,
+        'offline': bool(focus) and offline,
+    }
+    conflicting = [name for name, conflict in conflicts.items() if conflict]
+    if conflicting:
+        collects = 'crawls deployed stacks' if focus else 'collects'
+        err_msg = f'{option} can not be combined with {", ".join(conflicting)}, it {collects} with the exports collector'
+        raise ValueError(err_msg)
+    if offline and cdk_out_path is None:
+        err_msg = f'{option} requires cdk_out_path in offline mode'
+        raise ValueError(err_msg)
+
+    store = EdgeStore()
+    if not offline:
+        cfn_client = cfn_client or get_cfn_client(
+            aws_session=aws_session, aws_profile_name=aws_profile_name, endpoint_url=endpoint_url
+        )
+        if focus:
+            # the assembly is merged as stacks are crawled, so stacks which only the assembly links to are crawled
+            return EdgeStore.crawl(
+                cfn_client, focus, focus_radius, cdk_out_path=None if cdk_out_path is None else Path(cdk_out_path)
+            )
+        store = EdgeStore.collect(cfn_client)
+    if cdk_out_path is not None:
+        store.merge_assembly(Path(cdk_out_path))
+    return store
+
+
+def __add_node_data(graph: nx.DiGraph, key: Hashable, data: NodeData) -> None:
     if key not in graph:
         graph.add_node(key, node_data={data})
         return
@@ -68,27 +223,61 @@ def __add_node_data(graph: nx.MultiDiGraph, key: Hashable, data: NodeData) -> No
     node_data.add(data)
 
 
-def build_graph(  # noqa: PLR0913
-    graph_data: dict[str, NodeData] | None = None,
-    cdk_out_path: Path | None = None,
-    node_key_fn: Callable[[NodeData], Hashable] = lambda x: x.stack_name,
-    nodes_to_ignore: list[str] | None = None,
-    edges_to_ignore: list[list[str]] | None = None,
-    aws_session: Session | None = None,
-    aws_profile_name: str | None = None,
-    *,
-    remove_selfloops: bool = False,
-) -> nx.MultiDiGraph:
-    nodes_to_ignore = nodes_to_ignore or []
-    edges_to_ignore = edges_to_ignore or []
-    graph_data = (
-        get_graph_data(cdk_out_path=cdk_out_path, aws_session=aws_session, aws_profile_name=aws_profile_name)
-        if graph_data is None
-        else graph_data
-    )
+def __add_edge(graph: nx.DiGraph, u: Hashable, v: Hashable, export_id: int, *, weighted: bool) -> None:
+    if not weighted:
+        graph.add_edge(u, v, export=export_id)
+        return
+    data = graph.get_edge_data(u, v)
+    if data is None:
+        graph.add_edge(u, v, weight=1, exports=[export_id])
+        return
+    data['exports'].append(export_id)
+    graph.add_edge(u, v, weight=data['weight'] + 1)
+
+
+def __root_key_fn(
+    node_key_fn: Callable[[NodeData], Hashable], graph_data: dict[str, NodeData]
+) -> Callable[[NodeData], Hashable]:
+    """Key nested stacks like their root stack, so a root and its nested stacks share a node whatever the key."""
+    stacks = {
+        stack.stack_id: stack
+        for export in graph_data.values()
+        for stack in (export, *export.importing_stacks)
+        if stack.stack_id and not stack.root_id
+    }
+    root_keys: dict[str, Hashable] = {}
+
+    def key_fn(node: NodeData) -> Hashable:
+        if not node.root_id:
+            return node_key_fn(node)
+        if node.root_id not in root_keys:
+            root = stacks.get(node.root_id)
+            if root is None:
+                # the root neither exports nor imports, it is only known by its id
+                root_name = parse_name_from_id(node.root_id)
+                root = NodeData(stack_name=root_name, stack_id=node.root_id) if root_name else None
+            root_keys[node.root_id] = node_key_fn(root) if root is not None else None
+        root_key = root_keys[node.root_id]
+        return node_key_fn(node) if root_key is None else root_key
 
+    return key_fn
+
+
+def __insert_graph_data(  # noqa: PLR0913
+    graph_data: dict[str, NodeData],
+    node_key_fn: Callable[[NodeData], Hashable],
+    nodes_to_ignore: list[str],
+    edges_to_ignore: list[list[str]],
+    *,
+    selfloops: str,
+    weighted: bool,
+) -> nx.DiGraph:
     log.info('building dependency graph from graph data')
-    dep_graph: nx.MultiDiGraph = nx.MultiDiGraph()
+    # a weighted graph has one edge per pair of stacks, its weight and exports aggregate the parallel edges
+    dep_graph: nx.DiGraph = nx.DiGraph() if weighted else nx.MultiDiGraph()
+    # edges refer to the export which caused them by its index in graph['exports'], see edge_exports
+    export_ids: dict[str, int] = {}
+    selfloop_imports: dict[Hashable, int] = {}
 
     for export in graph_data.values():
         export_key = node_key_fn(export)
@@ -96,16 +285,92 @@ def build_graph(  # noqa: PLR0913
             continue
 
         __add_node_data(dep_graph, export_key, export)
+        export_id = export_ids.setdefault(export.export_name or '', len(export_ids))
 
         for importing_stack in export.importing_stacks:
             importing_key = node_key_fn(importing_stack)
             if importing_key not in nodes_to_ignore:
                 edge = (export_key, importing_key)
                 if list(edge) not in edges_to_ignore:
-                    dep_graph.add_edge(*edge)
+                    if export_key == importing_key and selfloops != 'keep':
+                        selfloop_imports[export_key] = selfloop_imports.get(export_key, 0) + 1
+                    else:
+                        __add_edge(dep_graph, *edge, export_id, weighted=weighted)
                     __add_node_data(dep_graph, importing_key, importing_stack)
 
-    if remove_selfloops:
-        dep_graph.remove_edges_from(nx.selfloop_edges(dep_graph))
+    dep_graph.graph['exports'] = list(export_ids)
+    if selfloops == 'report':
+        dep_graph.graph['selfloops'] = selfloop_imports
 
     return dep_graph
+
+
+def build_graph(  # noqa: PLR0913
+    graph_data: dict[str, NodeData] | None = None,
+    cdk_out_path: Path | None = None,
+    node_key_fn: Callable[[NodeData], Hashable] = lambda x: x.stack_name,
+    nodes_to_ignore: list[str] | None = None,
+    edges_to_ignore: list[list[str]] | None = None,
+    aws_session: Session | None = None,
+    aws_profile_name: str | None = None,
+    cfn_client: CloudFormationClient | None = None,
+    endpoint_url: str | None = None,
+    *,
+    remove_selfloops: bool = False,
+    selfloops: str = 'keep',
+    offline: bool = False,
+    collector: str = 'exports',
+    collapse_nested: bool = False,
+    weighted: bool = False,
+    low_memory: bool = False,
+    focus: list[str] | None = None,
+    focus_radius: int | None = None,
+) -> nx.DiGraph:
+    # imports of a stack from its own exports are kept as self loops, or dropped as they are inserted. when reported,
+    # the number of dropped imports of each node is kept in graph['selfloops']
+    selfloops = selfloop_policy(selfloops, remove_selfloops=remove_selfloops)
+    nodes_to_ignore = nodes_to_ignore or []
+    edges_to_ignore = edges_to_ignore or []
+    if collapse_nested:
+        # root ids are only collected by the stacks collector. imports between stacks of the same root are not
+        # dependencies between stacks, so the self loops they collapse into are dropped unless they are reported
+        collector = 'stacks'
+        selfloops = 'drop' if selfloops == 'keep' else selfloops
+    if low_memory or focus:
+        # a focus crawls the deployed stacks around it into an edge store, see EdgeStore.crawl
+        store = __collect_edge_store(
+            graph_data,
+            cdk_out_path,
+            aws_session,
+            aws_profile_name,
+            cfn_client,
+            endpoint_url,
+            offline=offline,
+            collector=collector,
+            collapse_nested=collapse_nested,
+            focus=focus,
+            focus_radius=focus_radius,
+        )
+        return store.build_graph(node_key_fn, nodes_to_ignore, edges_to_ignore, selfloops=selfloops, weighted=weighted)
+
+    graph_data = (
+        get_graph_data(
+            cdk_out_path=cdk_out_path,
+            aws_session=aws_session,
+            aws_profile_name=aws_profile_name,
+            cfn_client=cfn_client,
+            endpoint_url=endpoint_url,
+            offline=offline,
+            collector=collector,
+        )
+        if graph_data is None
+        else graph_data
+    )
+
+    if collapse_nested:
+        # nested stacks are collapsed into their root as nodes are added, so the graph never holds them separately
+        node_key_fn = __root_key_fn(node_key_fn, graph_data)
+
+    return __insert_graph_data(
+        graph_data, node_key_fn, nodes_to_ignore, edges_to_ignore, selfloops=selfloops, weighted=weighted
+    )
@@ -1 +1 @@
-from .node_data import NodeData
+from .node_data import NodeData, StackCache
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from logging import getLogger
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
 import boto3
 from botocore.exceptions import ClientError
@@ -10,35 +10,82 @@ from cycl.utils.cfn import parse_name_from_id
 
 if TYPE_CHECKING:
     from mypy_boto3_cloudformation import CloudFormationClient
-    from mypy_boto3_cloudformation.type_defs import ListExportsOutputTypeDef
+    from mypy_boto3_cloudformation.literals import StackStatusType
+    from mypy_boto3_cloudformation.type_defs import (
+        DescribeStacksOutputTypeDef,
+        ListExportsOutputTypeDef,
+        StackSummaryTypeDef,
+        StackTypeDef,
+    )
 
 log = getLogger(__name__)
 
+# the outputs of stacks in these states were never exported, or are no longer
+NO_EXPORT_STACK_STATUSES = frozenset(
+    {
+        'CREATE_IN_PROGRESS',
+        'CREATE_FAILED',
+        'ROLLBACK_IN_PROGRESS',
+        'ROLLBACK_FAILED',
+        'ROLLBACK_COMPLETE',
+        'DELETE_IN_PROGRESS',
+        'DELETE_FAILED',
+        'DELETE_COMPLETE',
+        'REVIEW_IN_PROGRESS',
+    }
+)
+
+# every stack status but DELETE_COMPLETE, deleted stacks are kept, and listed, for 90 days
+UNDELETED_STACK_STATUSES: list[StackStatusType] = [
+    'CREATE_IN_PROGRESS',
+    'CREATE_FAILED',
+    'CREATE_COMPLETE',
+    'ROLLBACK_IN_PROGRESS',
+    'ROLLBACK_FAILED',
+    'ROLLBACK_COMPLETE',
+    'DELETE_IN_PROGRESS',
+    'DELETE_FAILED',
+    'UPDATE_IN_PROGRESS',
+    'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS',
+    'UPDATE_COMPLETE',
+    'UPDATE_FAILED',
+    'UPDATE_ROLLBACK_IN_PROGRESS',
+    'UPDATE_ROLLBACK_FAILED',
+    'UPDATE_ROLLBACK_COMPLETE_CLEANUP_IN_PROGRESS',
+    'UPDATE_ROLLBACK_COMPLETE',
+    'REVIEW_IN_PROGRESS',
+    'IMPORT_IN_PROGRESS',
+    'IMPORT_COMPLETE',
+    'IMPORT_ROLLBACK_IN_PROGRESS',
+    'IMPORT_ROLLBACK_FAILED',
+    'IMPORT_ROLLBACK_COMPLETE',
+]
+
 
 class NodeData:
     """Data collected to be used in graph creation."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         stack_name: str,
         stack_id: str | None = None,
         export_name: str | None = None,
         export_value: str | None = None,
         importing_stacks: list[NodeData] | None = None,
-        # parent_id: str | None = None,
-        # root_id: str | None = None,
-        # tags: dict[str, str] | None = None,
-        # outputs: list[str] | None = None,
+        parent_id: str | None = None,
+        root_id: str | None = None,
+        tags: dict[str, str] | None = None,
+        outputs: list[str] | None = None,
     ) -> None:
         self.stack_name = stack_name
         self.stack_id = stack_id
         self.export_name = export_name
         self.export_value = export_value
         self.importing_stacks = importing_stacks or []
-        # self.parent_id = parent_id
-        # self.root_id = root_id
-        # self.tags = tags
-        # self.outputs = outputs or []
+        self.parent_id = parent_id
+        self.root_id = root_id
+        self.tags = tags
+        self.outputs = outputs or []
 
     @classmethod
     def from_list_exports(cls, list_exports_resp: ListExportsOutputTypeDef) -> dict[str, NodeData]:
@@ -66,12 +113,18 @@ class NodeData:
         }
 
     @classmethod
-    def get_all_exports(cls, cfn_client: CloudFormationClient | None = None) -> dict[str, NodeData]:
+    def get_all_exports(
+        cls,
+        cfn_client: CloudFormationClient | None = None,
+        on_page: Callable[[dict[str, NodeData]], None] | None = None,
+    ) -> dict[str, NodeData]:
         """Retrieve all AWS CloudFormation exports and return them as a dictionary of export name to NodeData instances.
 
         Args:
             cfn_client: A Boto3 CloudFormation client instance.
                 If not provided, a new client will be created.
+            on_page: Called with the exports of each page as soon as it arrives, so their imports can be fetched
+                while later pages are still being retrieved.
 
         Returns:
             A dictionary mapping export names to NodeData instances,
@@ -83,23 +136,128 @@ class NodeData:
         cfn_client = cfn_client or boto3.client('cloudformation')
 
         exports: dict[str, NodeData] = {}
-        resp = cfn_client.list_exports()
-        log.debug(resp)
-        exports.update(NodeData.from_list_exports(resp))
-        while token := resp.get('NextToken'):
-            resp = cfn_client.list_exports(NextToken=token)
+        token = None
+        while True:
+            resp = cfn_client.list_exports(NextToken=token) if token else cfn_client.list_exports()
             log.debug(resp)
-            exports.update(NodeData.from_list_exports(resp))
+            page = NodeData.from_list_exports(resp)
+            exports.update(page)
+            if on_page:
+                on_page(page)
+            if not (token := resp.get('NextToken')):
+                break
         log.debug(exports)
         return exports
 
+    @classmethod
+    def from_stack(cls, stack: StackTypeDef, export_name: str | None = None, export_value: str | None = None) -> NodeData:
+        """Create an instance from a stack in an AWS CloudFormation describe stacks response.
+
+        Args:
+            stack: The stack, as described by ``describe_stacks``.
+            export_name: The name of an export of the stack, if the instance represents one.
+            export_value: The value of the export.
+
+        Returns:
+            A NodeData instance with the stack's id, parent and root ids, tags and output keys.
+        """
+        return cls(
+            stack_name=stack['StackName'],
+            stack_id=stack.get('StackId'),
+            export_name=export_name,
+            export_value=export_value,
+            parent_id=stack.get('ParentId'),
+            root_id=stack.get('RootId'),
+            tags={tag['Key']: tag['Value'] for tag in stack.get('Tags', [])},
+            outputs=[output['OutputKey'] for output in stack.get('Outputs', []) if 'OutputKey' in output],
+        )
+
+    @classmethod
+    def from_stack_summary(cls, stack_summary: StackSummaryTypeDef) -> NodeData:
+        """Create an instance from a stack in an AWS CloudFormation list stacks response, with its name and id."""
+        return cls(stack_name=stack_summary['StackName'], stack_id=stack_summary.get('StackId'))
+
+    @classmethod
+    def from_describe_stacks(
+        cls, describe_stacks_resp: DescribeStacksOutputTypeDef
+    ) -> tuple[dict[str, NodeData], dict[str, NodeData]]:
+        """Convert an AWS CloudFormation describe stacks response into exports and stacks.
+
+        Args:
+            describe_stacks_resp: A dictionary representing the describe stacks response, where each stack contains
+                its ``Outputs``, those with an ``ExportName`` are exported.
+
+        Returns:
+            A tuple of a dictionary mapping export names to NodeData instances, and a dictionary mapping stack names
+            to NodeData instances of every described stack. Outputs of stacks which failed to create, or are being
+            deleted, are not exports.
+        """
+        exports: dict[str, NodeData] = {}
+        stacks: dict[str, NodeData] = {}
+        for stack in describe_stacks_resp['Stacks']:
+            stacks[stack['StackName']] = cls.from_stack(stack)
+            if stack.get('StackStatus') in NO_EXPORT_STACK_STATUSES:
+                continue
+            for output in stack.get('Outputs', []):
+                if 'ExportName' in output:
+                    exports[output['ExportName']] = cls.from_stack(
+                        stack, export_name=output['ExportName'], export_value=output.get('OutputValue')
+                    )
+        return exports, stacks
+
+    @classmethod
+    def get_all_stacks(
+        cls,
+        cfn_client: CloudFormationClient | None = None,
+        on_page: Callable[[dict[str, NodeData]], None] | None = None,
+    ) -> tuple[dict[str, NodeData], dict[str, NodeData]]:
+        """Retrieve every AWS CloudFormation stack, and the exports among their outputs, in bulk.
+
+        Args:
+            cfn_client: A Boto3 CloudFormation client instance.
+                If not provided, a new client will be created.
+            on_page: Called with the exports of each page as soon as it arrives, see ``get_all_exports``.
+
+        Returns:
+            A tuple of the exports and stacks, see ``from_describe_stacks``.
+
+        Note:
+            This function paginates through the AWS CloudFormation `describe_stacks` API, a page holds up to 100
+            stacks along with their outputs, tags, and parent and root ids.
+        """
+        cfn_client = cfn_client or boto3.client('cloudformation')
+
+        exports: dict[str, NodeData] = {}
+        stacks: dict[str, NodeData] = {}
+        token = None
+        while True:
+            resp = cfn_client.describe_stacks(NextToken=token) if token else cfn_client.describe_stacks()
+            log.debug(resp)
+            page_exports, page_stacks = NodeData.from_describe_stacks(resp)
+            exports.update(page_exports)
+            stacks.update(page_stacks)
+            if on_page:
+                on_page(page_exports)
+            if not (token := resp.get('NextToken')):
+                break
+        log.debug(exports)
+        return exports, stacks
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, NodeData):
             return False
         return vars(self) == vars(other)
 
     def __hash__(self) -> int:
-        return hash(tuple((key, tuple(value) if isinstance(value, list) else value) for key, value in vars(self).items()))
+        return hash(tuple((key, self.__hashable(value)) for key, value in vars(self).items()))
+
+    @staticmethod
+    def __hashable(value: object) -> object:
+        if isinstance(value, list):
+            return tuple(value)
+        if isinstance(value, dict):
+            return tuple(sorted(value.items()))
+        return value
 
     def __repr__(self) -> str:
         return f'NodeData(stack_name={self.stack_name!r}, export_name={self.export_name!r})'
@@ -144,3 +302,57 @@ class NodeData:
             )
             log.warning(warning_msg)
         return self
+
+
+class StackCache:
+    """One shared NodeData per stack, looked up by stack name.
+
+    Every export imported by a stack refers to the same instance for it, instead of an equal copy per import, so the
+    importing stacks of graph data hold one object per stack and sets of them only hash and compare each stack once.
+    """
+
+    def __init__(self, stacks: dict[str, NodeData] | None = None) -> None:
+        self.stacks: dict[str, NodeData] = dict(stacks or {})
+
+    def __len__(self) -> int:
+        return len(self.stacks)
+
+    def get(self, stack_name: str) -> NodeData:
+        """The instance for a stack, created with only its name if the stack is not known."""
+        stack = self.stacks.get(stack_name)
+        if stack is None:
+            stack = self.stacks[stack_name] = NodeData(stack_name=stack_name)
+        return stack
+
+    @classmethod
+    def from_list_stacks(cls, cfn_client: CloudFormationClient | None = None) -> StackCache:
+        """Resolve the id of every stack in the account with a single paged listing of its stacks.
+
+        Deleted stacks are left out, their names may have been reused. If stacks cannot be listed, ex. the caller
+        is not allowed to, the cache starts empty and stacks are only known by name.
+
+        Args:
+            cfn_client: A Boto3 CloudFormation client instance.
+                If not provided, a new client will be created.
+
+        Returns:
+            The cache, holding an instance with the name and id of each stack.
+        """
+        cfn_client = cfn_client or boto3.client('cloudformation')
+
+        stacks: dict[str, NodeData] = {}
+        try:
+            resp = cfn_client.list_stacks(StackStatusFilter=UNDELETED_STACK_STATUSES)
+            while True:
+                log.debug(resp)
+                for stack_summary in resp['StackSummaries']:
+                    # stand-ins for a client may not filter on status
+                    if stack_summary.get('StackStatus') != 'DELETE_COMPLETE':
+                        stacks[stack_summary['StackName']] = NodeData.from_stack_summary(stack_summary)
+                if not (token := resp.get('NextToken')):
+                    break
+                resp = cfn_client.list_stacks(NextToken=token, StackStatusFilter=UNDELETED_STACK_STATUSES)
+        except ClientError as err:
+            log.warning('unable to list stacks, importing stacks are only known by name: %s', err)
+            return cls()
+        return cls(stacks)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+import networkx as nx
+
+try:
+    import rustworkx as rx  # type: ignore[import-not-found,unused-ignore]
+except ImportError:  # pragma: no cover
+    rx = None  # type: ignore[assignment,unused-ignore]
+
+try:
+    import igraph as ig  # type: ignore[import-not-found,import-untyped,unused-ignore]
+except ImportError:  # pragma: no cover
+    ig = None
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable
+
+log = getLogger(__name__)
+
+BACKENDS = ('networkx', 'rustworkx', 'igraph')
+
+
+class BackendNotAvailableError(Exception):
+    def __init__(self, message: str = 'An error occurred') -> None:
+        super().__init__(message)
+
+
+class GraphBackend:
+    """Runs the graph algorithms cycl relies on, with networkx.
+
+    Graphs are given as a number of nodes and pairs of node indices, so each backend only converts plain integers
+    into its own graph type. Backends built on compiled libraries override the algorithms they implement, any other
+    falls back to networkx. Every backend finds the same components, cycles and generations, in any order.
+    """
+
+    name = 'networkx'
+
+    @staticmethod
+    def _nx_graph(node_count: int, pairs: list[tuple[int, int]]) -> nx.DiGraph:
+        graph: nx.DiGraph = nx.DiGraph()
+        graph.add_nodes_from(range(node_count))
+        graph.add_edges_from(pairs)
+        return graph
+
+    def strongly_connected_components(self, node_count: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+        return [list(scc) for scc in nx.strongly_connected_components(self._nx_graph(node_count, pairs))]
+
+    def simple_cycles(
+        self, node_count: int, pairs: list[tuple[int, int]], length_bound: int | None = None
+    ) -> Iterable[list[int]]:
+        return nx.simple_cycles(self._nx_graph(node_count, pairs), length_bound=length_bound)
+
+    def is_acyclic(self, node_count: int, pairs: list[tuple[int, int]]) -> bool:
+        return nx.is_directed_acyclic_graph(self._nx_graph(node_count, pairs))
+
+    def topological_generations(self, node_count: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+        """Raises ``networkx.NetworkXUnfeasible`` if the graph is cyclic, whichever the backend."""
+        return [list(generation) for generation in nx.topological_generations(self._nx_graph(node_count, pairs))]
+
+
+class _RustworkxBackend(GraphBackend):
+    name = 'rustworkx'
+
+    def _graph(self, node_count: int, pairs: list[tuple[int, int]]) -> Any:  # noqa: ANN401
+        graph = rx.PyDiGraph(multigraph=False)
+        graph.add_nodes_from(range(node_count))
+        graph.extend_from_edge_list(pairs)
+        return graph
+
+    def strongly_connected_components(self, node_count: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+        return [list(scc) for scc in rx.strongly_connected_components(self._graph(node_count, pairs))]
+
+    def simple_cycles(
+        self, node_count: int, pairs: list[tuple[int, int]], length_bound: int | None = None
+    ) -> Iterable[list[int]]:
+        if length_bound is not None:
+            # rustworkx can not prune the search by length, which is what keeps it feasible on dense components
+            return super().simple_cycles(node_count, pairs, length_bound)
+        return (list(cycle) for cycle in rx.simple_cycles(self._graph(node_count, pairs)))
+
+    def is_acyclic(self, node_count: int, pairs: list[tuple[int, int]]) -> bool:
+        return bool(rx.is_directed_acyclic_graph(self._graph(node_count, pairs)))
+
+    def topological_generations(self, node_count: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+        try:
+            return [list(generation) for generation in rx.topological_generations(self._graph(node_count, pairs))]
+        except rx.DAGHasCycle as err:
+            err_msg = 'graph contains a cycle'
+            raise nx.NetworkXUnfeasible(err_msg) from err
+
+
+class _IgraphBackend(GraphBackend):
+    # simple cycles are left to networkx, igraph 1.0 misses some cycles of strongly connected components
+    name = 'igraph'
+
+    def _graph(self, node_count: int, pairs: list[tuple[int, int]]) -> Any:  # noqa: ANN401
+        return ig.Graph(n=node_count, edges=pairs, directed=True)
+
+    def strongly_connected_components(self, node_count: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+        return [list(scc) for scc in self._graph(node_count, pairs).connected_components(mode='strong')]
+
+    def is_acyclic(self, node_count: int, pairs: list[tuple[int, int]]) -> bool:
+        return bool(self._graph(node_count, pairs).is_dag())
+
+    def topological_generations(self, node_count: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+        graph = self._graph(node_count, pairs)
+        if not graph.is_dag():
+            err_msg = 'graph contains a cycle'
+            raise nx.NetworkXUnfeasible(err_msg)
+        # igraph sorts topologically, each node is a generation after the latest of its predecessors
+        predecessors = graph.get_adjlist(mode='in')
+        generation_of = [0] * node_count
+        generations: list[list[int]] = []
+        for node in graph.topological_sorting():
+            generation = max((generation_of[predecessor] + 1 for predecessor in predecessors[node]), default=0)
+            generation_of[node] = generation
+            if generation == len(generations):
+                generations.append([])
+            generations[generation].append(node)
+        return generations
+
+
+_BACKEND_TYPES: dict[str, tuple[type[GraphBackend], Any]] = {
+    'networkx': (GraphBackend, nx),
+    'rustworkx': (_RustworkxBackend, rx),
+    'igraph': (_IgraphBackend, ig),
+}
+
+
+def available_backends() -> list[str]:
+    """The names of the backends whose library is installed, in order of preference."""
+    return [name for name in BACKENDS if _BACKEND_TYPES[name][1] is not None]
+
+
+def get_backend(name: str | None = None) -> GraphBackend:
+    """Get a graph algorithm backend by name.
+
+    Args:
+        name: One of ``BACKENDS``, or None or ``auto`` for the fastest installed backend. rustworkx is preferred,
+            then igraph, falling back to networkx.
+
+    Returns:
+        The backend.
+
+    Raises:
+        BackendNotAvailableError: If the library of the backend is not installed.
+        ValueError: If the backend is unknown.
+    """
+    if name in (None, 'auto'):
+        name = next((name for name in ('rustworkx', 'igraph') if _BACKEND_TYPES[name][1] is not None), 'networkx')
+    if name not in _BACKEND_TYPES:
+        err_msg = f'backend must be one of {BACKENDS}, not {name!r}'
+        raise ValueError(err_msg)
+    backend_type, library = _BACKEND_TYPES[name]
+    if library is None:
+        err_msg = f'the {name} backend requires {name} to be installed, ex. pip install cycl[{name}]'
+        raise BackendNotAvailableError(err_msg)
+    return backend_type()
+
+
+def index_graph(graph: nx.DiGraph) -> tuple[list[Hashable], list[tuple[int, int]]]:
+    """Number the nodes of a graph in order of their string form, and list its distinct edges as pairs of numbers.
+
+    Args:
+        graph: A dependency graph, as built by ``build_graph``.
+
+    Returns:
+        The nodes, and the sorted pairs of indices into them of each edge. Parallel edges are listed once.
+    """
+    nodes = sorted(graph, key=str)
+    index = {node: idx for idx, node in enumerate(nodes)}
+    return nodes, sorted({(index[u], index[v]) for u, v in graph.edges()})
+
+
+def is_acyclic(graph: nx.DiGraph, backend: GraphBackend | None = None) -> bool:
+    """Whether a graph has no cycle, including self loops, see ``nx.is_directed_acyclic_graph``."""
+    nodes, pairs = index_graph(graph)
+    return (backend or get_backend()).is_acyclic(len(nodes), pairs)
+
+
+def topological_generations(graph: nx.DiGraph, backend: GraphBackend | None = None) -> list[list[Hashable]]:
+    """Group the nodes of an acyclic graph into generations, see ``nx.topological_generations``.
+
+    Args:
+        graph: An acyclic dependency graph.
+        backend: The backend to run on, by default the fastest installed backend.
+
+    Returns:
+        The generations in order. Nodes within a generation are in no particular order.
+
+    Raises:
+        networkx.NetworkXUnfeasible: If the graph is cyclic.
+    """
+    nodes, pairs = index_graph(graph)
+    generations = (backend or get_backend()).topological_generations(len(nodes), pairs)
+    return [[nodes[node] for node in generation] for generation in generations]
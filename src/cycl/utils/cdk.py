@@ -1,20 +1,38 @@
 from __future__ import annotations
 
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from logging import getLogger
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from cycl.models.node_data import NodeData
+from cycl.utils.intrinsics import UNRESOLVED, IntrinsicResolver, get_pseudo_parameters
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover
+    yaml = None  # type: ignore[assignment]
 
 log = getLogger(__name__)
 
+TEMPLATE_PATTERNS = ('*.template.json', '*.template.yaml', '*.template.yml')
+YAML_SUFFIXES = ('.yaml', '.yml')
+
+# below this many bytes of templates, starting worker processes costs more than parsing serially
+PARALLEL_PARSE_THRESHOLD = 1024 * 1024
+
 
 class InvalidCdkOutPathError(Exception):
     def __init__(self, message: str = 'An error occurred') -> None:
         super().__init__(message)
 
 
-def __find_import_values(data: dict) -> list[str]:
+def __find_import_values(data: dict) -> list[Any]:
     """Recursively search for all 'Fn::ImportValue' keys and return their values."""
     results = []
 
@@ -32,15 +50,106 @@ def __find_import_values(data: dict) -> list[str]:
     return results
 
 
-def __get_import_values_from_template(file_path: Path) -> list[str]:
-    """todo: handle yaml templates too."""
+if yaml is not None:
+    # the libyaml bindings are an order of magnitude faster, but are only available if pyyaml was built against it
+    _BaseLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+    class TemplateLoader(_BaseLoader):  # type: ignore[valid-type,misc]
+        """Safe YAML loader which understands the CloudFormation short-form intrinsic function tags."""
+
+    def __construct_intrinsic(loader: yaml.Loader, tag_suffix: str, node: yaml.Node) -> dict[str, Any]:
+        """Convert a short-form tag (``!ImportValue x``) into its long form (``{'Fn::ImportValue': x}``)."""
+        value: Any = None
+        if isinstance(node, yaml.SequenceNode):
+            value = loader.construct_sequence(node, deep=True)
+        elif isinstance(node, yaml.MappingNode):
+            value = loader.construct_mapping(node, deep=True)
+        elif isinstance(node, yaml.ScalarNode):
+            value = loader.construct_scalar(node)
+
+        if tag_suffix in ('Ref', 'Condition'):
+            return {tag_suffix: value}
+        if tag_suffix == 'GetAtt' and isinstance(value, str):
+            value = value.split('.', 1)
+        return {f'Fn::{tag_suffix}': value}
+
+    TemplateLoader.add_multi_constructor('!', __construct_intrinsic)
+
+
+def __find_export_declarations(template: dict[str, Any]) -> list[tuple[Any, Any]]:
+    """Find the name and value of every output which is exported, either may be an intrinsic function."""
+    outputs = template.get('Outputs')
+    if not isinstance(outputs, dict):
+        return []
+    return [
+        (output['Export']['Name'], output.get('Value'))
+        for output in outputs.values()
+        if isinstance(output, dict) and isinstance(output.get('Export'), dict) and 'Name' in output['Export']
+    ]
+
+
+def __scan_template(file_path: Path) -> tuple[list[Any], list[tuple[Any, Any]], dict[str, Any]]:
+    """Load a JSON or YAML template, finding its imported export names and its exports in a single pass.
+
+    The values may be intrinsic functions, so the sections needed to resolve them are returned alongside.
+    """
     with Path.open(file_path) as f:
-        json_data = json.load(f)
-    return __find_import_values(json_data)
+        template = yaml.load(f, Loader=TemplateLoader) if file_path.suffix in YAML_SUFFIXES else json.load(f)
+    template = template if isinstance(template, dict) else {}
+    resolver_context = {section: template[section] for section in ('Parameters', 'Mappings') if section in template}
+    return __find_import_values(template), __find_export_declarations(template), resolver_context
 
 
-def __get_stack_name_from_manifest(path_to_manifest: Path, template_file_name: str) -> str:
-    """Grabs the stack name, if set, or parses stack name from the displayName (construct id) of the stack."""
+def __find_templates(cdk_out_path: Path) -> list[Path]:
+    templates = sorted(template for pattern in TEMPLATE_PATTERNS for template in cdk_out_path.rglob(pattern))
+    if yaml is None and any(template.suffix in YAML_SUFFIXES for template in templates):
+        log.warning('found yaml templates, but pyyaml is not installed so they will be skipped: pip install cycl[yaml]')
+        templates = [template for template in templates if template.suffix not in YAML_SUFFIXES]
+    return templates
+
+
+def __parse_templates(
+    templates: list[Path], max_workers: int | None = None
+) -> Iterator[tuple[list[Any], list[tuple[Any, Any]], dict[str, Any]]]:
+    """Parse templates in worker processes when there are enough of them to be worth it, preserving order."""
+    total_size = sum(template.stat().st_size for template in templates)
+    workers = min(max_workers or os.cpu_count() or 1, len(templates))
+    if workers <= 1 or total_size < PARALLEL_PARSE_THRESHOLD:
+        yield from map(__scan_template, templates)
+        return
+
+    log.info('parsing %s templates (%s bytes) with %s workers', len(templates), total_size, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(__scan_template, templates, chunksize=max(1, len(templates) // workers))
+
+
+def __scan_templates(
+    templates: list[Path],
+    max_workers: int | None = None,
+    template_cache: dict[Path, tuple[tuple[int, int], Any]] | None = None,
+) -> Iterable[tuple[list[Any], list[tuple[Any, Any]], dict[str, Any]]]:
+    """Scan templates, only parsing those which changed since they were cached when a cache is given."""
+    if template_cache is None:
+        return __parse_templates(templates, max_workers)
+
+    stat_keys = {}
+    for template in templates:
+        stat = template.stat()
+        stat_keys[template] = (stat.st_mtime_ns, stat.st_size)
+    stale = [template for template in templates if template_cache.get(template, (None,))[0] != stat_keys[template]]
+    log.info('%s of %s templates changed since they were cached', len(stale), len(templates))
+    for template, scanned in zip(stale, __parse_templates(stale, max_workers)):
+        template_cache[template] = (stat_keys[template], scanned)
+    for template in set(template_cache) - set(stat_keys):
+        del template_cache[template]
+    return [template_cache[template][1] for template in templates]
+
+
+def __get_artifact_from_manifest(path_to_manifest: Path, template_file_name: str) -> dict[str, Any]:
+    """Finds the manifest artifact of the stack which was synthesized into the template."""
+    if not path_to_manifest.exists():
+        log.warning('No manifest found for %s', template_file_name)
+        return {}
     with Path.open(path_to_manifest) as f:
         json_data = json.load(f)
 
@@ -48,14 +157,49 @@ def __get_stack_name_from_manifest(path_to_manifest: Path, template_file_name: s
     artifact = json_data['artifacts'].get(artifact_id)
     if not artifact:
         log.warning('No artifact found in manifest for %s', template_file_name)
-        return ''
+        return {}
+    return artifact
+
 
+def __get_stack_name_from_artifact(artifact: dict[str, Any]) -> str:
+    """Grabs the stack name, if set, or parses stack name from the displayName (construct id) of the stack."""
     stack_name = artifact.get('properties', {}).get('stackName')
     display_name_split = artifact.get('displayName', '').split('/')[-1]
     return stack_name or display_name_split
 
 
-def __validate_cdk_out_path(cdk_out_path: Path) -> Path:
+def __get_stack_name_from_template_file(template_file: Path) -> str:
+    """Parses the stack name from a template file named like ``<stack name>.template.yaml``."""
+    return template_file.name.removesuffix(template_file.suffix).removesuffix('.template')
+
+
+def __get_stack_of_template(template_file: Path) -> tuple[dict[str, Any], str]:
+    """Finds the manifest artifact and name of the stack which was synthesized into the template."""
+    manifest_path = template_file.parent / 'manifest.json'
+    log.info('looking in manifest: %s', manifest_path)
+    artifact = __get_artifact_from_manifest(manifest_path, template_file.name)
+    stack_name = __get_stack_name_from_artifact(artifact)
+    if not stack_name and not artifact and template_file.suffix in YAML_SUFFIXES:
+        # yaml templates are often written by hand rather than synthesized, so they may not have an artifact
+        stack_name = __get_stack_name_from_template_file(template_file)
+    return artifact, stack_name
+
+
+def __get_environment_from_artifact(artifact: dict[str, Any]) -> tuple[str | None, str | None]:
+    """Parses the account and region from an environment like ``aws://123456789012/us-east-1``, if they are known."""
+    account_id, _, region = artifact.get('environment', '').removeprefix('aws://').partition('/')
+    return (
+        None if account_id in ('', 'unknown-account') else account_id,
+        None if region in ('', 'unknown-region') else region,
+    )
+
+
+def validate_cdk_out_path(cdk_out_path: Path) -> Path:
+    """Resolve the path to cdk.out/, given it or the directory containing it.
+
+    Raises:
+        InvalidCdkOutPathError: If the path is not a directory, or doesn't contain a synthesized cloud assembly.
+    """
     cdk_out_path = Path(cdk_out_path).resolve()
     if not cdk_out_path.exists() or not cdk_out_path.is_dir():
         err_msg = f'Provided path does not exist or is not a directory: {cdk_out_path}'
@@ -72,35 +216,125 @@ def __validate_cdk_out_path(cdk_out_path: Path) -> Path:
     return cdk_out_path
 
 
-def get_exports_from_assembly(cdk_out_path: Path) -> dict[str, list[NodeData]]:
-    """Map an export name to a list of stacks which import it from the cloud assembly.
+def get_template_paths(cdk_out_path: Path) -> list[Path]:
+    """Find the templates in the cloud assembly which ``get_assembly_data`` reads.
+
+    Args:
+        cdk_out_path: Path to cdk.out/, or the directory containing it.
 
-    function does not take into consideration exports defined in the assembly
-        - if we found an export, we may not be able to resolve the name of it
-        - AWS has built in circular dependency detection inside of a stack
-        - a circular dependency couldn't be introduced in a single deployment
+    Returns:
+        The paths of the templates, sorted.
     """
-    cdk_out_path = __validate_cdk_out_path(cdk_out_path)
+    return __find_templates(validate_cdk_out_path(cdk_out_path))
 
-    stack_import_mapping: dict[str, list[NodeData]] = {}
-    for template_file in cdk_out_path.rglob('*.template.json'):
+
+def get_stack_templates(cdk_out_path: Path) -> dict[str, Path]:
+    """Find the template of each stack in the cloud assembly, templates whose stack name is unknown are skipped.
+
+    Args:
+        cdk_out_path: Path to cdk.out/, or the directory containing it.
+
+    Returns:
+        A dictionary mapping stack names to the path of their template.
+    """
+    stack_templates = {}
+    for template_file in get_template_paths(cdk_out_path):
+        _, stack_name = __get_stack_of_template(template_file)
+        if stack_name:
+            stack_templates[stack_name] = template_file
+    return stack_templates
+
+
+def get_assembly_data(
+    cdk_out_path: Path,
+    max_workers: int | None = None,
+    known_export_names: Iterable[str] | None = None,
+    template_cache: dict[Path, tuple[tuple[int, int], Any]] | None = None,
+) -> tuple[dict[str, NodeData], dict[str, list[NodeData]]]:
+    """Find the exports declared in the cloud assembly and the stacks which import each export name.
+
+    Every template is read once, collecting both its imports and its exports (``Outputs[*].Export.Name``). Both
+    ``*.template.json`` and ``*.template.yaml`` (or ``.yml``) templates are read, the latter requires pyyaml. A yaml
+    template without an artifact in the manifest is named after its file, ``<stack name>.template.yaml``.
+    Large assemblies are parsed by up to ``max_workers`` processes, which defaults to the number of CPUs.
+
+    Export and imported export names built with intrinsic functions (``Fn::Sub``, ``Fn::Join``, ...) are resolved
+    against the template's parameters and the pseudo parameters known from the manifest. Parts of imported names
+    which can only be known after deployment are matched against ``known_export_names`` and the exports declared
+    in the assembly, imports which remain ambiguous are skipped.
+
+    Args:
+        cdk_out_path: Path to cdk.out/, or the directory containing it.
+        max_workers: The maximum number of processes used to parse templates.
+        known_export_names: Names of exports which are already deployed.
+        template_cache: Parsed templates, keyed by path, which is updated in place. Templates whose modification
+            time and size are unchanged since they were cached are not parsed again.
+
+    Returns:
+        A tuple of the exports declared in the assembly, mapping export name to NodeData without importing stacks,
+        and a dictionary mapping export names to the NodeData of each stack in the assembly which imports it.
+    """
+    cdk_out_path = validate_cdk_out_path(cdk_out_path)
+
+    templates = __find_templates(cdk_out_path)
+    stacks: list[tuple[str, list[Any], IntrinsicResolver]] = []
+    assembly_exports: dict[str, NodeData] = {}
+    for template_file, (import_values, export_declarations, resolver_context) in zip(
+        templates, __scan_templates(templates, max_workers, template_cache)
+    ):
         log.info('Processing template: %s', template_file)
-        imported_export_names = __get_import_values_from_template(template_file)
-
-        log.info('found imported export names: %s', imported_export_names)
-        if imported_export_names:
-            manifest_path = template_file.parent / 'manifest.json'
-            log.info('looking in manifest: %s', manifest_path)
-            stack_name = __get_stack_name_from_manifest(manifest_path, template_file.name)
-            if not stack_name:
-                log.warning('unable to determine stack name for template: %s', template_file.name)
+        log.info('found %s imported and %s exported names', len(import_values), len(export_declarations))
+        if not import_values and not export_declarations:
+            continue
+
+        artifact, stack_name = __get_stack_of_template(template_file)
+        if not stack_name:
+            log.warning('unable to determine stack name for template: %s', template_file.name)
+            continue
+        log.info('stack name found: %s', stack_name)
+
+        account_id, region = __get_environment_from_artifact(artifact)
+        resolver = IntrinsicResolver(
+            resolver_context,
+            pseudo_parameters=get_pseudo_parameters(stack_name=stack_name, account_id=account_id, region=region),
+        )
+        for name_expression, value_expression in export_declarations:
+            export_name = resolver.resolve_export_name(name_expression)
+            if export_name is None:
+                continue
+            export_value = resolver.resolve(value_expression)
+            assembly_exports[export_name] = NodeData(
+                stack_name=stack_name,
+                export_name=export_name,
+                export_value=export_value if isinstance(export_value, str) and UNRESOLVED not in export_value else None,
+            )
+        stacks.append((stack_name, import_values, resolver))
+
+    # imports are resolved once every template has been read, so they can match exports declared in any of them
+    sorted_export_names = sorted({*(known_export_names or []), *assembly_exports})
+    stack_import_mapping: dict[str, list[NodeData]] = {}
+    for stack_name, import_values, resolver in stacks:
+        resolver.known_export_names = sorted_export_names
+        for import_value in import_values:
+            export_name = resolver.resolve_export_name(import_value)
+            if export_name is None:
                 continue
-            log.info('stack name found: %s', stack_name)
-            for export_name in imported_export_names:
-                stack_import_mapping.setdefault(export_name, []).append(
-                    NodeData(
-                        stack_name=stack_name,
-                        export_name=export_name,
-                    )
+            stack_import_mapping.setdefault(export_name, []).append(
+                NodeData(
+                    stack_name=stack_name,
+                    export_name=export_name,
                 )
-    return stack_import_mapping
+            )
+    return assembly_exports, stack_import_mapping
+
+
+def get_exports_from_assembly(
+    cdk_out_path: Path,
+    max_workers: int | None = None,
+    known_export_names: Iterable[str] | None = None,
+) -> dict[str, list[NodeData]]:
+    """Map an export name to a list of stacks which import it from the cloud assembly.
+
+    See ``get_assembly_data``, which also returns the exports declared in the assembly.
+    """
+    return get_assembly_data(cdk_out_path, max_workers=max_workers, known_export_names=known_export_names)[1]
@@ -1,7 +1,49 @@
+from __future__ import annotations
+
 from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+import boto3
+from botocore.config import Config
+from botocore.session import Session
+
+if TYPE_CHECKING:
+    from mypy_boto3_cloudformation import CloudFormationClient
 
 log = getLogger(__name__)
 
+# list_imports is called once per export and is latency bound, so several calls run at once
+IMPORT_FETCH_WORKERS = 8
+# describe_stack_events is called once per stack, for the same reason
+STACK_EVENT_FETCH_WORKERS = 8
+
+
+def get_cfn_client(
+    aws_session: Session | None = None,
+    aws_profile_name: str | None = None,
+    endpoint_url: str | None = None,
+) -> CloudFormationClient:
+    """Create a CloudFormation client which retries throttled calls.
+
+    Args:
+        aws_session: Session used to create the client.
+        aws_profile_name: AWS profile name used to create the client, when no session is given.
+        endpoint_url: CloudFormation endpoint the client calls, ex. a ``LocalCloudFormationServer``.
+
+    Returns:
+        The CloudFormation client.
+    """
+    # profile and session should not be able to be provided
+    boto_config = Config(retries={'max_attempts': 10, 'mode': 'adaptive'})
+    kwargs: dict[str, Any] = {'config': boto_config}
+    if endpoint_url:
+        kwargs['endpoint_url'] = endpoint_url
+    if aws_session:
+        return aws_session.client('cloudformation', **kwargs)  # type: ignore[attr-defined,no-any-return]
+    if aws_profile_name:
+        return Session(profile_name=aws_profile_name).client('cloudformation', **kwargs)  # type: ignore[attr-defined,call-arg,no-any-return]
+    return boto3.client('cloudformation', **kwargs)
+
 
 def parse_name_from_id(stack_id: str) -> str:
     """Extract the stack name from a given stack ID.
@@ -21,3 +63,20 @@ def parse_name_from_id(stack_id: str) -> str:
     except IndexError:
         log.warning('Unable to parse stack_name from stack_id: %s', stack_id)
         return ''
+
+
+def parse_account_from_id(stack_id: str) -> str:
+    """Extract the account id from a given stack ID.
+
+    Args:
+        stack_id: The full stack ID, typically in the format
+            'arn:aws:cloudformation:region:account-id:stack/stack-name/guid'.
+
+    Returns:
+        The extracted account id, or an empty string if parsing fails.
+    """
+    parts = stack_id.split(':')
+    if len(parts) < 6:  # noqa: PLR2004 - the number of fields in an arn
+        log.debug('Unable to parse account id from stack_id: %s', stack_id)
+        return ''
+    return parts[4]
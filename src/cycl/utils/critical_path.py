@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+import networkx as nx
+from botocore.exceptions import ClientError
+
+from cycl.utils.cfn import STACK_EVENT_FETCH_WORKERS, get_cfn_client
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable
+
+    from mypy_boto3_cloudformation import CloudFormationClient
+
+log = getLogger(__name__)
+
+# cached deploy durations older than this are fetched again
+DURATION_CACHE_TTL = timedelta(days=1)
+
+_DEPLOY_STARTED = frozenset({'CREATE_IN_PROGRESS', 'UPDATE_IN_PROGRESS'})
+_DEPLOY_COMPLETED = frozenset({'CREATE_COMPLETE', 'UPDATE_COMPLETE'})
+
+
+class StackTiming(NamedTuple):
+    """When a stack can deploy, in seconds from the start of a rollout where every stack deploys as early as it can."""
+
+    duration: float
+    earliest_start: float
+    latest_start: float  # the latest start which does not delay the rollout
+
+    @property
+    def slack(self) -> float:
+        """How long the deploy of the stack can be delayed without delaying the rollout."""
+        return self.latest_start - self.earliest_start
+
+
+class CriticalPath(NamedTuple):
+    """The chain of dependencies which limits how fast every stack can be deployed."""
+
+    path: list[Hashable]
+    duration: float
+    timings: dict[Hashable, StackTiming]
+
+
+def critical_path(graph: nx.DiGraph, durations: dict[str, float], default_duration: float = 0.0) -> CriticalPath:
+    """Find the longest path through a dependency graph, weighted by how long each stack takes to deploy.
+
+    Exporting stacks deploy before the stacks which import from them, so a rollout takes at least as long as the
+    longest path. Nodes are visited once in topological order to find the earliest start of each stack, then once in
+    reverse to find its latest start, so the search is linear in the size of the graph.
+
+    Args:
+        graph: An acyclic dependency graph, as built by ``build_graph``.
+        durations: The deploy duration of each stack in seconds, by node.
+        default_duration: The deploy duration of stacks missing from ``durations``.
+
+    Returns:
+        The critical path, its duration and the timing of every stack. Stacks on the critical path have no slack.
+
+    Raises:
+        networkx.NetworkXUnfeasible: If the graph is cyclic.
+    """
+    order = list(nx.topological_sort(graph))
+    missing = [node for node in order if str(node) not in durations]
+    if missing:
+        log.warning('%s of %s stacks have no deploy duration, using %ss', len(missing), len(order), default_duration)
+    duration = {node: durations.get(str(node), default_duration) for node in order}
+
+    earliest_start: dict[Hashable, float] = {}
+    critical_predecessor: dict[Hashable, Hashable] = {}
+    for node in order:
+        earliest_start[node] = 0.0
+        for predecessor in graph.predecessors(node):
+            start = earliest_start[predecessor] + duration[predecessor]
+            if start > earliest_start[node]:
+                earliest_start[node] = start
+                critical_predecessor[node] = predecessor
+    total = max((earliest_start[node] + duration[node] for node in order), default=0.0)
+
+    latest_start: dict[Hashable, float] = {}
+    for node in reversed(order):
+        latest_finish = min((latest_start[successor] for successor in graph.successors(node)), default=total)
+        latest_start[node] = latest_finish - duration[node]
+
+    path: list[Hashable] = []
+    if order:
+        # of the stacks which finish last, the path ends at the one deployed last
+        node = max(reversed(order), key=lambda node: earliest_start[node] + duration[node])
+        path.append(node)
+        while node in critical_predecessor:
+            node = critical_predecessor[node]
+            path.append(node)
+        path.reverse()
+    timings = {node: StackTiming(duration[node], earliest_start[node], latest_start[node]) for node in order}
+    return CriticalPath(path, total, timings)
+
+
+def load_durations(path: Path) -> dict[str, float]:
+    """Load the deploy duration of each stack, a JSON object of stack names to seconds."""
+    durations = json.loads(Path(path).read_text())
+    return {str(stack_name): float(seconds) for stack_name, seconds in durations.items()}
+
+
+def get_deploy_duration(stack_name: str, cfn_client: CloudFormationClient) -> float | None:
+    """Find how long the last successful create or update of a stack took, from its events.
+
+    Events are listed newest first, so paging stops as soon as the start of the last successful deploy is found.
+
+    Args:
+        stack_name: The name of the stack.
+        cfn_client: A Boto3 CloudFormation client instance.
+
+    Returns:
+        The duration in seconds, or None if the stack does not exist or never deployed successfully.
+    """
+    completed_at = None
+    try:
+        resp = cfn_client.describe_stack_events(StackName=stack_name)
+        while True:
+            for event in resp['StackEvents']:
+                if event.get('ResourceType') != 'AWS::CloudFormation::Stack' or event.get('LogicalResourceId') != stack_name:
+                    continue  # an event of a resource, not of the stack
+                status = event.get('ResourceStatus', '')
+                if completed_at is None and status in _DEPLOY_COMPLETED:
+                    completed_at = event['Timestamp']
+                elif completed_at is not None and status in _DEPLOY_STARTED:
+                    return (completed_at - event['Timestamp']).total_seconds()
+            if not (token := resp.get('NextToken')):
+                break
+            resp = cfn_client.describe_stack_events(StackName=stack_name, NextToken=token)
+    except ClientError as err:
+        if 'does not exist' not in repr(err):
+            raise
+    log.debug('no successful deploy found for %s', stack_name)
+    return None
+
+
+def __load_cache(cache_path: Path | None) -> dict[str, dict]:
+    if cache_path is None or not cache_path.exists():
+        return {}
+    try:
+        return dict(json.loads(cache_path.read_text()))
+    except (ValueError, TypeError):
+        log.warning('ignoring unreadable deploy duration cache: %s', cache_path)
+        return {}
+
+
+def __is_fresh(entry: object, now: datetime) -> bool:
+    """Whether a cached duration was fetched less than ``DURATION_CACHE_TTL`` ago, malformed entries are not."""
+    if not isinstance(entry, dict) or 'seconds' not in entry:
+        return False
+    try:
+        fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        return now - fetched_at <= DURATION_CACHE_TTL
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def get_deploy_durations(
+    stack_names: Iterable[str],
+    cfn_client: CloudFormationClient | None = None,
+    cache_path: Path | None = None,
+    max_workers: int = STACK_EVENT_FETCH_WORKERS,
+) -> dict[str, float]:
+    """Find the deploy duration of many stacks from their events, see ``get_deploy_duration``.
+
+    Events are fetched by a pool of threads. With a cache, durations fetched less than ``DURATION_CACHE_TTL`` ago are
+    reused, and the cache is updated with the durations fetched.
+
+    Args:
+        stack_names: The names of the stacks.
+        cfn_client: A Boto3 CloudFormation client instance. If not provided, a new client will be created.
+        cache_path: A JSON file the durations are cached in, created if it does not exist.
+        max_workers: The maximum number of stacks whose events are fetched at once.
+
+    Returns:
+        The duration in seconds of each stack which deployed successfully.
+    """
+    cfn_client = cfn_client or get_cfn_client()
+    cache_path = Path(cache_path) if cache_path is not None else None
+    cache = __load_cache(cache_path)
+    now = datetime.now(timezone.utc)
+
+    stack_names = list(dict.fromkeys(stack_names))
+    stale = [stack_name for stack_name in stack_names if not __is_fresh(cache.get(stack_name), now)]
+    if stale:
+        log.info('getting the deploy durations of %s stacks from their events', len(stale))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            seconds = executor.map(lambda stack_name: get_deploy_duration(stack_name, cfn_client), stale)
+            for stack_name, duration in zip(stale, seconds):
+                cache[stack_name] = {'seconds': duration, 'fetched_at': now.isoformat()}
+        if cache_path is not None:
+            cache_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+
+    return {
+        stack_name: cache[stack_name]['seconds'] for stack_name in stack_names if cache[stack_name]['seconds'] is not None
+    }
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import heapq
+from collections import Counter, deque
+from typing import TYPE_CHECKING
+
+import networkx as nx
+
+from cycl.utils.graph import edge_weights
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+
+class _EadesLinSmyth:
+    """Orders the nodes of a strongly connected component so the weight of edges pointing backwards is small.
+
+    Sinks are moved to the end and sources to the start of the order. When there are neither, the node whose
+    outgoing weight exceeds its incoming weight by the most is moved to the start. A lazy heap finds that node in
+    ``O(log n)``, entries made stale by later removals are skipped when popped.
+    """
+
+    def __init__(self, nodes: list[Hashable], weights: dict[tuple[Hashable, Hashable], int]) -> None:
+        self.successors: dict[Hashable, list[tuple[Hashable, int]]] = {node: [] for node in nodes}
+        self.predecessors: dict[Hashable, list[tuple[Hashable, int]]] = {node: [] for node in nodes}
+        self.out_weight: Counter[Hashable] = Counter()
+        self.in_weight: Counter[Hashable] = Counter()
+        for (u, v), weight in weights.items():
+            self.successors[u].append((v, weight))
+            self.predecessors[v].append((u, weight))
+            self.out_weight[u] += weight
+            self.in_weight[v] += weight
+
+        self.tiebreak = {node: idx for idx, node in enumerate(nodes)}
+        self.heap = [self._heap_entry(node) for node in nodes]
+        heapq.heapify(self.heap)
+        self.remaining = set(nodes)
+        self.sinks: deque[Hashable] = deque()
+        self.sources: deque[Hashable] = deque()
+
+    def _heap_entry(self, node: Hashable) -> tuple[int, int, Hashable]:
+        return self.in_weight[node] - self.out_weight[node], self.tiebreak[node], node
+
+    def _next(self) -> tuple[Hashable, bool]:
+        """Pick the next node to remove, and whether it goes to the start of the order."""
+        if self.sinks:
+            return self.sinks.popleft(), False
+        if self.sources:
+            return self.sources.popleft(), True
+        entry = heapq.heappop(self.heap)
+        return (entry[2] if entry == self._heap_entry(entry[2]) else None), True
+
+    def _remove(self, node: Hashable) -> None:
+        self.remaining.discard(node)
+        for neighbors, weight_of, queue in (
+            (self.successors[node], self.in_weight, self.sources),
+            (self.predecessors[node], self.out_weight, self.sinks),
+        ):
+            for neighbor, weight in neighbors:
+                if neighbor in self.remaining:
+                    weight_of[neighbor] -= weight
+                    if weight_of[neighbor] == 0:
+                        queue.append(neighbor)
+                    heapq.heappush(self.heap, self._heap_entry(neighbor))
+
+    def positions(self) -> dict[Hashable, int]:
+        """Map each node to its position in the order."""
+        start: list[Hashable] = []
+        end: list[Hashable] = []
+        while self.remaining:
+            node, at_start = self._next()
+            if node in self.remaining:
+                (start if at_start else end).append(node)
+                self._remove(node)
+        return {node: idx for idx, node in enumerate(start + end[::-1])}
+
+
+def suggest_cuts(graph: nx.DiGraph) -> list[tuple[Hashable, Hashable, int]]:
+    """Suggest a small set of edges which, once removed, leave the graph acyclic.
+
+    The graph is condensed into its strongly connected components and the Eades-Lin-Smyth heuristic for the minimum
+    feedback arc set is run on each cyclic component. Parallel edges are weighted by their multiplicity, the number
+    of imports between two stacks, so cuts prefer dependencies which are the least work to remove. The heuristic is
+    approximate but runs in ``O(m log n)``.
+
+    Args:
+        graph: A dependency graph, as built by ``build_graph``.
+
+    Returns:
+        The edges to cut as ``(u, v, multiplicity)`` tuples, ordered by component and then by node.
+    """
+    weights = edge_weights(graph)
+    condensed = nx.condensation(graph)
+    cuts: list[tuple[Hashable, Hashable, int]] = []
+    for scc in sorted(condensed.nodes, key=lambda scc: sorted(map(str, condensed.nodes[scc]['members']))):
+        members = sorted(condensed.nodes[scc]['members'], key=str)
+        scc_weights = {}
+        for u in members:
+            for v in graph.successors(u):
+                if u == v:
+                    cuts.append((u, v, weights[u, v]))
+                elif condensed.graph['mapping'][v] == scc:
+                    scc_weights[u, v] = weights[u, v]
+        if not scc_weights:
+            continue
+
+        position = _EadesLinSmyth(members, scc_weights).positions()
+        cuts.extend(
+            (u, v, weight)
+            for (u, v), weight in sorted(scc_weights.items(), key=lambda item: (str(item[0][0]), str(item[0][1])))
+            if position[u] > position[v]
+        )
+    return cuts
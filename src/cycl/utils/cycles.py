@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import os
+import sys
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import getLogger
+from typing import TYPE_CHECKING, NamedTuple, TypeVar
+
+from cycl.utils.backends import get_backend, index_graph
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterator
+
+    import networkx as nx
+
+log = getLogger(__name__)
+
+# below this many edges in a component, sending it to a worker process costs more than searching it in-process
+PARALLEL_SEARCH_THRESHOLD = 10_000
+
+_Node = TypeVar('_Node')
+
+
+def canonical_cycle(cycle: list[_Node]) -> list[_Node]:
+    """Rotate a cycle to start at its smallest node, nodes are compared by their string form."""
+    start = min(range(len(cycle)), key=lambda idx: str(cycle[idx]))
+    return cycle[start:] + cycle[:start]
+
+
+class _Component(NamedTuple):
+    """A strongly connected component, its nodes are sorted by string form and its edges index into them."""
+
+    nodes: list[Hashable]
+    edges: bytes  # pairs of little-endian u32 node indices
+    size: int  # number of edges
+
+
+def __to_component(nodes: list[Hashable], members: list[int], pairs: list[tuple[int, int]]) -> _Component:
+    """Renumber the edges of a component into its own members, which keeps them sorted."""
+    local = {node: idx for idx, node in enumerate(members)}
+    cells = array('I', [local[node] for pair in pairs for node in pair])
+    if sys.byteorder != 'little':
+        cells.byteswap()
+    return _Component([nodes[node] for node in members], cells.tobytes(), len(pairs))
+
+
+def __cyclic_components(graph: nx.DiGraph, backend: str) -> list[_Component]:
+    """The strongly connected components which contain a cycle, ordered by their smallest node."""
+    nodes, pairs = index_graph(graph)
+    sccs = get_backend(backend).strongly_connected_components(len(nodes), pairs)
+    component_of = [0] * len(nodes)
+    for idx, scc in enumerate(sccs):
+        for node in scc:
+            component_of[node] = idx
+    # a component contains a cycle when it has an edge within it, nodes are numbered by string form so the
+    # smallest member of a component is its first node
+    internal: dict[int, list[tuple[int, int]]] = {}
+    for u, v in pairs:
+        if component_of[u] == component_of[v]:
+            internal.setdefault(component_of[u], []).append((u, v))
+    components = [__to_component(nodes, sorted(sccs[idx]), internal[idx]) for idx in internal]
+    return sorted(components, key=lambda component: str(component.nodes[0]))
+
+
+def __search_component(edges: bytes, length_bound: int | None, backend: str) -> list[list[int]]:
+    """Find the canonical cycles of a component given as a compact edge list, so it is cheap to send to a worker.
+
+    Node indices follow the string order of the nodes, so canonicalizing and sorting indices orders nodes by string.
+    """
+    cells = array('I')
+    cells.frombytes(edges)
+    if sys.byteorder != 'little':
+        cells.byteswap()
+    # zipping one iterator with itself walks the flat list a pair at a time
+    pairs = iter(cells)
+    edge_list = list(zip(pairs, pairs))
+    cycles = get_backend(backend).simple_cycles(max(cells) + 1, edge_list, length_bound=length_bound)
+    return sorted(canonical_cycle(list(cycle)) for cycle in cycles)
+
+
+def __merge(
+    components: list[_Component],
+    futures: dict[int, Future[list[list[int]]]],
+    length_bound: int | None,
+    backend: str,
+) -> Iterator[list[Hashable]]:
+    """Yield the cycles of each component in order, waiting on workers or searching small components in-process."""
+    for idx, component in enumerate(components):
+        cycles = futures[idx].result() if idx in futures else __search_component(component.edges, length_bound, backend)
+        for cycle in cycles:
+            yield [component.nodes[node] for node in cycle]
+
+
+def iter_cycles(
+    graph: nx.DiGraph, max_length: int | None = None, max_workers: int | None = None, backend: str | None = None
+) -> Iterator[list[Hashable]]:
+    """Yield the simple cycles of a graph in canonical form, see ``find_cycles``.
+
+    Cycles are yielded one component at a time, so only the cycles of a single component are held in memory.
+    Components with at least ``PARALLEL_SEARCH_THRESHOLD`` edges are sent to worker processes, largest first,
+    while smaller components are searched in-process as the stream reaches them.
+    """
+    backend = get_backend(backend).name
+    components = __cyclic_components(graph, backend)
+    large = sorted(
+        (idx for idx, component in enumerate(components) if component.size >= PARALLEL_SEARCH_THRESHOLD),
+        key=lambda idx: -components[idx].size,
+    )
+    workers = min(max_workers or os.cpu_count() or 1, len(large))
+    if workers <= 1:
+        yield from __merge(components, {}, max_length, backend)
+        return
+
+    log.info('searching %s of %s components for cycles with %s workers', len(large), len(components), workers)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {idx: executor.submit(__search_component, components[idx].edges, max_length, backend) for idx in large}
+        yield from __merge(components, futures, max_length, backend)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def find_cycles(
+    graph: nx.DiGraph, max_length: int | None = None, max_workers: int | None = None, backend: str | None = None
+) -> list[list[Hashable]]:
+    """Find the simple cycles of a graph, optionally only those through at most ``max_length`` nodes.
+
+    Every cycle lies within a single strongly connected component, so each cyclic component is searched on its own.
+    With a bound, the search prunes paths as soon as they exceed it, which keeps it fast on dense components where
+    enumerating every cycle is infeasible. When the components are large enough, they are searched by up to
+    ``max_workers`` processes, which defaults to the number of CPUs.
+
+    Cycles are in a canonical form, so identical graphs always produce identical output. Each cycle starts at its
+    smallest node, components are ordered by their smallest node and the cycles of a component are sorted. Nodes are
+    compared by their string form.
+
+    Args:
+        graph: A dependency graph, as built by ``build_graph``.
+        max_length: The maximum number of nodes in a cycle, or None to find every cycle.
+        max_workers: The maximum number of processes used to search components.
+        backend: The graph algorithm backend the search runs on, see ``get_backend``. Every backend finds the same
+            cycles.
+
+    Returns:
+        The cycles as lists of nodes, grouped by component.
+    """
+    return list(iter_cycles(graph, max_length=max_length, max_workers=max_workers, backend=backend))
+
+
+def __assemble(
+    graph_components: list[list[_Component]],
+    futures: dict[tuple[tuple[Hashable, ...], bytes], Future[list[list[int]]]],
+    length_bound: int | None,
+    backend: str,
+) -> list[list[list[Hashable]]]:
+    """Collect the cycles of each graph, searching small components in-process while workers search large ones."""
+    searched: dict[tuple[tuple[Hashable, ...], bytes], list[list[int]]] = {}
+    results = []
+    for components in graph_components:
+        cycles: list[list[Hashable]] = []
+        for component in components:
+            key = (tuple(component.nodes), component.edges)
+            if key not in searched:
+                searched[key] = (
+                    futures[key].result() if key in futures else __search_component(key[1], length_bound, backend)
+                )
+            cycles.extend([component.nodes[node] for node in cycle] for cycle in searched[key])
+        results.append(cycles)
+    return results
+
+
+def find_cycles_batch(
+    graphs: list[nx.DiGraph], max_length: int | None = None, max_workers: int | None = None, backend: str | None = None
+) -> list[list[list[Hashable]]]:
+    """Find the simple cycles of many graphs, see ``find_cycles``, searching components they share only once.
+
+    Variants of a graph mostly share the same strongly connected components, so each distinct component is searched
+    once across every graph. Components with at least ``PARALLEL_SEARCH_THRESHOLD`` edges are searched by a single
+    pool of up to ``max_workers`` processes, largest first, while the rest are searched in-process.
+
+    Args:
+        graphs: Dependency graphs, as built by ``build_graph``.
+        max_length: The maximum number of nodes in a cycle, or None to find every cycle.
+        max_workers: The maximum number of processes used to search components.
+        backend: The graph algorithm backend the search runs on, see ``get_backend``.
+
+    Returns:
+        The cycles of each graph, in the order of ``graphs`` and in the canonical order of ``find_cycles``.
+    """
+    backend = get_backend(backend).name
+    graph_components = [__cyclic_components(graph, backend) for graph in graphs]
+    distinct: dict[tuple[tuple[Hashable, ...], bytes], _Component] = {}
+    for components in graph_components:
+        for component in components:
+            distinct.setdefault((tuple(component.nodes), component.edges), component)
+
+    large = sorted(
+        (key for key, component in distinct.items() if component.size >= PARALLEL_SEARCH_THRESHOLD),
+        key=lambda key: -distinct[key].size,
+    )
+    workers = min(max_workers or os.cpu_count() or 1, len(large))
+    if workers <= 1:
+        return __assemble(graph_components, {}, max_length, backend)
+
+    log.info('searching %s of %s distinct components for cycles with %s workers', len(large), len(distinct), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {key: executor.submit(__search_component, key[1], max_length, backend) for key in large}
+        return __assemble(graph_components, futures, max_length, backend)
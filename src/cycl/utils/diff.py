@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import networkx as nx
+
+from cycl.utils.graph import edge_weights
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterator
+
+
+class GraphDiff:
+    """Differences between two dependency graphs, as built by ``build_graph``."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        added_edges: dict[tuple[Hashable, Hashable], int] | None = None,
+        removed_edges: dict[tuple[Hashable, Hashable], int] | None = None,
+        merged_sccs: list[tuple[frozenset, list[frozenset]]] | None = None,
+        split_sccs: list[tuple[frozenset, list[frozenset]]] | None = None,
+        new_sccs: list[frozenset] | None = None,
+        resolved_sccs: list[frozenset] | None = None,
+        generation_shifts: dict[Hashable, tuple[int, int]] | None = None,
+    ) -> None:
+        self.added_edges = added_edges or {}
+        self.removed_edges = removed_edges or {}
+        self.merged_sccs = merged_sccs or []
+        self.split_sccs = split_sccs or []
+        self.new_sccs = new_sccs or []
+        self.resolved_sccs = resolved_sccs or []
+        self.generation_shifts = generation_shifts or {}
+
+    def __bool__(self) -> bool:
+        return any(vars(self).values())
+
+    def __repr__(self) -> str:
+        return f'GraphDiff({", ".join(f"{key}={len(value)}" for key, value in vars(self).items())})'
+
+    def report(self) -> Iterator[str]:
+        """Yield a compact, human readable report, one line per difference."""
+
+        def fmt(nodes: frozenset) -> str:
+            return f'[{", ".join(str(node) for node in sorted(nodes, key=str))}]'
+
+        for sign, edges in (('+', self.added_edges), ('-', self.removed_edges)):
+            for (u, v), count in sorted(edges.items(), key=str):
+                yield f'{sign} edge {u} -> {v}' + (f' (x{count})' if count > 1 else '')
+        for scc in sorted(self.new_sccs, key=fmt):
+            yield f'+ scc {fmt(scc)}'
+        for scc in sorted(self.resolved_sccs, key=fmt):
+            yield f'- scc {fmt(scc)}'
+        for scc, parts in sorted(self.merged_sccs, key=lambda x: fmt(x[0])):
+            yield f'merged scc {fmt(scc)} from {", ".join(sorted(fmt(part) for part in parts))}'
+        for scc, parts in sorted(self.split_sccs, key=lambda x: fmt(x[0])):
+            yield f'split scc {fmt(scc)} into {", ".join(sorted(fmt(part) for part in parts))}'
+        for node, (old_generation, new_generation) in sorted(self.generation_shifts.items(), key=str):
+            yield f'generation {node}: {old_generation} -> {new_generation}'
+
+
+def __cyclic_sccs(graph: nx.DiGraph) -> list[frozenset]:
+    """Strongly connected components which contain at least one cycle."""
+    return [
+        frozenset(scc)
+        for scc in nx.strongly_connected_components(graph)
+        if len(scc) > 1 or graph.has_edge(next(iter(scc)), next(iter(scc)))
+    ]
+
+
+def __generations(graph: nx.DiGraph) -> dict[Hashable, int]:
+    """Map each node to the topological generation of its strongly connected component.
+
+    Generations are computed on the condensation, so they are defined for cyclic graphs too.
+    """
+    condensed = nx.condensation(graph)
+    mapping = condensed.graph['mapping']
+    scc_generation = {
+        scc: generation for generation, sccs in enumerate(nx.topological_generations(condensed)) for scc in sccs
+    }
+    return {node: scc_generation[scc] for node, scc in mapping.items()}
+
+
+def __compare_sccs(
+    from_sccs: list[frozenset], to_sccs: list[frozenset]
+) -> tuple[list[tuple[frozenset, list[frozenset]]], list[frozenset]]:
+    """Find the SCCs of ``to_sccs`` overlapping several SCCs of ``from_sccs``, and those overlapping none."""
+    node_to_scc = {node: scc for scc in from_sccs for node in scc}
+    combined = []
+    unmatched = []
+    for scc in to_sccs:
+        overlapping = {node_to_scc[node] for node in scc if node in node_to_scc}
+        if len(overlapping) > 1:
+            combined.append((scc, list(overlapping)))
+        elif not overlapping:
+            unmatched.append(scc)
+    return combined, unmatched
+
+
+def diff_graphs(old_graph: nx.DiGraph, new_graph: nx.DiGraph) -> GraphDiff:
+    """Compute the differences between two dependency graphs.
+
+    Args:
+        old_graph: The earlier graph, as built by ``build_graph``.
+        new_graph: The later graph, as built by ``build_graph``.
+
+    Returns:
+        The edges which appeared or disappeared (with their multiplicity), the cyclic strongly connected
+        components which appeared, were resolved, merged, or split, and the nodes present in both graphs whose
+        topological generation shifted.
+
+    Note:
+        Every step is linear in the size of the graphs: edges are compared as hashed multisets and SCCs by their
+        condensation, so no cycles are enumerated.
+    """
+    old_edges = edge_weights(old_graph)
+    new_edges = edge_weights(new_graph)
+
+    old_sccs = __cyclic_sccs(old_graph)
+    new_sccs = __cyclic_sccs(new_graph)
+    merged_sccs, appeared_sccs = __compare_sccs(old_sccs, new_sccs)
+    split_sccs, resolved_sccs = __compare_sccs(new_sccs, old_sccs)
+
+    old_generations = __generations(old_graph)
+    new_generations = __generations(new_graph)
+    generation_shifts = {
+        node: (old_generation, new_generations[node])
+        for node, old_generation in old_generations.items()
+        if node in new_generations and new_generations[node] != old_generation
+    }
+
+    return GraphDiff(
+        added_edges=dict(new_edges - old_edges),
+        removed_edges=dict(old_edges - new_edges),
+        merged_sccs=merged_sccs,
+        split_sccs=split_sccs,
+        new_sccs=appeared_sccs,
+        resolved_sccs=resolved_sccs,
+        generation_shifts=generation_shifts,
+    )
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from typing import TYPE_CHECKING, Callable
+
+import networkx as nx
+from botocore.exceptions import ClientError
+
+from cycl.models.node_data import NodeData
+from cycl.utils.cdk import get_assembly_data
+from cycl.utils.cfn import IMPORT_FETCH_WORKERS, parse_name_from_id
+from cycl.utils.graph import selfloop_policy
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+    from pathlib import Path
+
+    from mypy_boto3_cloudformation import CloudFormationClient
+
+log = getLogger(__name__)
+
+
+class EdgeStore:
+    """Exports, and the stacks which import them, interned into flat integer tables.
+
+    Each distinct stack is stored once as a node, each export as the index of its exporting node, and the imports
+    between each pair of nodes are grouped into a compact array of export ids. Collected pages are added straight
+    to the tables, so an account is never held as a ``NodeData`` per export with a ``NodeData`` per import.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: list[NodeData] = []
+        self.node_ids: dict[NodeData, int] = {}
+        self.export_names: list[str] = []
+        self.export_ids: dict[str, int] = {}
+        # the exporting node of each export
+        self.exporters = array('I')
+        # the export ids behind the imports from one node to another, in the order they were added
+        self.pairs: dict[tuple[int, int], array] = {}
+        self._keys: dict[Callable[[NodeData], Hashable], list[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self.export_names)
+
+    def add_node(self, node: NodeData) -> int:
+        """Intern a node, returning its index."""
+        node_id = self.node_ids.get(node)
+        if node_id is None:
+            node_id = self.node_ids[node] = len(self.nodes)
+            self.nodes.append(node)
+        return node_id
+
+    def add_export(self, export_name: str, exporter: NodeData) -> int:
+        """Add an export of a node, returning its export id. An export which was already added keeps its exporter."""
+        export_id = self.export_ids.get(export_name)
+        if export_id is None:
+            export_id = self.export_ids[export_name] = len(self.export_names)
+            self.export_names.append(export_name)
+            self.exporters.append(self.add_node(exporter))
+        return export_id
+
+    def add_import(self, export_id: int, importer: NodeData) -> None:
+        """Add an import of an export by a node."""
+        pair = (self.exporters[export_id], self.add_node(importer))
+        if pair not in self.pairs:
+            self.pairs[pair] = array('I')
+        self.pairs[pair].append(export_id)
+
+    @classmethod
+    def from_graph_data(cls, graph_data: dict[str, NodeData]) -> EdgeStore:
+        """Index graph data, as returned by ``get_graph_data``. Each export is a node of its own."""
+        store = cls()
+        for export in graph_data.values():
+            export_id = store.add_export(export.export_name or '', export)
+            for importing_stack in export.importing_stacks:
+                store.add_import(export_id, importing_stack)
+        return store
+
+    @classmethod
+    def collect(cls, cfn_client: CloudFormationClient, max_workers: int = IMPORT_FETCH_WORKERS) -> EdgeStore:
+        """Collect the deployed exports and imports of an account, a page at a time.
+
+        Stacks are interned by name and id, so the nodes of the store are the distinct stacks of the account. The
+        imports of each page of exports are fetched by a pool of threads while later pages are still being listed,
+        and are added in the order of the exports, so the store does not depend on which fetch finishes first.
+
+        Args:
+            cfn_client: The source of deployed exports and imports.
+            max_workers: The maximum number of imports fetched at once.
+
+        Returns:
+            The store.
+        """
+        store = cls()
+        pending: deque[tuple[int, Future[list[str]]]] = deque()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            token = None
+            while True:
+                resp = cfn_client.list_exports(NextToken=token) if token else cfn_client.list_exports()
+                for export in resp['Exports']:
+                    stack_id = export['ExportingStackId']
+                    node = NodeData(stack_name=parse_name_from_id(stack_id), stack_id=stack_id)
+                    if export['Name'] not in store.export_ids:
+                        export_id = store.add_export(export['Name'], node)
+                        pending.append((export_id, executor.submit(cls._list_importers, cfn_client, export['Name'])))
+                while pending and pending[0][1].done():
+                    store.__add_importers(*pending.popleft())
+                if not (token := resp.get('NextToken')):
+                    break
+            log.info('collected %s exports from %s stacks', len(store), len(store.nodes))
+
+            while pending:
+                store.__add_importers(*pending.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        log.info('collected %s dependencies between %s stacks', len(store.pairs), len(store.nodes))
+        return store
+
+    def __add_importers(self, export_id: int, importers: Future[list[str]]) -> None:
+        for stack_name in importers.result():
+            self.add_import(export_id, NodeData(stack_name=stack_name))
+
+    @classmethod
+    def crawl(
+        cls,
+        cfn_client: CloudFormationClient,
+        focus: list[str],
+        radius: int | None = None,
+        max_workers: int = IMPORT_FETCH_WORKERS,
+        cdk_out_path: Path | None = None,
+    ) -> EdgeStore:
+        """Collect only the deployed exports and imports around some stacks, breadth-first from them.
+
+        Every stack on a cycle through a focused stack can be reached from it by following imports outward, from an
+        exporting stack to the stacks importing its exports. Exports are listed once, then the imports of the exports
+        of each ring of stacks are fetched by a pool of threads, and the importing stacks not crawled yet are the
+        next ring. Exports of stacks which are never reached are not fetched, which is where a full collection spends
+        most of its API calls.
+
+        The exports and imports declared in the cloud assembly are merged as each ring is crawled, as
+        ``merge_assembly`` does, so stacks which only the assembly links to are crawled as well.
+
+        Args:
+            cfn_client: The source of deployed exports and imports.
+            focus: Names of the stacks to crawl from.
+            radius: The most imports followed from a focused stack, or None to crawl until no new stack is reached.
+                Every cycle through a focused stack of at most ``radius + 1`` stacks is in the store.
+            max_workers: The maximum number of imports fetched at once.
+            cdk_out_path: Path to a cloud assembly whose exports and imports are crawled with the deployed ones.
+
+        Returns:
+            The store, its nodes are the stacks reached.
+        """
+        # the exports of each stack, as the export name, stack id and whether it is deployed
+        exports: dict[str, list[tuple[str, str | None, bool]]] = {}
+        token = None
+        while True:
+            resp = cfn_client.list_exports(NextToken=token) if token else cfn_client.list_exports()
+            for export in resp['Exports']:
+                stack_id = export['ExportingStackId']
+                exports.setdefault(parse_name_from_id(stack_id), []).append((export['Name'], stack_id, True))
+            if not (token := resp.get('NextToken')):
+                break
+
+        assembly_imports: dict[str, list[NodeData]] = {}
+        if cdk_out_path is not None:
+            deployed = {export_name for stack_exports in exports.values() for export_name, *_ in stack_exports}
+            assembly_exports, assembly_imports = get_assembly_data(cdk_out_path, known_export_names=deployed)
+            for export_name, assembly_export in assembly_exports.items():
+                if export_name not in deployed:
+                    exports.setdefault(assembly_export.stack_name, []).append((export_name, assembly_export.stack_id, False))
+
+        store = cls()
+        crawled: set[str] = set()
+        ring = list(dict.fromkeys(focus))
+        depth = 0
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while ring and (radius is None or depth <= radius):
+                crawled.update(ring)
+                pending = [
+                    (
+                        store.add_export(export_name, NodeData(stack_name=stack_name, stack_id=stack_id)),
+                        export_name,
+                        executor.submit(cls._list_importers, cfn_client, export_name) if is_deployed else None,
+                    )
+                    for stack_name in ring
+                    for export_name, stack_id, is_deployed in exports.get(stack_name, [])
+                ]
+                # imports are added in the order of the exports, so the store does not depend on which fetch finishes
+                # first
+                reached: dict[str, None] = {}
+                for export_id, export_name, importers in pending:
+                    importer_names = [
+                        *(importers.result() if importers else []),
+                        *(importing_stack.stack_name for importing_stack in assembly_imports.get(export_name, [])),
+                    ]
+                    for importer_name in importer_names:
+                        store.add_import(export_id, NodeData(stack_name=importer_name))
+                    reached.update(dict.fromkeys(name for name in importer_names if name not in crawled))
+                ring = list(reached)
+                depth += 1
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        log.info(
+            'crawled %s of %s exporting stacks around %s focused stacks, %s dependencies between %s stacks',
+            len(crawled & exports.keys()),
+            len(exports),
+            len(focus),
+            len(store.pairs),
+            len(store.nodes),
+        )
+        return store
+
+    @staticmethod
+    def _list_importers(cfn_client: CloudFormationClient, export_name: str) -> list[str]:
+        """The names of the stacks importing a deployed export, a page at a time."""
+        importers: list[str] = []
+        try:
+            resp = cfn_client.list_imports(ExportName=export_name)
+            while True:
+                importers.extend(resp['Imports'])
+                if not (token := resp.get('NextToken')):
+                    break
+                resp = cfn_client.list_imports(ExportName=export_name, NextToken=token)
+        except ClientError as err:
+            if 'is not imported by any stack' not in repr(err):
+                raise
+        return importers
+
+    def merge_assembly(self, cdk_out_path: Path, template_cache: dict | None = None) -> None:
+        """Add the exports declared in the cloud assembly which are not deployed yet, and its imports."""
+        assembly_exports, assembly_imports = get_assembly_data(
+            cdk_out_path, known_export_names=set(self.export_ids), template_cache=template_cache
+        )
+        for export_name, export in assembly_exports.items():
+            self.add_export(export_name, NodeData(stack_name=export.stack_name, stack_id=export.stack_id))
+        for export_name, importing_stacks in assembly_imports.items():
+            export_id = self.export_ids.get(export_name)
+            if export_id is None:
+                log.debug('found an import of %s, which is not exported by any stack', export_name)
+                continue
+            for importing_stack in importing_stacks:
+                self.add_import(export_id, NodeData(stack_name=importing_stack.stack_name))
+
+    def keys(self, node_key_fn: Callable[[NodeData], Hashable]) -> list[Hashable]:
+        """The key of each node, computed once per key function."""
+        if node_key_fn not in self._keys:
+            self._keys[node_key_fn] = [node_key_fn(node) for node in self.nodes]
+        return self._keys[node_key_fn]
+
+    def build_graph(  # noqa: PLR0913
+        self,
+        node_key_fn: Callable[[NodeData], Hashable] = lambda x: x.stack_name,
+        nodes_to_ignore: list[str] | None = None,
+        edges_to_ignore: list[list[str]] | None = None,
+        *,
+        remove_selfloops: bool = False,
+        selfloops: str = 'keep',
+        weighted: bool = False,
+    ) -> nx.DiGraph:
+        """Build the dependency graph, as ``build_graph`` does from graph data.
+
+        Args:
+            node_key_fn: Maps the data of a node to its key in the graph.
+            nodes_to_ignore: Keys of nodes left out of the graph.
+            edges_to_ignore: Pairs of keys of edges left out of the graph.
+            remove_selfloops: Remove edges from a node to itself, the same as the ``drop`` policy.
+            selfloops: One of ``SELFLOOP_POLICIES``. Edges from a node to itself are kept, or left out as they are
+                inserted. When reported, the number of imports left out of each node is kept in ``graph['selfloops']``.
+            weighted: Build a ``DiGraph`` with an edge per pair of nodes, instead of a ``MultiDiGraph``.
+
+        Returns:
+            The dependency graph, the ``node_data`` of each node is the set of stored nodes mapped to it.
+        """
+        selfloops = selfloop_policy(selfloops, remove_selfloops=remove_selfloops)
+        keys = self.keys(node_key_fn)
+        ignored_nodes = set(nodes_to_ignore or [])
+        ignored_edges = {tuple(edge) for edge in edges_to_ignore or []}
+
+        graph: nx.DiGraph = nx.DiGraph() if weighted else nx.MultiDiGraph()
+        graph.graph['exports'] = self.export_names
+        selfloop_imports: dict[Hashable, int] = {}
+        for exporter in sorted(set(self.exporters)):
+            if keys[exporter] not in ignored_nodes:
+                graph.add_node(keys[exporter])
+                graph.nodes[keys[exporter]].setdefault('node_data', set()).add(self.nodes[exporter])
+
+        for (exporter, importer), export_ids in self.pairs.items():
+            u, v = keys[exporter], keys[importer]
+            if u in ignored_nodes or v in ignored_nodes or (u, v) in ignored_edges:
+                continue
+            if u == v and selfloops != 'keep':
+                selfloop_imports[u] = selfloop_imports.get(u, 0) + len(export_ids)
+            elif not weighted:
+                graph.add_edges_from((u, v, {'export': export_id}) for export_id in export_ids)
+            elif (data := graph.get_edge_data(u, v)) is None:
+                graph.add_edge(u, v, weight=len(export_ids), exports=list(export_ids))
+            else:
+                data['exports'].extend(export_ids)
+                graph.add_edge(u, v, weight=data['weight'] + len(export_ids))
+            graph.nodes[v].setdefault('node_data', set()).add(self.nodes[importer])
+
+        if selfloops == 'report':
+            graph.graph['selfloops'] = selfloop_imports
+        return graph
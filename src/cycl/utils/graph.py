@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+    import networkx as nx
+
+# what building a graph does with the imports of a node from its own exports, see ``build_graph``
+SELFLOOP_POLICIES = ('keep', 'drop', 'report')
+
+
+def selfloop_policy(selfloops: str, *, remove_selfloops: bool = False) -> str:
+    """Validate a self loop policy, ``remove_selfloops`` is the same as the ``drop`` policy."""
+    if selfloops not in SELFLOOP_POLICIES:
+        err_msg = f'selfloops must be one of {SELFLOOP_POLICIES}, not {selfloops!r}'
+        raise ValueError(err_msg)
+    return 'drop' if remove_selfloops and selfloops == 'keep' else selfloops
+
+
+def edge_weights(graph: nx.DiGraph) -> Counter[tuple[Hashable, Hashable]]:
+    """Count the imports behind each edge, for graphs with parallel edges and for weighted graphs alike.
+
+    Args:
+        graph: A dependency graph, as built by ``build_graph``. Each parallel edge of a ``MultiDiGraph`` counts once,
+            each edge of a weighted ``DiGraph`` counts its ``weight``.
+
+    Returns:
+        A counter mapping each ``(u, v)`` edge to its number of imports.
+    """
+    weights: Counter[tuple[Hashable, Hashable]] = Counter()
+    for u, v, weight in graph.edges(data='weight', default=1):
+        weights[u, v] += weight
+    return weights
+
+
+def edge_exports(graph: nx.DiGraph, u: Hashable, v: Hashable) -> list[str]:
+    """Find the names of the exports which cause the edge from ``u`` to ``v``.
+
+    Edges only hold integer ids into the ``exports`` table of the graph, so each export name is stored once however
+    many imports there are.
+
+    Args:
+        graph: A dependency graph, as built by ``build_graph``.
+        u: The exporting node.
+        v: The importing node.
+
+    Returns:
+        The export names, once per import, or an empty list if the graph has no export table.
+    """
+    export_names: list[str] = graph.graph.get('exports', [])
+    if not export_names or not graph.has_edge(u, v):
+        return []
+    if graph.is_multigraph():
+        export_ids = [data['export'] for data in graph[u][v].values() if 'export' in data]
+    else:
+        export_ids = graph[u][v].get('exports', [])
+    return [export_names[export_id] for export_id in export_ids]
+
+
+def format_cycle(graph: nx.DiGraph, cycle: list[Hashable], max_exports: int = 3) -> str:
+    """Format a cycle with the exports on each of its edges, ex. ``A -[vpc-id]-> B -[subnet-id]-> A``.
+
+    Args:
+        graph: The dependency graph the cycle was found in.
+        cycle: The nodes of the cycle, the last node leads back to the first.
+        max_exports: The most export names shown per edge, the rest are counted.
+
+    Returns:
+        The formatted cycle.
+    """
+    parts = [str(cycle[0])]
+    for u, v in zip(cycle, cycle[1:] + cycle[:1]):
+        names = sorted(set(edge_exports(graph, u, v)))
+        label = ', '.join(names[:max_exports]) + (f', +{len(names) - max_exports}' if len(names) > max_exports else '')
+        parts.append(f'-[{label}]-> {v}')
+    return ' '.join(parts)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import re
+from bisect import bisect_left
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+log = getLogger(__name__)
+
+# stands in for any part of an expression which can't be known before deployment, export names can't contain it
+UNRESOLVED = '\x00'
+
+_SUB_VARIABLE = re.compile(r'\$\{([^}]*)\}')
+
+_PARTITIONS = (
+    ('cn-', 'aws-cn', 'amazonaws.com.cn'),
+    ('us-gov-', 'aws-us-gov', 'amazonaws.com'),
+    ('', 'aws', 'amazonaws.com'),
+)
+
+
+def get_pseudo_parameters(
+    stack_name: str | None = None,
+    account_id: str | None = None,
+    region: str | None = None,
+) -> dict[str, str]:
+    """Build the values of the CloudFormation pseudo parameters which are known before deployment.
+
+    Args:
+        stack_name: The name of the stack the template is deployed as.
+        account_id: The account the stack is deployed to.
+        region: The region the stack is deployed to, used to determine the partition and url suffix.
+
+    Returns:
+        A dictionary mapping pseudo parameter names (ex. ``AWS::Region``) to their values.
+    """
+    pseudo_parameters = {}
+    if stack_name:
+        pseudo_parameters['AWS::StackName'] = stack_name
+    if account_id:
+        pseudo_parameters['AWS::AccountId'] = account_id
+    if region:
+        pseudo_parameters['AWS::Region'] = region
+    partition, url_suffix = next((p, u) for prefix, p, u in _PARTITIONS if (region or '').startswith(prefix))
+    pseudo_parameters['AWS::Partition'] = partition
+    pseudo_parameters['AWS::URLSuffix'] = url_suffix
+    return pseudo_parameters
+
+
+class IntrinsicResolver:
+    """Evaluates the intrinsic functions which build an export name, within the scope of a single template.
+
+    Supports ``Ref`` (to parameters and pseudo parameters), ``Fn::Sub``, ``Fn::Join``, ``Fn::Select``,
+    ``Fn::Split`` and ``Fn::FindInMap``. Anything else, like ``Fn::GetAtt``, can only be known after deployment.
+    """
+
+    def __init__(
+        self,
+        template: dict[str, Any] | None = None,
+        pseudo_parameters: dict[str, str] | None = None,
+        known_export_names: Sequence[str] | None = None,
+    ) -> None:
+        """Create a resolver for a template.
+
+        Args:
+            template: The template, only its ``Parameters`` and ``Mappings`` sections are used.
+            pseudo_parameters: Values of pseudo parameters, see ``get_pseudo_parameters``.
+            known_export_names: Sorted export names used to complete export names which are only partially
+                resolvable, ex. when they contain ``${AWS::AccountId}`` and the account isn't known.
+        """
+        template = template or {}
+        self.parameters: dict[str, Any] = dict(pseudo_parameters or {})
+        for name, parameter in (template.get('Parameters') or {}).items():
+            if isinstance(parameter, dict) and 'Default' in parameter:
+                default = parameter['Default']
+                if str(parameter.get('Type', '')).startswith(('CommaDelimitedList', 'List<')):
+                    default = [value.strip() for value in str(default).split(',')]
+                self.parameters[name] = default
+        self.mappings: dict[str, Any] = template.get('Mappings') or {}
+        self._cache: dict[str, str | None] = {}
+        self.known_export_names = known_export_names or []
+        self._functions: dict[str, Callable[[Any], Any]] = {
+            'Ref': self._ref,
+            'Fn::Sub': self._sub,
+            'Fn::Join': self._join,
+            'Fn::Select': self._select,
+            'Fn::Split': self._split,
+            'Fn::FindInMap': self._find_in_map,
+        }
+
+    @property
+    def known_export_names(self) -> Sequence[str]:
+        """Sorted export names used to complete export names which are only partially resolvable."""
+        return self._known_export_names
+
+    @known_export_names.setter
+    def known_export_names(self, known_export_names: Sequence[str]) -> None:
+        self._known_export_names = known_export_names
+        # names which only partially resolved may match the new names, so they are resolved again
+        self._cache.clear()
+
+    def resolve_export_name(self, expression: Any) -> str | None:  # noqa: ANN401
+        """Resolve the value of an ``Fn::ImportValue`` into an export name.
+
+        Args:
+            expression: A string, or an intrinsic function which evaluates to a string.
+
+        Returns:
+            The export name, or None if it can't be determined. Results are memoized per resolver, until
+            ``known_export_names`` is set.
+        """
+        if isinstance(expression, str):
+            return expression
+
+        key = json.dumps(expression, sort_keys=True, default=str)
+        if key not in self._cache:
+            self._cache[key] = self._resolve_export_name(expression)
+        return self._cache[key]
+
+    def _resolve_export_name(self, expression: Any) -> str | None:  # noqa: ANN401
+        value = self.resolve(expression)
+        if not isinstance(value, str) or value == UNRESOLVED:
+            log.warning('unable to resolve export name from: %s', expression)
+            return None
+        if UNRESOLVED not in value:
+            return value
+
+        matches = self._match_known_export_names(value)
+        if len(matches) == 1:
+            log.debug('resolved export name %s from: %s', matches[0], expression)
+            return matches[0]
+        log.warning('unable to resolve export name from: %s, %s known exports match it', expression, len(matches))
+        return None
+
+    def _match_known_export_names(self, value: str) -> list[str]:
+        parts = value.split(UNRESOLVED)
+        pattern = re.compile('.+'.join(re.escape(part) for part in parts))
+        prefix = parts[0]
+        names = self.known_export_names
+        matches = []
+        for idx in range(bisect_left(names, prefix), len(names)):
+            if not names[idx].startswith(prefix):
+                break
+            if pattern.fullmatch(names[idx]):
+                matches.append(names[idx])
+        return matches
+
+    def resolve(self, expression: Any) -> Any:  # noqa: ANN401
+        """Evaluate an expression into a string or list, with ``UNRESOLVED`` marking the parts that can't be known."""
+        if isinstance(expression, str):
+            return expression
+        if isinstance(expression, bool):
+            return str(expression).lower()
+        if isinstance(expression, (int, float)):
+            return str(expression)
+        if isinstance(expression, list):
+            return [self.resolve(item) for item in expression]
+        if isinstance(expression, dict) and len(expression) == 1:
+            ((function_name, args),) = expression.items()
+            function = self._functions.get(function_name)
+            if function is not None:
+                return function(args)
+        return UNRESOLVED
+
+    def _ref(self, args: Any) -> Any:  # noqa: ANN401
+        return self.parameters.get(args, UNRESOLVED) if isinstance(args, str) else UNRESOLVED
+
+    def _sub(self, args: Any) -> Any:  # noqa: ANN401
+        variables: dict[str, Any] = {}
+        if isinstance(args, list) and len(args) == 2 and isinstance(args[1], dict):  # noqa: PLR2004
+            args, variables = args
+        if not isinstance(args, str):
+            return UNRESOLVED
+
+        def substitute(match: re.Match) -> str:
+            name = match.group(1)
+            if name.startswith('!'):
+                return f'${{{name[1:]}}}'
+            value = self.resolve(variables[name]) if name in variables else self._ref(name)
+            return value if isinstance(value, str) else UNRESOLVED
+
+        return _SUB_VARIABLE.sub(substitute, args)
+
+    def _join(self, args: Any) -> Any:  # noqa: ANN401
+        if not isinstance(args, list) or len(args) != 2:  # noqa: PLR2004
+            return UNRESOLVED
+        delimiter, values = self.resolve(args[0]), self.resolve(args[1])
+        if not isinstance(delimiter, str) or not isinstance(values, list):
+            return UNRESOLVED
+        return delimiter.join(value if isinstance(value, str) else UNRESOLVED for value in values)
+
+    def _select(self, args: Any) -> Any:  # noqa: ANN401
+        if not isinstance(args, list) or len(args) != 2:  # noqa: PLR2004
+            return UNRESOLVED
+        index, values = self.resolve(args[0]), self.resolve(args[1])
+        if not isinstance(values, list) or not isinstance(index, str) or not index.isdigit():
+            return UNRESOLVED
+        return values[int(index)] if int(index) < len(values) else UNRESOLVED
+
+    def _split(self, args: Any) -> Any:  # noqa: ANN401
+        if not isinstance(args, list) or len(args) != 2:  # noqa: PLR2004
+            return UNRESOLVED
+        delimiter, source = self.resolve(args[0]), self.resolve(args[1])
+        if not isinstance(delimiter, str) or not isinstance(source, str) or source == UNRESOLVED:
+            return UNRESOLVED
+        return source.split(delimiter)
+
+    def _find_in_map(self, args: Any) -> Any:  # noqa: ANN401
+        if not isinstance(args, list) or len(args) != 3:  # noqa: PLR2004
+            return UNRESOLVED
+        keys = [self.resolve(arg) for arg in args]
+        value: Any = self.mappings
+        for key in keys:
+            if not isinstance(key, str) or not isinstance(value, dict) or key not in value:
+                return UNRESOLVED
+            value = value[key]
+        return self.resolve(value)
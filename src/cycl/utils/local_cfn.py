@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs
+from xml.etree import ElementTree as ET
+
+from botocore.exceptions import ClientError
+
+from cycl.cycl import get_graph_data
+from cycl.utils.snapshot import load_snapshot
+
+if TYPE_CHECKING:
+    from cycl.models.node_data import NodeData
+
+log = getLogger(__name__)
+
+CFN_XML_NAMESPACE = 'http://cloudformation.amazonaws.com/doc/2010-05-15/'
+DEFAULT_PAGE_SIZE = 100
+_CREATION_TIME = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class LocalCloudFormationClient:
+    """In-memory stand-in for the subset of the CloudFormation client used to collect graph data.
+
+    Anything accepting a ``cfn_client`` (``get_graph_data``, ``build_graph``, ``NodeData.get_all_exports``, ...)
+    can be given an instance, so graph data can come from a snapshot or a cloud assembly without calling AWS.
+    Responses are paginated and errors are raised the same way the CloudFormation API does.
+    """
+
+    OPERATIONS = ('describe_stacks', 'list_exports', 'list_imports', 'list_stacks')
+
+    def __init__(self, graph_data: dict[str, NodeData], page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        self.graph_data = graph_data
+        self.page_size = page_size
+        self.export_names = list(graph_data)
+        self._stacks: list[dict[str, Any]] | None = None
+
+    @classmethod
+    def from_snapshot(cls, path: Path, page_size: int = DEFAULT_PAGE_SIZE) -> LocalCloudFormationClient:
+        """Serve the graph data of a snapshot created by ``save_snapshot``."""
+        return cls(load_snapshot(Path(path)), page_size=page_size)
+
+    @classmethod
+    def from_assembly(cls, cdk_out_path: Path, page_size: int = DEFAULT_PAGE_SIZE) -> LocalCloudFormationClient:
+        """Serve the exports declared in a cloud assembly, as if it had been deployed."""
+        return cls(get_graph_data(cdk_out_path=Path(cdk_out_path), offline=True), page_size=page_size)
+
+    def _page(self, items: list, next_token: str | None) -> tuple[list, dict[str, str]]:
+        start = int(next_token) if next_token else 0
+        end = start + self.page_size
+        return items[start:end], ({'NextToken': str(end)} if end < len(items) else {})
+
+    @staticmethod
+    def _stack_id(node: NodeData) -> str:
+        return node.stack_id or f'arn:aws:cloudformation:local:000000000000:stack/{node.stack_name}/local'
+
+    def _describe_stacks(self) -> list[dict[str, Any]]:
+        """Describe every exporting and importing stack once, each export is an output of its stack."""
+        stacks: dict[str, dict[str, Any]] = {}
+
+        def describe(node: NodeData) -> dict[str, Any]:
+            if node.stack_name not in stacks:
+                stack: dict[str, Any] = {
+                    'StackName': node.stack_name,
+                    'StackId': self._stack_id(node),
+                    'CreationTime': _CREATION_TIME,
+                    'StackStatus': 'CREATE_COMPLETE',
+                    'Tags': [{'Key': key, 'Value': value} for key, value in (node.tags or {}).items()],
+                    'Outputs': [],
+                }
+                stack.update(
+                    {key: value for key, value in (('ParentId', node.parent_id), ('RootId', node.root_id)) if value}
+                )
+                stacks[node.stack_name] = stack
+            return stacks[node.stack_name]
+
+        # exporting stacks are described first, their nodes carry the stack id
+        for export_name in self.export_names:
+            export = self.graph_data[export_name]
+            describe(export)['Outputs'].append(
+                {'OutputKey': export_name, 'OutputValue': export.export_value or '', 'ExportName': export_name}
+            )
+        for export in self.graph_data.values():
+            for importing_stack in export.importing_stacks:
+                describe(importing_stack)
+        return list(stacks.values())
+
+    def describe_stacks(self, NextToken: str | None = None) -> dict[str, Any]:  # noqa: N803 - matches boto3
+        if self._stacks is None:
+            self._stacks = self._describe_stacks()
+        stacks, token = self._page(self._stacks, NextToken)
+        return {'Stacks': stacks, **token}
+
+    def list_stacks(
+        self,
+        NextToken: str | None = None,  # noqa: N803 - matches boto3
+        StackStatusFilter: list[str] | None = None,  # noqa: N803 - matches boto3
+    ) -> dict[str, Any]:
+        if self._stacks is None:
+            self._stacks = self._describe_stacks()
+        stacks = self._stacks
+        if StackStatusFilter is not None:
+            stacks = [stack for stack in stacks if stack['StackStatus'] in StackStatusFilter]
+        stacks, token = self._page(stacks, NextToken)
+        summary_keys = ('StackName', 'StackId', 'CreationTime', 'StackStatus', 'ParentId', 'RootId')
+        summaries = [{key: stack[key] for key in summary_keys if key in stack} for stack in stacks]
+        return {'StackSummaries': summaries, **token}
+
+    def list_exports(self, NextToken: str | None = None) -> dict[str, Any]:  # noqa: N803 - matches boto3
+        export_names, token = self._page(self.export_names, NextToken)
+        exports = [
+            {
+                'ExportingStackId': self._stack_id(self.graph_data[export_name]),
+                'Name': export_name,
+                'Value': self.graph_data[export_name].export_value or '',
+            }
+            for export_name in export_names
+        ]
+        return {'Exports': exports, **token}
+
+    def list_imports(self, ExportName: str, NextToken: str | None = None) -> dict[str, Any]:  # noqa: N803 - matches boto3
+        export = self.graph_data.get(ExportName)
+        importing_stack_names = list(
+            dict.fromkeys(importing_stack.stack_name for importing_stack in (export.importing_stacks if export else []))
+        )
+        if not importing_stack_names:
+            raise ClientError(
+                {'Error': {'Code': 'ValidationError', 'Message': f"Export '{ExportName}' is not imported by any stack."}},
+                'ListImports',
+            )
+        stack_names, token = self._page(importing_stack_names, NextToken)
+        return {'Imports': stack_names, **token}
+
+
+def _to_xml(parent: ET.Element, value: Any) -> None:  # noqa: ANN401
+    """Serialize a response the way the CloudFormation query protocol does, lists are made of ``member`` elements."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _to_xml(ET.SubElement(parent, key), item)
+    elif isinstance(value, list):
+        for item in value:
+            _to_xml(ET.SubElement(parent, 'member'), item)
+    elif isinstance(value, datetime):
+        parent.text = value.isoformat()
+    elif isinstance(value, bool):
+        parent.text = str(value).lower()
+    else:
+        parent.text = str(value)
+
+
+def _parse_query(body: str) -> dict[str, Any]:
+    """Parse the parameters of a query protocol request, lists are sent as ``Name.member.1``, ``Name.member.2``..."""
+    params: dict[str, Any] = {}
+    members: dict[str, dict[int, str]] = {}
+    for key, values in parse_qs(body).items():
+        name, _, index = key.partition('.member.')
+        if index:
+            members.setdefault(name, {})[int(index)] = values[0]
+        else:
+            params[key] = values[0]
+    for name, indexed in members.items():
+        params[name] = [indexed[index] for index in sorted(indexed)]
+    return params
+
+
+class _QueryProtocolHandler(BaseHTTPRequestHandler):
+    server: LocalCloudFormationServer
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        params = _parse_query(body)
+        action = params.pop('Action', '')
+        params.pop('Version', None)
+        operation = ''.join(f'_{char.lower()}' if char.isupper() else char for char in action).lstrip('_')
+
+        request_id = str(uuid.uuid4())
+        if operation not in self.server.client.OPERATIONS:
+            self._error(HTTPStatus.BAD_REQUEST, 'InvalidAction', f'Unsupported action: {action}', request_id)
+            return
+        try:
+            result = getattr(self.server.client, operation)(**params)
+        except ClientError as err:
+            error = err.response['Error']
+            self._error(HTTPStatus.BAD_REQUEST, error.get('Code', ''), error.get('Message', ''), request_id)
+            return
+
+        root = ET.Element(f'{action}Response', xmlns=CFN_XML_NAMESPACE)
+        _to_xml(ET.SubElement(root, f'{action}Result'), result)
+        _to_xml(ET.SubElement(root, 'ResponseMetadata'), {'RequestId': request_id})
+        self._send(HTTPStatus.OK, root)
+
+    def _error(self, status: HTTPStatus, code: str, message: str, request_id: str) -> None:
+        root = ET.Element('ErrorResponse', xmlns=CFN_XML_NAMESPACE)
+        _to_xml(ET.SubElement(root, 'Error'), {'Type': 'Sender', 'Code': code, 'Message': message})
+        _to_xml(ET.SubElement(root, 'RequestId'), request_id)
+        self._send(status, root)
+
+    def _send(self, status: HTTPStatus, root: ET.Element) -> None:
+        payload = ET.tostring(root, encoding='utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        log.debug(format, *args)
+
+
+class LocalCloudFormationServer(ThreadingHTTPServer):
+    """Serves a ``LocalCloudFormationClient`` over the CloudFormation query protocol.
+
+    Point a boto3 client (or ``cycl --endpoint-url``) at ``url`` to exercise the real collection path, including
+    pagination, retries and XML parsing, against local data.
+    """
+
+    def __init__(self, client: LocalCloudFormationClient, host: str = '127.0.0.1', port: int = 0) -> None:
+        super().__init__((host, port), _QueryProtocolHandler)
+        self.client = client
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host!s}:{port}'
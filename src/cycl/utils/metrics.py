@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import networkx as nx
+
+from cycl.utils.cfn import parse_account_from_id
+from cycl.utils.graph import edge_weights
+
+if TYPE_CHECKING:
+    from cycl.models.node_data import NodeData
+
+log = getLogger(__name__)
+
+# the measurements recorded per run, each is a column of the runs table
+METRICS = ('nodes', 'edges', 'imports', 'largest_scc', 'depth', 'cycles', 'cyclic')
+# pending runs are written in a single transaction once this many are recorded
+DEFAULT_BATCH_SIZE = 100
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        recorded_at TEXT NOT NULL,
+        day TEXT NOT NULL,
+        account TEXT NOT NULL,
+        command TEXT NOT NULL,
+        nodes INTEGER NOT NULL,
+        edges INTEGER NOT NULL,
+        imports INTEGER NOT NULL,
+        largest_scc INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        cycles INTEGER NOT NULL,
+        cyclic INTEGER NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS runs_account_day ON runs (account, day)',
+)
+_INSERT = """
+    INSERT INTO runs (recorded_at, day, account, command, nodes, edges, imports, largest_scc, depth, cycles, cyclic)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_TRENDS = """
+    SELECT account, day, COUNT(*) AS runs, MAX(nodes) AS nodes, MAX(edges) AS edges, MAX(imports) AS imports,
+        MAX(largest_scc) AS largest_scc, MAX(depth) AS depth, MAX(cycles) AS cycles, SUM(cyclic) AS cyclic_runs
+    FROM runs
+    WHERE (:account IS NULL OR account = :account) AND (:since IS NULL OR day >= :since)
+    GROUP BY account, day
+    ORDER BY account, day
+"""
+
+
+def graph_metrics(graph: nx.DiGraph) -> dict[str, int]:
+    """Measure the size and shape of a dependency graph.
+
+    Args:
+        graph: A dependency graph, as built by ``build_graph``.
+
+    Returns:
+        The number of nodes, edges and imports, the number of nodes in the largest strongly connected component and
+        the depth, the number of stacks along the longest chain of dependencies once each cycle is collapsed.
+    """
+    condensed = nx.condensation(graph)
+    return {
+        'nodes': graph.number_of_nodes(),
+        'edges': graph.number_of_edges(),
+        'imports': sum(edge_weights(graph).values()),
+        'largest_scc': max((len(members) for _, members in condensed.nodes(data='members')), default=0),
+        'depth': nx.dag_longest_path_length(condensed) + 1 if condensed else 0,
+    }
+
+
+def graph_account(graph: nx.DiGraph) -> str:
+    """The account of the stacks in a dependency graph, from the first stack id found, or an empty string."""
+    for node in graph:
+        node_data: set[NodeData] = graph.nodes[node].get('node_data', set())
+        for stack in node_data:
+            if stack.stack_id and (account := parse_account_from_id(stack.stack_id)):
+                return account
+    return ''
+
+
+class MetricsStore:
+    """A local SQLite database of the metrics of each run, to follow how dependency graphs evolve.
+
+    Runs are buffered and written ``batch_size`` at a time in a single transaction, and the database is in WAL mode,
+    so many processes can record to the same file cheaply. Runs are indexed by account and day, which trends are
+    queried by.
+    """
+
+    def __init__(self, path: Path, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.pending: list[tuple[Any, ...]] = []
+        # concurrent writers wait on each other's transactions, instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            for statement in _SCHEMA:
+                self.connection.execute(statement)
+
+    def record(self, account: str, command: str, metrics: dict[str, Any], recorded_at: datetime | None = None) -> None:
+        """Record the metrics of a run, see ``METRICS``. Written once ``batch_size`` runs are pending, or on ``flush``.
+
+        Args:
+            account: The account the graph was collected from.
+            command: The command which ran, ex. ``check``.
+            metrics: The value of each of ``METRICS``.
+            recorded_at: When the run finished, defaults to now.
+        """
+        recorded_at = recorded_at or datetime.now(timezone.utc)
+        row = (recorded_at.isoformat(), recorded_at.date().isoformat(), account, command)
+        self.pending.append(row + tuple(int(metrics[metric]) for metric in METRICS))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the pending runs in a single transaction."""
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(_INSERT, self.pending)
+        log.debug('recorded %s runs to %s', len(self.pending), self.path)
+        self.pending.clear()
+
+    def close(self) -> None:
+        """Write the pending runs and close the database."""
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+    def trends(self, account: str | None = None, days: int | None = None) -> list[dict[str, Any]]:
+        """Summarize the recorded runs per account and day.
+
+        Args:
+            account: Only summarize the runs of this account.
+            days: Only summarize the runs of the last this many days, including today.
+
+        Returns:
+            A row per account and day, in order, with the number of runs, the largest value of each metric that day
+            and the number of runs which found the graph cyclic.
+        """
+        self.flush()
+        since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat() if days else None
+        cursor = self.connection.execute(_TRENDS, {'account': account, 'since': since})
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import abc
+import json
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+from cycl.utils.graph import edge_exports, format_cycle
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable, Mapping
+
+    import networkx as nx
+
+OUTPUT_FORMATS = ('text', 'json', 'ndjson', 'sarif', 'dot', 'graphml')
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+SARIF_CYCLE_RULE = 'cycl/cyclic-dependency'
+SARIF_CUT_RULE = 'cycl/suggested-cut'
+
+
+def _dumps(value: Any) -> str:  # noqa: ANN401
+    return json.dumps(value, default=str)
+
+
+def _artifact_uri(path: Path) -> str:
+    """The path relative to the working directory, where code scanning runs from the repository root."""
+    path = path.resolve()
+    try:
+        return path.relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return path.as_uri()
+
+
+class OutputWriter(abc.ABC):
+    """Writes the results of a command to a stream as they are produced, so they are never all held in memory.
+
+    Results are written a section at a time, ``cycles``, ``cuts`` and ``generations``, followed by ``stats``. Each
+    item of a section is turned into a record, a dictionary, which the writer for each format serializes.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        graph: nx.DiGraph,
+        *,
+        show_exports: bool = False,
+        templates: Mapping[str, Path] | None = None,
+    ) -> None:
+        self.stream = stream
+        self.graph = graph
+        self.show_exports = show_exports
+        self.templates = templates or {}
+
+    def _exports(self, u: Hashable, v: Hashable) -> list[str]:
+        return sorted(set(edge_exports(self.graph, u, v)))
+
+    def _write_section(self, section: str, records: Iterable[dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            self._record(section, record)
+            count += 1
+        self._end(section, count)
+        return count
+
+    def write_cycles(self, cycles: Iterable[list[Hashable]]) -> int:
+        """Write each cycle, as lists of nodes, and return how many there were."""
+        records = (
+            {
+                'nodes': cycle,
+                **(
+                    {'exports': [self._exports(u, v) for u, v in zip(cycle, cycle[1:] + cycle[:1])]}
+                    if self.show_exports
+                    else {}
+                ),
+            }
+            for cycle in cycles
+        )
+        return self._write_section('cycles', records)
+
+    def write_cuts(self, cuts: Iterable[tuple[Hashable, Hashable, int]]) -> int:
+        """Write each suggested cut, as ``(u, v, imports)`` tuples, and return how many there were."""
+        records = (
+            {
+                'source': u,
+                'target': v,
+                'imports': imports,
+                **({'exports': self._exports(u, v)} if self.show_exports else {}),
+            }
+            for u, v, imports in cuts
+        )
+        return self._write_section('cuts', records)
+
+    def write_generations(self, generations: Iterable[list[Hashable]]) -> int:
+        """Write each topological generation, as lists of nodes, and return how many there were."""
+        records = ({'generation': idx, 'nodes': nodes} for idx, nodes in enumerate(generations))
+        return self._write_section('generations', records)
+
+    def write_stats(self, stats: dict[str, Any]) -> None:  # noqa: B027 - formats without stats ignore them
+        """Write a summary of the results, written last."""
+
+    def close(self) -> None:
+        """Finish the output, the writer can't be used afterwards."""
+        self.stream.flush()
+
+    @abc.abstractmethod
+    def _record(self, section: str, record: dict[str, Any]) -> None:
+        """Write a record of the section."""
+
+    def _end(self, section: str, count: int) -> None:  # noqa: B027 - most formats don't end sections
+        pass
+
+
+class TextWriter(OutputWriter):
+    """The human readable output cycl has always printed, stats are left to the logs."""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        graph: nx.DiGraph,
+        *,
+        show_exports: bool = False,
+        templates: Mapping[str, Path] | None = None,
+    ) -> None:
+        super().__init__(stream, graph, show_exports=show_exports, templates=templates)
+        self.cut_imports = 0
+
+    def _record(self, section: str, record: dict[str, Any]) -> None:
+        if section == 'cycles':
+            if self.show_exports:
+                print(f'cycle found: {format_cycle(self.graph, record["nodes"])}', file=self.stream)
+            else:
+                print(f'cycle found between nodes: {record["nodes"]}', file=self.stream)
+        elif section == 'cuts':
+            exports = f': {", ".join(record["exports"])}' if self.show_exports else ''
+            print(
+                f'suggested cut: {record["source"]} -> {record["target"]} ({record["imports"]} imports){exports}',
+                file=self.stream,
+            )
+            self.cut_imports += record['imports']
+        else:
+            # the generations are streamed in the same layout as ``json.dumps(generations, indent=2)``
+            generation = json.dumps(record['nodes'], indent=2).replace('\n', '\n  ')
+            self.stream.write((',\n  ' if record['generation'] else '[\n  ') + generation)
+
+    def _end(self, section: str, count: int) -> None:
+        if section == 'cuts':
+            print(f'{count} cuts removing {self.cut_imports} imports break every cycle', file=self.stream)
+        elif section == 'generations':
+            print('\n]' if count else '[]', file=self.stream)
+
+
+class JsonWriter(OutputWriter):
+    """A single JSON object with an array per section, ex. ``{"cycles": [...], "stats": {...}}``."""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        graph: nx.DiGraph,
+        *,
+        show_exports: bool = False,
+        templates: Mapping[str, Path] | None = None,
+    ) -> None:
+        super().__init__(stream, graph, show_exports=show_exports, templates=templates)
+        self.separator = '{'
+        self.record_separator = ''
+
+    def _key(self, key: str) -> None:
+        self.stream.write(f'{self.separator}{_dumps(key)}: ')
+        self.separator = ', '
+
+    def _write_section(self, section: str, records: Iterable[dict[str, Any]]) -> int:
+        self._key(section)
+        self.stream.write('[')
+        self.record_separator = ''
+        return super()._write_section(section, records)
+
+    def _record(self, section: str, record: dict[str, Any]) -> None:  # noqa: ARG002
+        self.stream.write(f'{self.record_separator}{_dumps(record)}')
+        self.record_separator = ', '
+
+    def _end(self, section: str, count: int) -> None:  # noqa: ARG002
+        self.stream.write(']')
+
+    def write_stats(self, stats: dict[str, Any]) -> None:
+        self._key('stats')
+        self.stream.write(_dumps(stats))
+
+    def close(self) -> None:
+        self.stream.write('{}\n' if self.separator == '{' else '}\n')
+        super().close()
+
+
+class NdjsonWriter(OutputWriter):
+    """One JSON object per line, the section of each record is its ``type``."""
+
+    def _record(self, section: str, record: dict[str, Any]) -> None:
+        # the singular of each section name
+        print(_dumps({'type': section[:-1], **record}), file=self.stream)
+
+    def write_stats(self, stats: dict[str, Any]) -> None:
+        print(_dumps({'type': 'stats', **stats}), file=self.stream)
+
+
+class SarifWriter(OutputWriter):
+    """A SARIF 2.1.0 log, where each cycle is an error and each suggested cut a note, for code scanning in CI.
+
+    Each result is located at the template of every stack involved, when ``templates`` are given. Otherwise results
+    only have logical locations, the stack names, which code scanning doesn't accept, so the log can't be uploaded.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        graph: nx.DiGraph,
+        *,
+        show_exports: bool = False,
+        templates: Mapping[str, Path] | None = None,
+    ) -> None:
+        from cycl import __version__  # noqa: PLC0415 - cycl imports this module's package
+
+        super().__init__(stream, graph, show_exports=show_exports, templates=templates)
+        self.stats: dict[str, Any] = {}
+        self.separator = ''
+        driver = {
+            'name': 'cycl',
+            'version': __version__,
+            'informationUri': 'https://github.com/tcm5343/cycl',
+            'rules': [
+                {
+                    'id': SARIF_CYCLE_RULE,
+                    'shortDescription': {'text': 'Stacks depend on each other through their exports.'},
+                },
+                {
+                    'id': SARIF_CUT_RULE,
+                    'shortDescription': {'text': 'Removing this dependency helps break every cycle.'},
+                },
+            ],
+        }
+        header = _dumps({'version': '2.1.0', '$schema': SARIF_SCHEMA, 'runs': [{'tool': {'driver': driver}}]})
+        # the results are streamed into the run, after its tool
+        self.stream.write(header[: -len('}]}')] + ', "results": [')
+
+    def _record(self, section: str, record: dict[str, Any]) -> None:
+        if section == 'cycles':
+            text = f'cycle found: {format_cycle(self.graph, record["nodes"])}'
+            result: dict[str, Any] = {'ruleId': SARIF_CYCLE_RULE, 'level': 'error', 'message': {'text': text}}
+            nodes = record['nodes']
+        elif section == 'cuts':
+            text = f'suggested cut: {record["source"]} -> {record["target"]} ({record["imports"]} imports)'
+            result = {'ruleId': SARIF_CUT_RULE, 'level': 'note', 'message': {'text': text}}
+            nodes = [record['source'], record['target']]
+        else:
+            return
+        result['locations'] = [self._location(node) for node in nodes]
+        result['properties'] = record
+        self.stream.write(f'{self.separator}{_dumps(result)}')
+        self.separator = ', '
+
+    def _location(self, node: Hashable) -> dict[str, Any]:
+        location: dict[str, Any] = {'logicalLocations': [{'name': str(node), 'kind': 'module'}]}
+        template = self.templates.get(str(node))
+        if template is not None:
+            location['physicalLocation'] = {
+                'artifactLocation': {'uri': _artifact_uri(template)},
+                'region': {'startLine': 1},
+            }
+        return location
+
+    def write_stats(self, stats: dict[str, Any]) -> None:
+        self.stats = stats
+
+    def close(self) -> None:
+        self.stream.write(f'], "properties": {_dumps(self.stats)}}}]}}\n')
+        super().close()
+
+
+class DotWriter(OutputWriter):
+    """A Graphviz digraph of the edges in cycles, with suggested cuts dashed and each generation on a rank."""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        graph: nx.DiGraph,
+        *,
+        show_exports: bool = False,
+        templates: Mapping[str, Path] | None = None,
+    ) -> None:
+        super().__init__(stream, graph, show_exports=show_exports, templates=templates)
+        self.edges: set[tuple[Hashable, Hashable]] = set()
+        # a strict digraph merges the attributes of repeated edges, so cuts can restyle edges already written
+        print('strict digraph cycl {', file=self.stream)
+
+    def _edge(self, u: Hashable, v: Hashable, attrs: dict[str, str]) -> None:
+        attr_list = ', '.join(f'{key}={_dumps(value)}' for key, value in attrs.items())
+        print(f'  {_dumps(str(u))} -> {_dumps(str(v))}{f" [{attr_list}]" if attr_list else ""};', file=self.stream)
+
+    def _record(self, section: str, record: dict[str, Any]) -> None:
+        if section == 'cycles':
+            nodes = record['nodes']
+            for idx, (u, v) in enumerate(zip(nodes, nodes[1:] + nodes[:1])):
+                if (u, v) not in self.edges:
+                    self.edges.add((u, v))
+                    self._edge(u, v, {'label': ', '.join(record['exports'][idx])} if self.show_exports else {})
+        elif section == 'cuts':
+            self._edge(record['source'], record['target'], {'style': 'dashed', 'color': 'red'})
+        else:
+            nodes = ' '.join(f'{_dumps(str(node))};' for node in record['nodes'])
+            print(f'  {{ rank=same; {nodes} }}', file=self.stream)
+
+    def write_stats(self, stats: dict[str, Any]) -> None:
+        for key, value in stats.items():
+            print(f'  // {key}: {_dumps(value)}', file=self.stream)
+
+    def close(self) -> None:
+        print('}', file=self.stream)
+        super().close()
+
+
+class GraphmlWriter(OutputWriter):
+    """A GraphML graph of the edges in cycles, with the generation of each node. Suggested cuts are not written."""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        graph: nx.DiGraph,
+        *,
+        show_exports: bool = False,
+        templates: Mapping[str, Path] | None = None,
+    ) -> None:
+        super().__init__(stream, graph, show_exports=show_exports, templates=templates)
+        self.nodes: set[Hashable] = set()
+        self.edges: set[tuple[Hashable, Hashable]] = set()
+        self.stream.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '  <key id="generation" for="node" attr.name="generation" attr.type="int"/>\n'
+            '  <key id="exports" for="edge" attr.name="exports" attr.type="string"/>\n'
+            '  <graph id="cycl" edgedefault="directed">\n'
+        )
+
+    def _node(self, node: Hashable, generation: int | None = None) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        if generation is None:
+            self.stream.write(f'    <node id={quoteattr(str(node))}/>\n')
+        else:
+            self.stream.write(f'    <node id={quoteattr(str(node))}><data key="generation">{generation}</data></node>\n')
+
+    def _record(self, section: str, record: dict[str, Any]) -> None:
+        if section == 'cycles':
+            nodes = record['nodes']
+            for node in nodes:
+                self._node(node)
+            for idx, (u, v) in enumerate(zip(nodes, nodes[1:] + nodes[:1])):
+                if (u, v) in self.edges:
+                    continue
+                self.edges.add((u, v))
+                data = ''
+                if self.show_exports:
+                    data = f'<data key="exports">{escape(", ".join(record["exports"][idx]))}</data>'
+                self.stream.write(f'    <edge source={quoteattr(str(u))} target={quoteattr(str(v))}>{data}</edge>\n')
+        elif section == 'generations':
+            for node in record['nodes']:
+                self._node(node, record['generation'])
+
+    def write_stats(self, stats: dict[str, Any]) -> None:
+        for key, value in stats.items():
+            self.stream.write(f'    <!-- {key}: {_dumps(value).replace("--", "- -")} -->\n')
+
+    def close(self) -> None:
+        self.stream.write('  </graph>\n</graphml>\n')
+        super().close()
+
+
+_WRITERS: dict[str, type[OutputWriter]] = {
+    'text': TextWriter,
+    'json': JsonWriter,
+    'ndjson': NdjsonWriter,
+    'sarif': SarifWriter,
+    'dot': DotWriter,
+    'graphml': GraphmlWriter,
+}
+
+
+def get_writer(
+    output_format: str,
+    graph: nx.DiGraph,
+    stream: TextIO | None = None,
+    *,
+    show_exports: bool = False,
+    templates: Mapping[str, Path] | None = None,
+) -> OutputWriter:
+    """Create a writer which streams results in the given format.
+
+    Args:
+        output_format: One of ``OUTPUT_FORMATS``.
+        graph: The dependency graph the results are about, used to look up the exports on edges.
+        stream: Where the output is written, defaults to stdout.
+        show_exports: Include the exports on each edge of cycles and cuts.
+        templates: The template of each stack, which ``sarif`` results are located at.
+
+    Returns:
+        The writer, which must be closed once every result is written.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if output_format not in _WRITERS:
+        err_msg = f'Unsupported output format: {output_format}, expected one of {", ".join(OUTPUT_FORMATS)}'
+        raise ValueError(err_msg)
+    return _WRITERS[output_format](stream or sys.stdout, graph, show_exports=show_exports, templates=templates)
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from logging import getLogger
+from pathlib import Path
+
+from cycl.models.node_data import NodeData
+
+log = getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'CYCL'
+SNAPSHOT_VERSION = 2
+
+FLAG_ZLIB = 0x01
+
+# magic, version, flags, reserved, string count, export count, import count, string blob length
+_HEADER = struct.Struct('<4sBBHIIII')
+_NONE = 0xFFFFFFFF
+# stack_name, stack_id, export_name, export_value, and since version 2 parent_id, root_id, tags, outputs
+_NODE_COLUMNS = {1: 4, 2: 8}
+_EXPORT_COLUMNS = _NODE_COLUMNS[SNAPSHOT_VERSION]
+_IMPORT_COLUMNS = 1 + _EXPORT_COLUMNS  # export index, then the importing stack's columns
+
+
+class InvalidSnapshotError(Exception):
+    def __init__(self, message: str = 'An error occurred') -> None:
+        super().__init__(message)
+
+
+class _StringTable:
+    """Interns strings so each distinct value is stored once and referenced by index."""
+
+    def __init__(self) -> None:
+        self.index: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def intern(self, value: str | None) -> int:
+        if value is None:
+            return _NONE
+        idx = self.index.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self.index[value] = idx
+            self.values.append(value)
+        return idx
+
+
+def __to_le(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def __from_le(buffer: memoryview, start: int, count: int) -> list[int]:
+    """Read ``count`` little-endian u32 values from ``start``, releasing every view taken of the buffer."""
+    with buffer[start : start + count * 4] as view:
+        if sys.byteorder == 'little':
+            with view.cast('I') as values:
+                return values.tolist()
+        swapped = array('I', view.tobytes())
+    swapped.byteswap()
+    return swapped.tolist()
+
+
+def __node_columns(strings: _StringTable, node: NodeData) -> tuple[int, ...]:
+    # tags and outputs are stored as json, so stacks sharing the same tags share a single string
+    return (
+        strings.intern(node.stack_name),
+        strings.intern(node.stack_id),
+        strings.intern(node.export_name),
+        strings.intern(node.export_value),
+        strings.intern(node.parent_id),
+        strings.intern(node.root_id),
+        strings.intern(None if node.tags is None else json.dumps(node.tags, sort_keys=True)),
+        strings.intern(json.dumps(node.outputs) if node.outputs else None),
+    )
+
+
+def save_snapshot(graph_data: dict[str, NodeData], path: Path, *, compress: bool = False) -> None:
+    """Serialize graph data into a compact, versioned binary snapshot.
+
+    Args:
+        graph_data: The graph data, as returned by ``get_graph_data``.
+        path: Where the snapshot is written.
+        compress: Compress the payload with zlib. Compressed snapshots are smaller but can not be memory-mapped.
+
+    Note:
+        Exports are written sorted by export name so identical graph data always produces identical bytes.
+    """
+    strings = _StringTable()
+    export_rows = array('I')
+    import_rows = array('I')
+
+    for export_idx, export_name in enumerate(sorted(graph_data)):
+        export = graph_data[export_name]
+        export_rows.extend(__node_columns(strings, export))
+        for importing_stack in export.importing_stacks:
+            import_rows.append(export_idx)
+            import_rows.extend(__node_columns(strings, importing_stack))
+
+    offsets = array('I', [0])
+    encoded = [value.encode() for value in strings.values]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    blob = b''.join(encoded)
+
+    payload = b''.join((__to_le(offsets), __to_le(export_rows), __to_le(import_rows), blob))
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= FLAG_ZLIB
+
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        flags,
+        0,
+        len(strings.values),
+        len(export_rows) // _EXPORT_COLUMNS,
+        len(import_rows) // _IMPORT_COLUMNS,
+        len(blob),
+    )
+    with Path.open(Path(path), 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    log.info('saved snapshot of %s exports and %s imports to %s', len(graph_data), len(import_rows) // _IMPORT_COLUMNS, path)
+
+
+def __read_header(buffer: memoryview | bytes, path: Path) -> tuple[int, int, int, int, int, int]:
+    if len(buffer) < _HEADER.size:
+        err_msg = f'File is too small to be a cycl snapshot: {path}'
+        raise InvalidSnapshotError(err_msg)
+
+    magic, version, flags, _, n_strings, n_exports, n_imports, blob_len = _HEADER.unpack_from(buffer)
+    if magic != SNAPSHOT_MAGIC:
+        err_msg = f'File is not a cycl snapshot: {path}'
+        raise InvalidSnapshotError(err_msg)
+    if version > SNAPSHOT_VERSION:
+        err_msg = f'Snapshot version {version} is newer than the supported version {SNAPSHOT_VERSION}: {path}'
+        raise InvalidSnapshotError(err_msg)
+    if version not in _NODE_COLUMNS:
+        err_msg = f'Snapshot version {version} is not a supported version: {path}'
+        raise InvalidSnapshotError(err_msg)
+    return version, flags, n_strings, n_exports, n_imports, blob_len
+
+
+def __decode(buffer: memoryview | bytes, path: Path) -> dict[str, NodeData]:
+    version, flags, n_strings, n_exports, n_imports, blob_len = __read_header(buffer, path)
+    export_columns = _NODE_COLUMNS[version]
+    import_columns = 1 + export_columns
+
+    body: memoryview | bytes = buffer
+    start = _HEADER.size
+    if flags & FLAG_ZLIB:
+        try:
+            body = zlib.decompress(buffer[_HEADER.size :])
+        except zlib.error as err:
+            err_msg = f'Snapshot payload could not be decompressed: {path}'
+            raise InvalidSnapshotError(err_msg) from err
+        start = 0
+
+    expected_len = 4 * (n_strings + 1 + export_columns * n_exports + import_columns * n_imports) + blob_len
+    if len(body) - start != expected_len:
+        err_msg = f'Snapshot is truncated or corrupt: {path}'
+        raise InvalidSnapshotError(err_msg)
+
+    with memoryview(body) as payload:
+        offsets = __from_le(payload, start, n_strings + 1)
+        start += 4 * (n_strings + 1)
+        export_rows = __from_le(payload, start, export_columns * n_exports)
+        start += 4 * export_columns * n_exports
+        import_rows = __from_le(payload, start, import_columns * n_imports)
+        start += 4 * import_columns * n_imports
+        with payload[start:] as blob_view:
+            blob = bytes(blob_view)
+
+    # slicing the blob can't fail, so the string offsets are checked up front
+    if offsets[0] != 0 or offsets[-1] != blob_len or any(a > b for a, b in zip(offsets, offsets[1:])):
+        err_msg = f'Snapshot is truncated or corrupt: {path}'
+        raise InvalidSnapshotError(err_msg)
+
+    try:
+        return __build_graph_data(offsets, export_rows, import_rows, blob, export_columns)
+    except (IndexError, ValueError) as err:
+        # an index past the end of the string or export table, or a string which is not utf-8, or not json
+        err_msg = f'Snapshot is truncated or corrupt: {path}'
+        raise InvalidSnapshotError(err_msg) from err
+
+
+def __build_graph_data(
+    offsets: list[int], export_rows: list[int], import_rows: list[int], blob: bytes, export_columns: int
+) -> dict[str, NodeData]:
+    import_columns = 1 + export_columns
+    strings = [blob[offsets[i] : offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+    def string(idx: int) -> str | None:
+        return None if idx == _NONE else strings[idx]
+
+    def node(  # noqa: PLR0913
+        stack_name: int,
+        stack_id: int,
+        export_name: int,
+        export_value: int,
+        parent_id: int = _NONE,
+        root_id: int = _NONE,
+        tags: int = _NONE,
+        outputs: int = _NONE,
+    ) -> NodeData:
+        return NodeData(
+            stack_name=strings[stack_name],
+            stack_id=string(stack_id),
+            export_name=string(export_name),
+            export_value=string(export_value),
+            parent_id=string(parent_id),
+            root_id=string(root_id),
+            tags=None if tags == _NONE else json.loads(strings[tags]),
+            outputs=None if outputs == _NONE else json.loads(strings[outputs]),
+        )
+
+    # zipping one iterator with itself walks the flat tables a row at a time
+    export_cells = iter(export_rows)
+    exports = [node(*row) for row in zip(*[export_cells] * export_columns)]
+    # importing stacks repeat across exports, so identical rows share a single instance
+    importing_stacks: dict[tuple[int, ...], NodeData] = {}
+    import_cells = iter(import_rows)
+    for export_idx, *columns in zip(*[import_cells] * import_columns):
+        key = tuple(columns)
+        importing_stack = importing_stacks.get(key)
+        if importing_stack is None:
+            importing_stack = importing_stacks[key] = node(*key)
+        exports[export_idx].importing_stacks.append(importing_stack)
+
+    return {export.export_name or '': export for export in exports}
+
+
+def load_snapshot(path: Path) -> dict[str, NodeData]:
+    """Load graph data from a snapshot written by ``save_snapshot``.
+
+    Args:
+        path: Path to the snapshot.
+
+    Returns:
+        The graph data, in the same shape ``get_graph_data`` returns it.
+
+    Raises:
+        InvalidSnapshotError: If the file is missing, is not a snapshot, is corrupt, or is from an unknown version,
+            ex. a newer version of cycl.
+
+    Note:
+        Uncompressed snapshots are memory-mapped and the index tables are read in place.
+    """
+    path = Path(path)
+    if not path.is_file():
+        err_msg = f'Snapshot does not exist or is not a file: {path}'
+        raise InvalidSnapshotError(err_msg)
+
+    with Path.open(path, 'rb') as f:
+        if path.stat().st_size == 0:
+            return __decode(b'', path)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                graph_data = __decode(view, path)
+            finally:
+                view.release()
+    log.info('loaded snapshot of %s exports from %s', len(graph_data), path)
+    return graph_data
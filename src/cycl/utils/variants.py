@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from logging import getLogger
+from typing import TYPE_CHECKING, Callable
+
+from cycl.utils.backends import get_backend, is_acyclic, topological_generations
+from cycl.utils.cycles import find_cycles_batch
+from cycl.utils.edge_store import EdgeStore
+from cycl.utils.graph import selfloop_policy
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+    import networkx as nx
+
+    from cycl.models.node_data import NodeData
+
+log = getLogger(__name__)
+
+
+class Variant:
+    """A "what if" configuration of the dependency graph, the arguments ``build_graph`` takes to shape it."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        node_key_fn: Callable[[NodeData], Hashable] = lambda x: x.stack_name,
+        nodes_to_ignore: list[str] | None = None,
+        edges_to_ignore: list[list[str]] | None = None,
+        *,
+        remove_selfloops: bool = False,
+        selfloops: str = 'keep',
+    ) -> None:
+        self.name = name
+        self.node_key_fn = node_key_fn
+        self.nodes_to_ignore = nodes_to_ignore or []
+        self.edges_to_ignore = edges_to_ignore or []
+        self.remove_selfloops = remove_selfloops
+        self.selfloops = selfloop_policy(selfloops, remove_selfloops=remove_selfloops)
+
+    def __repr__(self) -> str:
+        return f'Variant({self.name!r})'
+
+
+class VariantResult:
+    """The dependency graph of a variant, with its cycles, or its topological generations when it is acyclic."""
+
+    def __init__(
+        self,
+        variant: Variant,
+        graph: nx.DiGraph,
+        cycles: list[list[Hashable]],
+        generations: list[list[Hashable]] | None = None,
+    ) -> None:
+        self.variant = variant
+        self.graph = graph
+        self.cycles = cycles
+        self.generations = generations
+
+    @property
+    def cyclic(self) -> bool:
+        return self.generations is None
+
+    def __repr__(self) -> str:
+        return f'VariantResult({self.variant.name!r}, cycles={len(self.cycles)}, cyclic={self.cyclic})'
+
+
+def check_variants(
+    graph_data: dict[str, NodeData],
+    variants: list[Variant],
+    max_cycle_length: int | None = None,
+    max_workers: int | None = None,
+    backend: str | None = None,
+) -> list[VariantResult]:
+    """Evaluate many variants of the dependency graph built from the same graph data.
+
+    The graph data is indexed once into an ``EdgeStore``, which groups the imports between each pair of stacks and
+    computes node keys once per key function, and the graph of each variant is built from it. Strongly connected
+    components shared by several variants are only searched for cycles once, and large components are searched in
+    parallel, see ``find_cycles_batch``.
+
+    Args:
+        graph_data: The graph data, as returned by ``get_graph_data``.
+        variants: The configurations to evaluate.
+        max_cycle_length: The maximum number of nodes in a cycle, or None to find every cycle.
+        max_workers: The maximum number of processes used to search components.
+        backend: The graph algorithm backend cycles and generations are found with, see ``get_backend``.
+
+    Returns:
+        The result of each variant, in the order of ``variants``.
+    """
+    store = EdgeStore.from_graph_data(graph_data)
+    graphs = [
+        store.build_graph(
+            variant.node_key_fn,
+            variant.nodes_to_ignore,
+            variant.edges_to_ignore,
+            selfloops=variant.selfloops,
+            weighted=True,
+        )
+        for variant in variants
+    ]
+    log.info('built %s variants from %s stacks and %s dependencies', len(variants), len(store.nodes), len(store.pairs))
+
+    graph_backend = get_backend(backend)
+    results = []
+    batch = find_cycles_batch(graphs, max_cycle_length, max_workers, backend=graph_backend.name)
+    for variant, graph, cycles in zip(variants, graphs, batch):
+        generations = None
+        if not cycles and is_acyclic(graph, graph_backend):
+            generations = [sorted(generation, key=str) for generation in topological_generations(graph, graph_backend)]
+        results.append(VariantResult(variant, graph, cycles, generations))
+    return results
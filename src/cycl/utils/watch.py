@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from collections import Counter
+from logging import getLogger
+from typing import TYPE_CHECKING, cast
+
+import networkx as nx
+
+from cycl.utils.cdk import InvalidCdkOutPathError, get_template_paths, validate_cdk_out_path
+from cycl.utils.cycles import iter_cycles
+from cycl.utils.graph import edge_weights
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterator
+    from pathlib import Path
+
+log = getLogger(__name__)
+
+# see inotify(7), changes to the files of a directory and to the directory itself
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_INOTIFY_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+
+
+class _Poller:
+    """Wakes up every interval, changed templates are then found by comparing their modification times."""
+
+    settles = False
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class _Inotify:
+    """Wakes up as soon as anything in the cloud assembly changes, using the Linux inotify API through ctypes."""
+
+    settles = True
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watch_directories()
+
+    def _watch_directories(self) -> None:
+        # watching a directory twice is a no-op, so this also picks up directories created by a synth
+        for directory in [self.root, *(path for path in self.root.rglob('*') if path.is_dir())]:
+            self.libc.inotify_add_watch(self.fd, os.fsencode(directory), _INOTIFY_MASK)
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        self._watch_directories()
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def __make_waiter(root: Path) -> _Poller | _Inotify:
+    if sys.platform.startswith('linux'):
+        try:
+            return _Inotify(root)
+        except (OSError, AttributeError) as err:
+            log.info('inotify is unavailable, polling for changes instead: %s', err)
+    return _Poller()
+
+
+def __template_stats(root: Path) -> dict[Path, tuple[int, int]]:
+    stats = {}
+    try:
+        templates = get_template_paths(root)
+    except InvalidCdkOutPathError:  # removed while cdk synth rewrites it
+        return {}
+    for template in templates:
+        try:
+            stat = template.stat()
+        except FileNotFoundError:
+            continue
+        stats[template] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+def iter_template_changes(cdk_out_path: Path, interval: float = 0.5, settle: float = 0.2) -> Iterator[list[Path]]:
+    """Yield the templates which were added, changed or removed, each time the cloud assembly changes.
+
+    Changes are detected with inotify where it is available, or by polling every ``interval`` seconds otherwise.
+    With inotify, changes are only reported once nothing changed for ``settle`` seconds, so a synth in progress
+    is reported once it completes.
+
+    Args:
+        cdk_out_path: Path to cdk.out/, or the directory containing it.
+        interval: Seconds between polls, or between checks for a stop when using inotify.
+        settle: Seconds without changes after which a change is reported, when using inotify.
+
+    Yields:
+        The sorted paths of the templates which changed.
+    """
+    root = validate_cdk_out_path(cdk_out_path)
+    stats = __template_stats(root)
+    waiter = __make_waiter(root)
+    try:
+        while True:
+            if not waiter.wait(interval):
+                continue
+            if waiter.settles:
+                while waiter.wait(settle):
+                    pass
+            new_stats = __template_stats(root)
+            changed = sorted(path for path in stats.keys() | new_stats.keys() if stats.get(path) != new_stats.get(path))
+            stats = new_stats
+            if changed:
+                yield changed
+    finally:
+        waiter.close()
+
+
+class IncrementalCycleChecker:
+    """Finds the cycles of successive versions of a graph, only searching the components affected by changes.
+
+    A cyclic strongly connected component is searched again when it is new, or when an edge touching one of its
+    nodes was added, removed or changed weight since the previous check. The cycles of other components are reused.
+    """
+
+    def __init__(self, max_length: int | None = None, backend: str | None = None) -> None:
+        self.max_length = max_length
+        self.backend = backend
+        self._edges: Counter[tuple[Hashable, Hashable]] = Counter()
+        self._cycles: dict[frozenset, list[list[Hashable]]] = {}
+
+    def check(self, graph: nx.DiGraph) -> tuple[list[list[Hashable]], int]:
+        """Find the cycles of the graph, in the canonical order of ``find_cycles``.
+
+        Args:
+            graph: The latest version of the dependency graph.
+
+        Returns:
+            The cycles, and the number of components which were searched.
+        """
+        edges = edge_weights(graph)
+        changed = (edges - self._edges) + (self._edges - edges)
+        affected = {node for edge in changed for node in edge}
+
+        cycles: dict[frozenset, list[list[Hashable]]] = {}
+        searched = 0
+        for component in nx.strongly_connected_components(graph):
+            scc = frozenset(component)
+            if len(scc) == 1 and not graph.has_edge(*scc, *scc):
+                continue
+            if scc in self._cycles and scc.isdisjoint(affected):
+                cycles[scc] = self._cycles[scc]
+                continue
+            subgraph = cast('nx.DiGraph', graph.subgraph(scc))
+            cycles[scc] = list(iter_cycles(subgraph, max_length=self.max_length, backend=self.backend))
+            searched += 1
+
+        self._edges = edges
+        self._cycles = cycles
+        ordered = sorted(cycles.items(), key=lambda item: min(map(str, item[0])))
+        return [cycle for _, scc_cycles in ordered for cycle in scc_cycles], searched
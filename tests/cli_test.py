@@ -1,13 +1,19 @@
 import json
 import logging
 import sys
+from datetime import datetime, timezone
+from pathlib import Path
 from unittest.mock import patch
 
 import networkx as nx
 import pytest
 
 import cycl.cli as cli_module
+import cycl.cycl as cycl_module
 from cycl.cli import app
+from cycl.models.node_data import NodeData, StackCache
+from cycl.utils.local_cfn import LocalCloudFormationClient
+from cycl.utils.metrics import MetricsStore
 
 
 @pytest.fixture(autouse=True)
@@ -17,6 +23,26 @@ def mock_build_graph():
         yield mock
 
 
+@pytest.fixture(autouse=True)
+def mock_get_graph_data():
+    with patch.object(cli_module, 'get_graph_data') as mock:
+        mock.return_value = {}
+        yield mock
+
+
+@pytest.fixture(autouse=True)
+def mock_load_snapshot():
+    with patch.object(cli_module, 'load_snapshot') as mock:
+        mock.return_value = {}
+        yield mock
+
+
+@pytest.fixture(autouse=True)
+def mock_save_snapshot():
+    with patch.object(cli_module, 'save_snapshot') as mock:
+        yield mock
+
+
 @pytest.fixture(autouse=True)
 def mock_configure_log():
     with patch.object(cli_module, 'configure_log') as mock:
@@ -30,7 +56,7 @@ def test_app_no_cmd_displays_help(capsys):
 
     assert err.value.code == 0
     console_output = capsys.readouterr().out
-    assert 'usage: cycl [-h] {check,topo}' in console_output
+    assert 'usage: cycl [-h] {check,topo,snapshot,diff,serve,stats,critical-path}' in console_output
     assert 'Check circular dependencies between imports and exports.' in console_output
 
 
@@ -173,8 +199,805 @@ def test_app_topo_acyclic_ignore_passes_arg(mock_build_graph, cmd):
         app()
 
     mock_build_graph.assert_called_once_with(
+        graph_data=None,
         cdk_out_path=None,
         nodes_to_ignore=['3'],
         edges_to_ignore=[],
+        cfn_client=None,
+        endpoint_url=None,
+        offline=False,
+        collector='exports',
+        collapse_nested=False,
+        selfloops='keep',
+        weighted=True,
+        low_memory=False,
+        focus=None,
+        focus_radius=None,
+    )
+    assert err.value.code == 0
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_from_snapshot_passes_graph_data(mock_build_graph, mock_load_snapshot, cmd):
+    graph_data = {'some-name-1': NodeData(stack_name='some-stack-name-1', export_name='some-name-1')}
+    mock_load_snapshot.return_value = graph_data
+    sys.argv = ['cycl', cmd, '--from-snapshot', 'graph.cycl']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    mock_load_snapshot.assert_called_once_with(Path('graph.cycl'))
+    mock_build_graph.assert_called_once_with(
+        graph_data=graph_data,
+        cdk_out_path=None,
+        nodes_to_ignore=[],
+        edges_to_ignore=[],
+        cfn_client=None,
+        endpoint_url=None,
+        offline=False,
+        collector='exports',
+        collapse_nested=False,
+        selfloops='keep',
+        weighted=True,
+        low_memory=False,
+        focus=None,
+        focus_radius=None,
     )
+
+
+def test_app_from_snapshot_with_cdk_out_stands_in_for_aws(mock_build_graph):
+    client = LocalCloudFormationClient({'some-name-1': NodeData(stack_name='some-stack-name-1')})
+    sys.argv = ['cycl', 'check', '--from-snapshot', 'graph.cycl', '--cdk-out', 'cdk.out']
+
+    with (
+        patch.object(LocalCloudFormationClient, 'from_snapshot', return_value=client) as mock_from_snapshot,
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 0
+    mock_from_snapshot.assert_called_once_with(Path('graph.cycl'))
+    assert mock_build_graph.call_args.kwargs['cfn_client'] is client
+    assert mock_build_graph.call_args.kwargs['graph_data'] is None
+    assert mock_build_graph.call_args.kwargs['cdk_out_path'] == Path('cdk.out')
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_endpoint_url_passes_arg(mock_build_graph, cmd):
+    sys.argv = ['cycl', cmd, '--endpoint-url', 'http://127.0.0.1:8080']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
     assert err.value.code == 0
+    assert mock_build_graph.call_args.kwargs['endpoint_url'] == 'http://127.0.0.1:8080'
+
+
+def test_app_check_show_exports(capsys, mock_build_graph):
+    graph = nx.DiGraph()
+    graph.graph['exports'] = ['vpc-id', 'role-arn']
+    graph.add_edge(1, 2, weight=1, exports=[0])
+    graph.add_edge(2, 1, weight=1, exports=[1])
+    mock_build_graph.return_value = graph
+    sys.argv = ['cycl', 'check', '--show-exports', '--suggest-cuts']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    console_output = capsys.readouterr().out
+    assert 'cycle found: 1 -[vpc-id]-> 2 -[role-arn]-> 1\n' in console_output
+    assert 'suggested cut: 2 -> 1 (1 imports): role-arn\n' in console_output
+
+
+def test_app_check_suggest_cuts(capsys, mock_build_graph):
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from([(1, 2), (1, 2), (2, 1)])
+    mock_build_graph.return_value = graph
+    sys.argv = ['cycl', 'check', '--suggest-cuts']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    console_output = capsys.readouterr().out
+    assert 'suggested cut: 2 -> 1 (1 imports)' in console_output
+    assert '1 cuts removing 1 imports break every cycle' in console_output
+
+
+@pytest.mark.parametrize(
+    ('max_cycle_length', 'expected_output'),
+    [
+        ('2', 'cycle found between nodes: [1, 2]\n'),
+        ('1', ''),
+    ],
+)
+def test_app_check_max_cycle_length(capsys, caplog, mock_build_graph, max_cycle_length, expected_output):
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from([(1, 2), (2, 1), (2, 3), (3, 4), (4, 2)])
+    mock_build_graph.return_value = graph
+    sys.argv = ['cycl', 'check', '--max-cycle-length', max_cycle_length]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    assert capsys.readouterr().out == expected_output
+    assert ('graph is cyclic, but no cycle is through at most 1 nodes' in caplog.text) == (max_cycle_length == '1')
+
+
+def test_app_check_max_cycle_length_must_be_positive(capsys):
+    sys.argv = ['cycl', 'check', '--max-cycle-length', '0']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'must be a positive integer: 0' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_collapse_nested_passes_arg(mock_build_graph, cmd):
+    sys.argv = ['cycl', cmd, '--collapse-nested']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert mock_build_graph.call_args.kwargs['collapse_nested'] is True
+
+
+@pytest.mark.parametrize('arg', [['--from-snapshot', 'graph.cycl'], ['--endpoint-url', 'http://127.0.0.1:8080']])
+def test_app_offline_not_allowed_with_other_sources(capsys, mock_build_graph, arg):
+    sys.argv = ['cycl', 'check', '--offline', '--cdk-out', 'cdk.out', *arg]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --offline: not allowed with argument --from-snapshot or --endpoint-url' in capsys.readouterr().err
+    mock_build_graph.assert_not_called()
+
+
+@pytest.mark.parametrize('args', [[], ['--from-snapshot', 'graph.cycl', '--cdk-out', 'cdk.out']])
+def test_app_serve_requires_one_source(capsys, args):
+    sys.argv = ['cycl', 'serve', *args]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'exactly one of the arguments --from-snapshot --cdk-out is required' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    ('args', 'source'),
+    [
+        (['--from-snapshot', 'graph.cycl'], 'from_snapshot'),
+        (['--cdk-out', 'cdk.out'], 'from_assembly'),
+    ],
+)
+def test_app_serve(capsys, args, source):
+    client = LocalCloudFormationClient({'some-name-1': NodeData(stack_name='some-stack-name-1')})
+    sys.argv = ['cycl', 'serve', '--port', '0', '--page-size', '5', *args]
+
+    with (
+        patch.object(LocalCloudFormationClient, source, return_value=client) as mock_source,
+        patch.object(cli_module, 'LocalCloudFormationServer') as mock_server,
+    ):
+        mock_server.return_value.url = 'http://127.0.0.1:1234'
+        mock_server.return_value.serve_forever.side_effect = KeyboardInterrupt
+        with pytest.raises(SystemExit) as err:
+            app()
+
+    assert err.value.code == 0
+    mock_source.assert_called_once_with(Path(args[1]), page_size=5)
+    mock_server.assert_called_once_with(client, host='127.0.0.1', port=0)
+    mock_server.return_value.server_close.assert_called_once()
+    assert 'serving 1 exports at http://127.0.0.1:1234' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_app_snapshot_save(mock_get_graph_data, mock_save_snapshot, mock_build_graph, compress):
+    graph_data = {'some-name-1': NodeData(stack_name='some-stack-name-1', export_name='some-name-1')}
+    mock_get_graph_data.return_value = graph_data
+    sys.argv = ['cycl', 'snapshot', 'save', 'graph.cycl', '--cdk-out', 'cdk.out']
+    if compress:
+        sys.argv.append('--compress')
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    mock_get_graph_data.assert_called_once_with(
+        cdk_out_path=Path('cdk.out'), endpoint_url=None, offline=False, collector='exports'
+    )
+    mock_save_snapshot.assert_called_once_with(graph_data, Path('graph.cycl'), compress=compress)
+    mock_build_graph.assert_not_called()
+
+
+def test_app_snapshot_load(capsys, mock_load_snapshot):
+    mock_load_snapshot.return_value = {
+        'some-name-1': NodeData(
+            stack_name='some-stack-name-1',
+            stack_id='some-stack-id-1',
+            export_name='some-name-1',
+            export_value='some-value-1',
+            importing_stacks=[NodeData(stack_name='some-stack-name-3'), NodeData(stack_name='some-stack-name-2')],
+        )
+    }
+    expected_output = json.dumps(
+        {
+            'some-name-1': {
+                'export_value': 'some-value-1',
+                'importing_stacks': ['some-stack-name-2', 'some-stack-name-3'],
+                'stack_id': 'some-stack-id-1',
+                'stack_name': 'some-stack-name-1',
+            }
+        },
+        indent=2,
+    )
+    sys.argv = ['cycl', 'snapshot', 'load', 'graph.cycl']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    mock_load_snapshot.assert_called_once_with(Path('graph.cycl'))
+    assert expected_output in capsys.readouterr().out
+
+
+def test_app_diff(capsys, mock_build_graph, mock_load_snapshot):
+    old_graph = nx.MultiDiGraph()
+    old_graph.add_edges_from([(1, 2)])
+    new_graph = nx.MultiDiGraph()
+    new_graph.add_edges_from([(1, 2), (2, 1)])
+    mock_build_graph.side_effect = [old_graph, new_graph]
+    sys.argv = ['cycl', 'diff', 'old.cycl', 'new.cycl', '--ignore-nodes', '3']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert mock_load_snapshot.call_count == 2
+    mock_build_graph.assert_called_with(
+        graph_data={}, nodes_to_ignore=['3'], edges_to_ignore=[], selfloops='keep', weighted=True
+    )
+    assert capsys.readouterr().out == '+ edge 2 -> 1\n+ scc [1, 2]\ngeneration 2: 1 -> 0\n'
+
+
+@pytest.mark.parametrize(
+    ('old_edges', 'expected_code'),
+    [
+        ([(1, 2)], 1),
+        ([(1, 2), (2, 1)], 0),
+    ],
+)
+def test_app_diff_exit_code(mock_build_graph, old_edges, expected_code):
+    old_graph = nx.MultiDiGraph()
+    old_graph.add_edges_from(old_edges)
+    new_graph = nx.MultiDiGraph()
+    new_graph.add_edges_from([(1, 2), (2, 1)])
+    mock_build_graph.side_effect = [old_graph, new_graph]
+    sys.argv = ['cycl', 'diff', 'old.cycl', 'new.cycl', '--exit-code']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == expected_code
+
+
+@pytest.mark.parametrize('cmd', [['check'], ['topo'], ['snapshot', 'save', 'graph.cycl']])
+def test_app_offline_requires_cdk_out(capsys, cmd):
+    sys.argv = ['cycl', *cmd, '--offline']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --offline: requires argument --cdk-out' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_offline_passes_arg(mock_build_graph, cmd):
+    sys.argv = ['cycl', cmd, '--offline', '--cdk-out', 'cdk.out']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    mock_build_graph.assert_called_once_with(
+        graph_data=None,
+        cdk_out_path=Path('cdk.out'),
+        nodes_to_ignore=[],
+        edges_to_ignore=[],
+        cfn_client=None,
+        endpoint_url=None,
+        offline=True,
+        collector='exports',
+        collapse_nested=False,
+        selfloops='keep',
+        weighted=True,
+        low_memory=False,
+        focus=None,
+        focus_radius=None,
+    )
+
+
+def test_app_check_watch_requires_cdk_out(capsys):
+    sys.argv = ['cycl', 'check', '--watch']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --watch: requires argument --cdk-out' in capsys.readouterr().err
+
+
+def test_app_check_watch(capsys, caplog, mock_build_graph, mock_get_graph_data):
+    caplog.set_level(logging.INFO)
+    acyclic_graph = nx.MultiDiGraph([('a', 'b')])
+    cyclic_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'a')])
+    mock_build_graph.side_effect = [acyclic_graph, RuntimeError('some-error'), cyclic_graph]
+    mock_get_graph_data.return_value = {'some-name-1': NodeData(stack_name='some-stack-name-1')}
+    sys.argv = ['cycl', 'check', '--watch', '--cdk-out', 'cdk.out']
+
+    with (
+        patch.object(cli_module, 'iter_template_changes', return_value=iter([['a'], ['b']])) as mock_changes,
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 0
+    mock_changes.assert_called_once_with(Path('cdk.out'))
+    deployed_call, *assembly_calls = mock_get_graph_data.call_args_list
+    stack_cache = deployed_call.kwargs.pop('stack_cache')
+    assert isinstance(stack_cache, StackCache)
+    assert deployed_call.kwargs == {'endpoint_url': None, 'collector': 'exports'}
+    assert len(assembly_calls) == 3
+    assert all(call.kwargs['template_cache'] is assembly_calls[0].kwargs['template_cache'] for call in assembly_calls)
+    assert all(call.kwargs['stack_cache'] is stack_cache for call in assembly_calls)
+    assert isinstance(assembly_calls[0].kwargs['cfn_client'], LocalCloudFormationClient)
+    assert assembly_calls[0].kwargs['cfn_client'].graph_data == mock_get_graph_data.return_value
+    assert 'check failed, waiting for the next change' in caplog.text
+    assert capsys.readouterr().out == "cycle found between nodes: ['a', 'b']\n"
+    assert '0 cycles found, searched 0 components in ' in caplog.text
+    assert '1 cycles found, searched 1 components in ' in caplog.text
+
+
+def test_app_check_watch_collapse_nested_collects_stacks(mock_get_graph_data):
+    sys.argv = ['cycl', 'check', '--watch', '--cdk-out', 'cdk.out', '--collapse-nested']
+
+    with (
+        patch.object(cli_module, 'iter_template_changes', return_value=iter([['a']])),
+        pytest.raises(SystemExit),
+    ):
+        app()
+
+    assert [call.kwargs['collector'] for call in mock_get_graph_data.call_args_list] == ['stacks', 'stacks', 'stacks']
+
+
+def test_app_check_watch_collapse_nested(capsys):
+    def stack_id(name):
+        return f'arn:aws:cloudformation:us-east-1:000000000000:stack/{name}/some-uuid'
+
+    graph_data = {
+        'child-export': NodeData(
+            stack_name='Child',
+            stack_id=stack_id('Child'),
+            root_id=stack_id('Root'),
+            export_name='child-export',
+            importing_stacks=[NodeData(stack_name='Other')],
+        ),
+        'other-export': NodeData(
+            stack_name='Other',
+            stack_id=stack_id('Other'),
+            export_name='other-export',
+            importing_stacks=[NodeData(stack_name='Root')],
+        ),
+    }
+    sys.argv = ['cycl', 'check', '--watch', '--cdk-out', 'cdk.out', '--from-snapshot', 'graph.cycl', '--collapse-nested']
+
+    with (
+        patch.object(cli_module, 'get_graph_data', cycl_module.get_graph_data),
+        patch.object(cli_module, 'build_graph', cycl_module.build_graph),
+        patch.object(cycl_module, 'get_assembly_data', return_value=({}, {})),
+        patch.object(LocalCloudFormationClient, 'from_snapshot', return_value=LocalCloudFormationClient(graph_data)),
+        patch.object(cli_module, 'iter_template_changes', return_value=iter([])),
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 0
+    assert capsys.readouterr().out == "cycle found between nodes: ['Other', 'Root']\n"
+
+
+def test_app_check_watch_stops_on_interrupt(mock_get_graph_data):
+    sys.argv = ['cycl', 'check', '--watch', '--offline', '--cdk-out', 'cdk.out']
+
+    with (
+        patch.object(cli_module, 'iter_template_changes', side_effect=KeyboardInterrupt),
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 0
+    mock_get_graph_data.assert_called_once()
+    assert mock_get_graph_data.call_args.kwargs['cfn_client'] is None
+
+
+def test_app_check_format_json(capsys, mock_build_graph):
+    mock_build_graph.return_value = nx.MultiDiGraph([('a', 'b'), ('b', 'a'), ('b', 'a')])
+    sys.argv = ['cycl', 'check', '--format', 'json', '--suggest-cuts']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    assert json.loads(capsys.readouterr().out) == {
+        'cycles': [{'nodes': ['a', 'b']}],
+        'cuts': [{'source': 'a', 'target': 'b', 'imports': 1}],
+        'stats': {'nodes': 2, 'edges': 3, 'imports': 3, 'cycles': 1, 'cyclic': True, 'cuts': 1},
+    }
+
+
+def test_app_check_format_sarif_locates_results_at_templates(capsys, mock_build_graph):
+    mock_build_graph.return_value = nx.MultiDiGraph([('a', 'b'), ('b', 'a')])
+    sys.argv = ['cycl', 'check', '--format', 'sarif', '--cdk-out', 'cdk.out']
+
+    with (
+        patch.object(
+            cli_module, 'get_stack_templates', return_value={'a': Path('cdk.out/a.template.json')}
+        ) as mock_get_stack_templates,
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 1
+    mock_get_stack_templates.assert_called_once_with(Path('cdk.out'))
+    (result,) = json.loads(capsys.readouterr().out)['runs'][0]['results']
+    assert [location.get('physicalLocation') for location in result['locations']] == [
+        {'artifactLocation': {'uri': 'cdk.out/a.template.json'}, 'region': {'startLine': 1}},
+        None,
+    ]
+
+
+def test_app_check_format_sarif_without_cdk_out_has_no_templates():
+    sys.argv = ['cycl', 'check', '--format', 'sarif']
+
+    with (
+        patch.object(cli_module, 'get_stack_templates') as mock_get_stack_templates,
+        pytest.raises(SystemExit),
+    ):
+        app()
+
+    mock_get_stack_templates.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ('edges', 'expected_code', 'expected_output'),
+    [
+        (
+            [(2, 1), (3, 1)],
+            0,
+            [
+                {'type': 'generation', 'generation': 0, 'nodes': [2, 3]},
+                {'type': 'generation', 'generation': 1, 'nodes': [1]},
+                {'type': 'stats', 'nodes': 3, 'edges': 2, 'imports': 2, 'cycles': 0, 'cyclic': False, 'generations': 2},
+            ],
+        ),
+        (
+            [(1, 1)],
+            1,
+            [
+                {'type': 'cycle', 'nodes': [1]},
+                {'type': 'stats', 'nodes': 1, 'edges': 1, 'imports': 1, 'cycles': 1, 'cyclic': True},
+            ],
+        ),
+    ],
+)
+def test_app_topo_format_ndjson(capsys, mock_build_graph, edges, expected_code, expected_output):
+    mock_build_graph.return_value = nx.MultiDiGraph(edges)
+    sys.argv = ['cycl', 'topo', '--format', 'ndjson']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == expected_code
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == expected_output
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_low_memory_passes_arg(mock_build_graph, cmd):
+    sys.argv = ['cycl', cmd, '--low-memory']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert mock_build_graph.call_args.kwargs['low_memory'] is True
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--from-snapshot', 'graph.cycl'],
+        ['--collector', 'stacks'],
+        ['--collapse-nested'],
+        ['--watch', '--cdk-out', 'cdk.out'],
+    ],
+)
+def test_app_low_memory_not_allowed_with_other_sources(capsys, mock_build_graph, args):
+    sys.argv = ['cycl', 'check', '--low-memory', *args]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --low-memory: not allowed with argument --from-snapshot' in capsys.readouterr().err
+    mock_build_graph.assert_not_called()
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_focus_passes_args(mock_build_graph, cmd):
+    sys.argv = ['cycl', cmd, '--focus', 'some-stack-1', 'some-stack-2', '--radius', '2']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert mock_build_graph.call_args.kwargs['focus'] == ['some-stack-1', 'some-stack-2']
+    assert mock_build_graph.call_args.kwargs['focus_radius'] == 2
+    assert mock_build_graph.call_args.kwargs['cfn_client'] is None
+
+
+def test_app_focus_crawls_snapshot(mock_build_graph):
+    client = LocalCloudFormationClient({'some-name-1': NodeData(stack_name='some-stack-name-1')})
+    sys.argv = ['cycl', 'check', '--focus', 'some-stack-name-1', '--from-snapshot', 'graph.cycl']
+
+    with (
+        patch.object(LocalCloudFormationClient, 'from_snapshot', return_value=client) as mock_from_snapshot,
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 0
+    mock_from_snapshot.assert_called_once_with(Path('graph.cycl'))
+    assert mock_build_graph.call_args.kwargs['cfn_client'] is client
+    assert mock_build_graph.call_args.kwargs['graph_data'] is None
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--offline', '--cdk-out', 'cdk.out'],
+        ['--collector', 'stacks'],
+        ['--collapse-nested'],
+        ['--watch', '--cdk-out', 'cdk.out'],
+    ],
+)
+def test_app_focus_not_allowed_with_other_sources(capsys, mock_build_graph, args):
+    sys.argv = ['cycl', 'check', '--focus', 'some-stack-1', *args]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --focus: not allowed with argument --offline' in capsys.readouterr().err
+    mock_build_graph.assert_not_called()
+
+
+def test_app_radius_requires_focus(capsys):
+    sys.argv = ['cycl', 'check', '--radius', '2']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --radius: requires argument --focus' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+def test_app_metrics_db_records_runs(capsys, tmp_path, mock_build_graph, cmd):
+    mock_build_graph.return_value = nx.MultiDiGraph([('a', 'b'), ('b', 'a'), ('b', 'c')])
+    metrics_db = tmp_path / 'metrics.db'
+    sys.argv = ['cycl', cmd, '--metrics-db', str(metrics_db), '--metrics-account', 'some-account']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    capsys.readouterr()
+    sys.argv = ['cycl', 'stats', str(metrics_db), '--format', 'json']
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    [trend] = json.loads(capsys.readouterr().out)
+    assert trend['account'] == 'some-account'
+    assert {key: trend[key] for key in ('runs', 'nodes', 'edges', 'largest_scc', 'depth', 'cycles', 'cyclic_runs')} == {
+        'runs': 1,
+        'nodes': 3,
+        'edges': 3,
+        'largest_scc': 2,
+        'depth': 2,
+        'cycles': 1,
+        'cyclic_runs': 1,
+    }
+
+
+def test_app_stats_requires_existing_db(capsys, tmp_path):
+    metrics_db = tmp_path / 'metrics.db'
+    sys.argv = ['cycl', 'stats', str(metrics_db)]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert f'argument path: metrics database does not exist: {metrics_db}' in capsys.readouterr().err
+    assert not metrics_db.exists()
+
+
+def test_app_stats_text(capsys, tmp_path):
+    store = MetricsStore(tmp_path / 'metrics.db')
+    metrics = {'nodes': 12, 'edges': 3, 'imports': 4, 'largest_scc': 1, 'depth': 2, 'cycles': 0, 'cyclic': False}
+    store.record('some-account', 'check', metrics, recorded_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    store.close()
+    sys.argv = ['cycl', 'stats', str(tmp_path / 'metrics.db'), '--account', 'some-account']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert capsys.readouterr().out.splitlines() == [
+        'account       day         runs  nodes  edges  imports  largest_scc  depth  cycles  cyclic_runs',
+        'some-account  2024-01-01  1     12     3      4        1            2      0       0',
+    ]
+
+
+def test_app_metrics_db_not_allowed_with_watch(capsys):
+    sys.argv = ['cycl', 'check', '--watch', '--cdk-out', 'cdk.out', '--metrics-db', 'metrics.db']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --metrics-db: not allowed with argument --watch' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo', 'critical-path'])
+def test_app_selfloops_passes_arg(mock_build_graph, cmd):
+    sys.argv = ['cycl', cmd, '--selfloops', 'drop', '--durations', 'durations.json']
+    if cmd != 'critical-path':
+        sys.argv = sys.argv[:-2]
+
+    with patch.object(cli_module, 'load_durations', return_value={}), pytest.raises(SystemExit):
+        app()
+
+    assert mock_build_graph.call_args.kwargs['selfloops'] == 'drop'
+
+
+def test_app_check_reports_selfloops(capsys, caplog, mock_build_graph):
+    graph = nx.DiGraph([('a', 'b')], selfloops={'b': 1, 'a': 2})
+    mock_build_graph.return_value = graph
+    sys.argv = ['cycl', 'check', '--selfloops', 'report', '--format', 'json']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert json.loads(capsys.readouterr().out)['stats']['selfloop_imports'] == 3
+    assert [record.message for record in caplog.records if record.levelno == logging.WARNING] == [
+        'a imports 2 of its own exports',
+        'b imports 1 of its own exports',
+    ]
+
+
+def test_app_diff_selfloops_passes_arg(mock_build_graph):
+    sys.argv = ['cycl', 'diff', 'old.json', 'new.json', '--selfloops', 'report']
+
+    with patch.object(cli_module, 'load_snapshot', return_value={}), pytest.raises(SystemExit):
+        app()
+
+    assert [call.kwargs['selfloops'] for call in mock_build_graph.call_args_list] == ['report', 'report']
+
+
+@pytest.mark.parametrize('cmd', ['check', 'topo'])
+@pytest.mark.parametrize('backend', ['auto', 'networkx'])
+def test_app_backend(capsys, mock_build_graph, cmd, backend):
+    mock_build_graph.return_value = nx.MultiDiGraph([(1, 2), (2, 1), (2, 3)])
+    sys.argv = ['cycl', cmd, '--backend', backend]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    if cmd == 'check':
+        assert capsys.readouterr().out == 'cycle found between nodes: [1, 2]\n'
+
+
+def test_app_backend_must_be_installed(capsys):
+    sys.argv = ['cycl', 'check', '--backend', 'igraph']
+
+    with patch.object(cli_module, 'available_backends', return_value=['networkx']), pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --backend: igraph is not installed, ex. pip install cycl[igraph]' in capsys.readouterr().err
+
+
+def test_app_critical_path(capsys, tmp_path, mock_build_graph):
+    mock_build_graph.return_value = nx.DiGraph([('a', 'b'), ('a', 'c')])
+    durations = tmp_path / 'durations.json'
+    durations.write_text(json.dumps({'a': 60, 'b': 600, 'c': 30}))
+    sys.argv = ['cycl', 'critical-path', '--durations', str(durations)]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 0
+    assert capsys.readouterr().out.splitlines() == [
+        'critical path (660s): a -> b',
+        'stack  duration  earliest_start  latest_start  slack',
+        'a      60        0               0             0',
+        'b      600       60              60            0',
+        'c      30        60              630           570',
+    ]
+
+
+def test_app_critical_path_from_stack_events(capsys, tmp_path, mock_build_graph):
+    mock_build_graph.return_value = nx.DiGraph([('a', 'b')])
+    sys.argv = [
+        'cycl',
+        'critical-path',
+        '--format',
+        'json',
+        '--durations-cache',
+        str(tmp_path / 'cache.json'),
+        '--endpoint-url',
+        'http://localhost:8000',
+    ]
+
+    with (
+        patch.object(cli_module, 'get_cfn_client') as mock_get_cfn_client,
+        patch.object(cli_module, 'get_deploy_durations', return_value={'a': 5.0}) as mock_get_deploy_durations,
+        pytest.raises(SystemExit) as err,
+    ):
+        app()
+
+    assert err.value.code == 0
+    mock_get_cfn_client.assert_called_once_with(endpoint_url='http://localhost:8000')
+    mock_get_deploy_durations.assert_called_once_with(
+        ['a', 'b'], cfn_client=mock_get_cfn_client.return_value, cache_path=tmp_path / 'cache.json'
+    )
+    assert json.loads(capsys.readouterr().out) == {
+        'path': ['a', 'b'],
+        'duration': 5.0,
+        'stacks': [
+            {'stack': 'a', 'duration': 5.0, 'earliest_start': 0.0, 'latest_start': 0.0, 'slack': 0.0},
+            {'stack': 'b', 'duration': 0.0, 'earliest_start': 5.0, 'latest_start': 5.0, 'slack': 0.0},
+        ],
+    }
+
+
+def test_app_critical_path_cyclic(caplog, mock_build_graph):
+    mock_build_graph.return_value = nx.DiGraph([('a', 'b'), ('b', 'a')])
+    sys.argv = ['cycl', 'critical-path', '--durations', 'durations.json']
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 1
+    assert 'the critical path can only be computed on an acyclic graph' in caplog.text
+
+
+@pytest.mark.parametrize('args', [['--offline', '--cdk-out', 'cdk.out'], ['--from-snapshot', 'graph.cycl']])
+def test_app_critical_path_requires_durations_without_aws(capsys, args):
+    sys.argv = ['cycl', 'critical-path', *args]
+
+    with pytest.raises(SystemExit) as err:
+        app()
+
+    assert err.value.code == 2
+    assert 'argument --durations: required with argument --offline or --from-snapshot' in capsys.readouterr().err
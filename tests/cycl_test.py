@@ -1,3 +1,5 @@
+import re
+import threading
 from pathlib import Path
 from unittest.mock import Mock, patch
 
@@ -5,26 +7,30 @@ import networkx as nx
 import pytest
 
 import cycl.cycl as cycl_module
+import cycl.utils.cfn as cfn_module
+import cycl.utils.edge_store as edge_store_module
 from cycl.cycl import build_graph, get_graph_data
-from cycl.models.node_data import NodeData
+from cycl.models.node_data import NodeData, StackCache
+from cycl.utils.cycles import find_cycles
+from cycl.utils.local_cfn import LocalCloudFormationClient
 from cycl.utils.testing import is_circular_reversible_permutation
 
 
 @pytest.fixture(autouse=True)
 def mock_boto3():
-    with patch.object(cycl_module, 'boto3') as mock:
+    with patch.object(cfn_module, 'boto3') as mock:
         yield mock
 
 
 @pytest.fixture(autouse=True)
 def mock_config():
-    with patch.object(cycl_module, 'Config') as mock:
+    with patch.object(cfn_module, 'Config') as mock:
         yield mock
 
 
 @pytest.fixture(autouse=True)
 def mock_session():
-    with patch.object(cycl_module, 'Session') as mock:
+    with patch.object(cfn_module, 'Session') as mock:
         yield mock
 
 
@@ -35,6 +41,13 @@ def mock_get_all_exports():
         yield mock
 
 
+@pytest.fixture(autouse=True)
+def mock_from_list_stacks():
+    with patch.object(StackCache, 'from_list_stacks', autospec=True) as mock:
+        mock.return_value = StackCache()
+        yield mock
+
+
 @pytest.fixture(autouse=True)
 def mock_get_all_imports():
     with patch.object(NodeData, 'get_all_imports', autospec=True) as mock:
@@ -43,9 +56,9 @@ def mock_get_all_imports():
 
 
 @pytest.fixture(autouse=True)
-def mock_get_exports_from_assembly():
-    with patch.object(cycl_module, 'get_exports_from_assembly', autospec=True) as mock:
-        mock.return_value = {}
+def mock_get_assembly_data():
+    with patch.object(cycl_module, 'get_assembly_data', autospec=True) as mock:
+        mock.return_value = ({}, {})
         yield mock
 
 
@@ -347,22 +360,27 @@ def test_build_graph_returns_graph_when_export_has_no_imports(subtests, mock_get
     assert next(nx.simple_cycles(actual_graph), []) == []
 
 
-def test_get_graph_data_returns_empty_graph_data_with_cdk_out_path(mock_get_exports_from_assembly):
+def test_get_graph_data_returns_empty_graph_data_with_cdk_out_path(mock_get_all_exports, mock_get_assembly_data):
     actual_graph_data = get_graph_data(cdk_out_path='some-cdk-out-path')
     assert actual_graph_data == {}
-    mock_get_exports_from_assembly.assert_called_once_with(Path('some-cdk-out-path'))
+    mock_get_assembly_data.assert_called_once_with(
+        Path('some-cdk-out-path'), known_export_names=set(mock_get_all_exports.return_value), template_cache=None
+    )
 
 
 def test_get_graph_data_returns_graph_data_with_cdk_out_path(
-    mock_get_all_exports, mock_get_all_imports, mock_get_exports_from_assembly
+    mock_get_all_exports, mock_get_all_imports, mock_get_assembly_data
 ):
-    mock_get_exports_from_assembly.return_value = {
-        'some-name-1': [
-            NodeData(
-                stack_name='some-cdk-out-stack-name-1',
-            )
-        ],
-    }
+    mock_get_assembly_data.return_value = (
+        {},
+        {
+            'some-name-1': [
+                NodeData(
+                    stack_name='some-cdk-out-stack-name-1',
+                )
+            ],
+        },
+    )
     mock_get_all_exports.return_value = {
         'some-name-1': NodeData(
             stack_id='some-exporting-stack-id-1',
@@ -401,13 +419,15 @@ def test_get_graph_data_returns_graph_data_with_cdk_out_path(
 
     actual_graph_data = get_graph_data(cdk_out_path='some-cdk-out-path')
 
-    mock_get_exports_from_assembly.assert_called_once_with(Path('some-cdk-out-path'))
+    mock_get_assembly_data.assert_called_once_with(
+        Path('some-cdk-out-path'), known_export_names=set(mock_get_all_exports.return_value), template_cache=None
+    )
     mock_get_all_imports.assert_called_once()
     assert actual_graph_data == expected_graph_data
 
 
 def test_get_graph_data_returns_graph_data_with_cdk_out_path_and_no_existing_exports(
-    mock_get_all_exports, mock_get_all_imports, mock_get_exports_from_assembly
+    mock_get_all_exports, mock_get_all_imports, mock_get_assembly_data
 ):
     """Handles the case where an export is missing during the first deployment.
 
@@ -415,13 +435,16 @@ def test_get_graph_data_returns_graph_data_with_cdk_out_path_and_no_existing_exp
     export and stack2 imports it, with dependsOn(), this will deploy successfully. We are unable to find the imported
     export so it should be safe to ignore in our graph.
     """
-    mock_get_exports_from_assembly.return_value = {
-        'some-name-1': [
-            NodeData(
-                stack_name='some-cdk-out-stack-name-1',
-            )
-        ],
-    }
+    mock_get_assembly_data.return_value = (
+        {},
+        {
+            'some-name-1': [
+                NodeData(
+                    stack_name='some-cdk-out-stack-name-1',
+                )
+            ],
+        },
+    )
 
     def mock_get_all_imports_side_effect_func(self, cfn_client):  # noqa: ARG001
         self.importing_stacks = []
@@ -448,7 +471,7 @@ def test_config_defined_as_expected(mock_config, mock_boto3):
     mock_boto3.client.assert_called_once_with('cloudformation', config=mock_config.return_value)
 
 
-def test_build_graph_returns_cyclic_graph(mock_get_graph_data, subtests, mock_get_exports_from_assembly):
+def test_build_graph_returns_cyclic_graph(mock_get_graph_data, subtests, mock_get_assembly_data):
     graph_data = {
         'some-name-1': NodeData(
             stack_id='some-exporting-stack-id-1',
@@ -482,7 +505,7 @@ def test_build_graph_returns_cyclic_graph(mock_get_graph_data, subtests, mock_ge
 
     actual_graph = build_graph()
 
-    mock_get_exports_from_assembly.assert_not_called()
+    mock_get_assembly_data.assert_not_called()
     for expected_node in expected_nodes:
         with subtests.test(msg='assert graph has node', expected_node=expected_node):
             assert actual_graph.has_node(expected_node)
@@ -503,9 +526,7 @@ def test_build_graph_returns_cyclic_graph(mock_get_graph_data, subtests, mock_ge
     assert len(actual_cycles) == len(expected_cycles)
 
 
-def test_build_graph_make_cyclic_graph_acyclic_with_ignore_nodes(
-    mock_get_graph_data, subtests, mock_get_exports_from_assembly
-):
+def test_build_graph_make_cyclic_graph_acyclic_with_ignore_nodes(mock_get_graph_data, subtests, mock_get_assembly_data):
     graph_data = {
         'some-name-1': NodeData(
             stack_id='some-exporting-stack-id-1',
@@ -538,7 +559,7 @@ def test_build_graph_make_cyclic_graph_acyclic_with_ignore_nodes(
 
     actual_graph = build_graph(nodes_to_ignore=['some-exporting-stack-id-2-name'])
 
-    mock_get_exports_from_assembly.assert_not_called()
+    mock_get_assembly_data.assert_not_called()
     for expected_node in expected_nodes:
         with subtests.test(msg='assert graph has node', expected_node=expected_node):
             assert actual_graph.has_node(expected_node)
@@ -553,9 +574,7 @@ def test_build_graph_make_cyclic_graph_acyclic_with_ignore_nodes(
     assert list(nx.simple_cycles(actual_graph)) == []
 
 
-def test_build_graph_make_cyclic_graph_acyclic_with_ignore_edges(
-    mock_get_graph_data, subtests, mock_get_exports_from_assembly
-):
+def test_build_graph_make_cyclic_graph_acyclic_with_ignore_edges(mock_get_graph_data, subtests, mock_get_assembly_data):
     graph_data = {
         'some-name-1': NodeData(
             stack_id='some-exporting-stack-id-1',
@@ -591,7 +610,7 @@ def test_build_graph_make_cyclic_graph_acyclic_with_ignore_edges(
         ]
     )
 
-    mock_get_exports_from_assembly.assert_not_called()
+    mock_get_assembly_data.assert_not_called()
     for expected_node in expected_nodes:
         with subtests.test(msg='assert graph has node', expected_node=expected_node):
             assert actual_graph.has_node(expected_node)
@@ -606,7 +625,7 @@ def test_build_graph_make_cyclic_graph_acyclic_with_ignore_edges(
     assert list(nx.simple_cycles(actual_graph)) == []
 
 
-def test_build_graph_includes_selfloop(mock_get_graph_data, subtests, mock_get_exports_from_assembly):
+def test_build_graph_includes_selfloop(mock_get_graph_data, subtests, mock_get_assembly_data):
     graph_data = {
         'some-name-1': NodeData(
             stack_id='some-exporting-stack-id-1',
@@ -629,7 +648,7 @@ def test_build_graph_includes_selfloop(mock_get_graph_data, subtests, mock_get_e
 
     actual_graph = build_graph()
 
-    mock_get_exports_from_assembly.assert_not_called()
+    mock_get_assembly_data.assert_not_called()
     for expected_node in expected_nodes:
         with subtests.test(msg='assert graph has node', expected_node=expected_node):
             assert actual_graph.has_node(expected_node)
@@ -650,7 +669,7 @@ def test_build_graph_includes_selfloop(mock_get_graph_data, subtests, mock_get_e
     assert len(actual_cycles) == len(expected_cycles)
 
 
-def test_build_graph_removes_selfloop(mock_get_graph_data, subtests, mock_get_exports_from_assembly):
+def test_build_graph_removes_selfloop(mock_get_graph_data, subtests, mock_get_assembly_data):
     graph_data = {
         'some-name-1': NodeData(
             stack_id='some-exporting-stack-id-1',
@@ -671,7 +690,7 @@ def test_build_graph_removes_selfloop(mock_get_graph_data, subtests, mock_get_ex
 
     actual_graph = build_graph(remove_selfloops=True)
 
-    mock_get_exports_from_assembly.assert_not_called()
+    mock_get_assembly_data.assert_not_called()
     for expected_node in expected_nodes:
         with subtests.test(msg='assert graph has node', expected_node=expected_node):
             assert actual_graph.has_node(expected_node)
@@ -692,6 +711,43 @@ def test_build_graph_removes_selfloop(mock_get_graph_data, subtests, mock_get_ex
     assert len(actual_cycles) == len(expected_cycles)
 
 
+@pytest.mark.parametrize('weighted', [True, False])
+@pytest.mark.parametrize(
+    ('kwargs', 'expected_edges', 'expected_report'),
+    [
+        ({}, [('a', 'a'), ('a', 'b')], None),
+        ({'selfloops': 'drop'}, [('a', 'b')], None),
+        ({'remove_selfloops': True}, [('a', 'b')], None),
+        ({'selfloops': 'report'}, [('a', 'b')], {'a': 2}),
+        ({'selfloops': 'report', 'edges_to_ignore': [['a', 'a']]}, [('a', 'b')], {}),
+    ],
+)
+def test_build_graph_selfloops(mock_get_graph_data, kwargs, expected_edges, expected_report, weighted):
+    mock_get_graph_data.return_value = {
+        f'some-name-{idx}': NodeData(
+            stack_name='a',
+            export_name=f'some-name-{idx}',
+            importing_stacks=[NodeData(stack_name='a'), NodeData(stack_name='b')],
+        )
+        for idx in range(2)
+    }
+
+    with patch.object(nx.DiGraph, 'remove_edges_from') as mock_remove_edges_from:
+        actual_graph = build_graph(weighted=weighted, **kwargs)
+
+    # self loops are left out as edges are inserted, rather than removed from the built graph
+    mock_remove_edges_from.assert_not_called()
+    assert sorted(set(actual_graph.edges())) == expected_edges
+    assert actual_graph.graph.get('selfloops') == expected_report
+    assert list(actual_graph) == ['a', 'b']
+
+
+def test_build_graph_raises_on_unknown_selfloops_policy(mock_get_graph_data):
+    with pytest.raises(ValueError, match="selfloops must be one of \\('keep', 'drop', 'report'\\), not 'some-policy'"):
+        build_graph(selfloops='some-policy')
+    mock_get_graph_data.assert_not_called()
+
+
 def test_build_graph_uses_node_key_fn(subtests, mock_get_graph_data):
     graph_data = {
         'some-name-1': NodeData(
@@ -850,3 +906,455 @@ def test_build_graph_returns_some_graph_with_multiple_node_data(subtests, mock_g
     for expected_node in expected_nodes:
         with subtests.test(msg='assert graph has node with attrs', expected_node=expected_node):
             assert actual_graph.nodes[expected_node['node_key']]['node_data'] == expected_node['node_data']
+
+
+def test_get_graph_data_merges_exports_from_cdk_out_path(mock_get_all_exports, mock_get_all_imports, mock_get_assembly_data):
+    mock_get_all_exports.return_value = {
+        'some-name-1': NodeData(stack_name='some-exporting-stack-name-1', export_name='some-name-1'),
+    }
+    mock_get_assembly_data.return_value = (
+        {
+            'some-name-1': NodeData(stack_name='some-cdk-out-stack-name-1', export_name='some-name-1'),
+            'some-name-2': NodeData(stack_name='some-cdk-out-stack-name-1', export_name='some-name-2'),
+        },
+        {'some-name-2': [NodeData(stack_name='some-cdk-out-stack-name-2', export_name='some-name-2')]},
+    )
+    expected_graph_data = {
+        'some-name-1': NodeData(stack_name='some-exporting-stack-name-1', export_name='some-name-1'),
+        'some-name-2': NodeData(
+            stack_name='some-cdk-out-stack-name-1',
+            export_name='some-name-2',
+            importing_stacks=[NodeData(stack_name='some-cdk-out-stack-name-2')],
+        ),
+    }
+
+    actual_graph_data = get_graph_data(cdk_out_path='some-cdk-out-path')
+
+    assert actual_graph_data == expected_graph_data
+    mock_get_all_imports.assert_called_once()  # only for the deployed export
+
+
+def test_get_graph_data_offline(mock_boto3, mock_get_all_exports, mock_get_all_imports, mock_get_assembly_data):
+    mock_get_assembly_data.return_value = (
+        {'some-name-1': NodeData(stack_name='some-cdk-out-stack-name-1', export_name='some-name-1')},
+        {'some-name-1': [NodeData(stack_name='some-cdk-out-stack-name-2', export_name='some-name-1')]},
+    )
+    expected_graph_data = {
+        'some-name-1': NodeData(
+            stack_name='some-cdk-out-stack-name-1',
+            export_name='some-name-1',
+            importing_stacks=[NodeData(stack_name='some-cdk-out-stack-name-2')],
+        ),
+    }
+
+    actual_graph_data = get_graph_data(cdk_out_path='some-cdk-out-path', offline=True)
+
+    assert actual_graph_data == expected_graph_data
+    mock_get_assembly_data.assert_called_once_with(Path('some-cdk-out-path'), known_export_names=set(), template_cache=None)
+    mock_boto3.client.assert_not_called()
+    mock_get_all_exports.assert_not_called()
+    mock_get_all_imports.assert_not_called()
+
+
+def test_get_graph_data_offline_requires_cdk_out_path():
+    with pytest.raises(ValueError, match='cdk_out_path is required in offline mode'):
+        get_graph_data(offline=True)
+
+
+def test_get_graph_data_stacks_collector(mock_get_all_exports, mock_get_all_imports):
+    importing_stack = NodeData(stack_name='some-importing-stack-name-1', parent_id='some-parent-id', tags={'a': 'b'})
+    export = NodeData(stack_name='some-exporting-stack-name-1', export_name='some-name-1')
+
+    def mock_get_all_imports_side_effect_func(self, cfn_client):  # noqa: ARG001
+        self.importing_stacks = [
+            NodeData(stack_name='some-importing-stack-name-1'),
+            NodeData(stack_name='some-importing-stack-name-2'),
+        ]
+
+    mock_get_all_imports.side_effect = mock_get_all_imports_side_effect_func
+
+    with patch.object(NodeData, 'get_all_stacks', autospec=True) as mock_get_all_stacks:
+        mock_get_all_stacks.return_value = (
+            {'some-name-1': export},
+            {'some-importing-stack-name-1': importing_stack},
+        )
+        actual_graph_data = get_graph_data(collector='stacks')
+
+    mock_get_all_exports.assert_not_called()
+    assert actual_graph_data == {'some-name-1': export}
+    assert export.importing_stacks[0] is importing_stack
+    assert export.importing_stacks[1] == NodeData(stack_name='some-importing-stack-name-2')
+
+
+def test_get_graph_data_fetches_imports_while_paging_exports(mock_get_all_exports, mock_get_all_imports):
+    export1 = NodeData(stack_name='some-exporting-stack-name-1', export_name='some-name-1')
+    export2 = NodeData(stack_name='some-exporting-stack-name-2', export_name='some-name-2')
+    fetched = threading.Event()
+
+    def mock_get_all_exports_side_effect_func(cfn_client, on_page):  # noqa: ARG001
+        on_page({'some-name-1': export1})
+        # the imports of the first page are fetched before the next page is listed
+        assert fetched.wait(timeout=5)
+        on_page({'some-name-2': export2})
+        return {'some-name-1': export1, 'some-name-2': export2}
+
+    def mock_get_all_imports_side_effect_func(self, cfn_client):  # noqa: ARG001
+        self.importing_stacks = [NodeData(stack_name='some-importing-stack-name')]
+        fetched.set()
+
+    mock_get_all_exports.side_effect = mock_get_all_exports_side_effect_func
+    mock_get_all_imports.side_effect = mock_get_all_imports_side_effect_func
+
+    actual_graph_data = get_graph_data()
+
+    assert mock_get_all_imports.call_count == 2
+    assert [export.importing_stacks for export in actual_graph_data.values()] == [
+        [NodeData(stack_name='some-importing-stack-name')],
+        [NodeData(stack_name='some-importing-stack-name')],
+    ]
+
+
+def test_get_graph_data_raises_import_fetch_errors(mock_get_all_exports, mock_get_all_imports):
+    mock_get_all_exports.return_value = {'some-name-1': NodeData(stack_name='some-stack-name', export_name='some-name-1')}
+    mock_get_all_imports.side_effect = RuntimeError('some-error')
+
+    with pytest.raises(RuntimeError, match='some-error'):
+        get_graph_data()
+
+
+def test_get_graph_data_shares_one_instance_per_importing_stack(
+    mock_get_all_exports, mock_get_all_imports, mock_from_list_stacks, mock_get_assembly_data
+):
+    mock_get_all_exports.return_value = {
+        f'some-name-{i}': NodeData(stack_name='some-exporting-stack-name', export_name=f'some-name-{i}') for i in range(2)
+    }
+    mock_get_assembly_data.return_value = (
+        {},
+        {'some-name-1': [NodeData(stack_name='some-importing-stack-name', export_name='some-name-1')]},
+    )
+    importing_stack = NodeData(stack_name='some-importing-stack-name', stack_id='some-importing-stack-id')
+    mock_from_list_stacks.return_value = StackCache({'some-importing-stack-name': importing_stack})
+
+    def mock_get_all_imports_side_effect_func(self, cfn_client):  # noqa: ARG001
+        self.importing_stacks = [NodeData(stack_name='some-importing-stack-name')]
+
+    mock_get_all_imports.side_effect = mock_get_all_imports_side_effect_func
+
+    actual_graph_data = get_graph_data(cdk_out_path='some-cdk-out-path')
+
+    importing_stacks = [stack for export in actual_graph_data.values() for stack in export.importing_stacks]
+    assert len(importing_stacks) == 3
+    assert all(stack is importing_stack for stack in importing_stacks)
+
+
+def test_get_graph_data_lists_stacks_once_with_a_stack_cache(
+    mock_get_all_exports, mock_get_all_imports, mock_from_list_stacks
+):
+    mock_get_all_exports.return_value = {
+        'some-name-1': NodeData(stack_name='some-exporting-stack-name', export_name='some-name-1')
+    }
+    importing_stack = NodeData(stack_name='some-importing-stack-name', stack_id='some-importing-stack-id')
+    mock_from_list_stacks.return_value = StackCache({'some-importing-stack-name': importing_stack})
+
+    def mock_get_all_imports_side_effect_func(self, cfn_client):  # noqa: ARG001
+        self.importing_stacks = [NodeData(stack_name='some-importing-stack-name')]
+
+    mock_get_all_imports.side_effect = mock_get_all_imports_side_effect_func
+    stack_cache = StackCache()
+
+    first = get_graph_data(stack_cache=stack_cache)
+    second = get_graph_data(stack_cache=stack_cache)
+
+    mock_from_list_stacks.assert_called_once()
+    assert first['some-name-1'].importing_stacks == second['some-name-1'].importing_stacks == [importing_stack]
+    assert second['some-name-1'].importing_stacks[0] is importing_stack
+
+
+def test_get_graph_data_stacks_collector_fills_the_stack_cache(mock_from_list_stacks):
+    stack = NodeData(stack_name='some-stack-name', stack_id='some-stack-id')
+    stack_cache = StackCache()
+
+    with patch.object(NodeData, 'get_all_stacks', return_value=({}, {'some-stack-name': stack})):
+        get_graph_data(collector='stacks', stack_cache=stack_cache)
+
+    mock_from_list_stacks.assert_not_called()
+    assert stack_cache.stacks == {'some-stack-name': stack}
+
+
+def test_get_graph_data_raises_error_on_unknown_collector():
+    with pytest.raises(ValueError, match="collector must be one of \\('exports', 'stacks'\\), not 'some-collector'"):
+        get_graph_data(collector='some-collector')
+
+
+def test_build_graph_passes_offline(mock_get_graph_data):
+    build_graph(cdk_out_path='some-cdk-out-path', offline=True)
+
+    mock_get_graph_data.assert_called_once_with(
+        cdk_out_path='some-cdk-out-path',
+        aws_session=None,
+        aws_profile_name=None,
+        cfn_client=None,
+        endpoint_url=None,
+        offline=True,
+        collector='exports',
+    )
+
+
+def test_build_graph_collapse_nested():
+    root_id = 'arn:aws:cloudformation:us-east-1:000000000000:stack/some-root-stack-name/some-uuid'
+    child_1 = NodeData(stack_name='some-root-stack-name-Child1-ABC', root_id=root_id, parent_id=root_id)
+    child_2 = NodeData(stack_name='some-root-stack-name-Child2-DEF', root_id=root_id, parent_id=root_id)
+    other_stack = NodeData(stack_name='some-other-stack-name')
+    graph_data = {
+        'some-name-1': NodeData(
+            stack_name=child_1.stack_name,
+            export_name='some-name-1',
+            root_id=root_id,
+            importing_stacks=[other_stack, child_2],
+        ),
+        'some-name-2': NodeData(
+            stack_name=child_2.stack_name,
+            export_name='some-name-2',
+            root_id=root_id,
+            importing_stacks=[other_stack],
+        ),
+        'some-name-3': NodeData(
+            stack_name='some-other-stack-name',
+            export_name='some-name-3',
+            importing_stacks=[child_1],
+        ),
+    }
+
+    actual_graph = build_graph(graph_data=graph_data, collapse_nested=True)
+
+    assert sorted(actual_graph.nodes) == ['some-other-stack-name', 'some-root-stack-name']
+    assert actual_graph.number_of_edges('some-root-stack-name', 'some-other-stack-name') == 2
+    assert actual_graph.number_of_edges('some-other-stack-name', 'some-root-stack-name') == 1
+    # the import of child 2 from child 1 is within the root, it is not a dependency between stacks
+    assert actual_graph.number_of_edges('some-root-stack-name', 'some-root-stack-name') == 0
+    assert graph_data['some-name-1'] in actual_graph.nodes['some-root-stack-name']['node_data']
+    assert child_2 in actual_graph.nodes['some-root-stack-name']['node_data']
+
+
+def nested_siblings_graph_data():
+    root_id = 'arn:aws:cloudformation:us-east-1:000000000000:stack/Root/some-uuid'
+    child_2 = NodeData(stack_name='Root-Child2-DEF', stack_id='some-child-2-id', root_id=root_id, parent_id=root_id)
+    return {
+        'some-name-1': NodeData(
+            stack_name='Root-Child1-ABC',
+            stack_id='some-child-1-id',
+            export_name='some-name-1',
+            root_id=root_id,
+            importing_stacks=[child_2],
+        ),
+        'some-name-2': NodeData(
+            stack_name='Root',
+            stack_id=root_id,
+            export_name='some-name-2',
+            importing_stacks=[NodeData(stack_name='Other', stack_id='some-other-id')],
+        ),
+    }
+
+
+@pytest.mark.parametrize(('selfloops', 'expected_selfloops'), [('keep', None), ('drop', None), ('report', {'Root': 1})])
+def test_build_graph_collapse_nested_siblings_are_not_cycles(selfloops, expected_selfloops):
+    actual_graph = build_graph(graph_data=nested_siblings_graph_data(), collapse_nested=True, selfloops=selfloops)
+
+    assert list(actual_graph.edges) == [('Root', 'Other', 0)]
+    assert find_cycles(actual_graph) == []
+    assert actual_graph.graph.get('selfloops') == expected_selfloops
+
+
+def test_build_graph_collapse_nested_keys_nested_stacks_like_their_root():
+    actual_graph = build_graph(
+        graph_data=nested_siblings_graph_data(), node_key_fn=lambda x: x.stack_id, collapse_nested=True
+    )
+
+    root_id = 'arn:aws:cloudformation:us-east-1:000000000000:stack/Root/some-uuid'
+    assert sorted(actual_graph.nodes) == sorted([root_id, 'some-other-id'])
+    assert list(actual_graph.edges) == [(root_id, 'some-other-id', 0)]
+
+
+def test_build_graph_collapse_nested_collects_stacks(mock_get_graph_data):
+    build_graph(collapse_nested=True)
+
+    assert mock_get_graph_data.call_args.kwargs['collector'] == 'stacks'
+
+
+def test_build_graph_weighted():
+    graph_data = {
+        f'some-name-{i}': NodeData(
+            stack_name='some-stack-name-1',
+            export_name=f'some-name-{i}',
+            importing_stacks=[NodeData(stack_name='some-stack-name-2')],
+        )
+        for i in range(3)
+    }
+    graph_data['some-name-3'] = NodeData(
+        stack_name='some-stack-name-2',
+        export_name='some-name-3',
+        importing_stacks=[NodeData(stack_name='some-stack-name-1')],
+    )
+
+    actual_graph = build_graph(graph_data=graph_data, weighted=True)
+
+    assert type(actual_graph) is nx.DiGraph
+    assert actual_graph.graph['exports'] == ['some-name-0', 'some-name-1', 'some-name-2', 'some-name-3']
+    assert actual_graph.edges['some-stack-name-1', 'some-stack-name-2'] == {'weight': 3, 'exports': [0, 1, 2]}
+    assert actual_graph.edges['some-stack-name-2', 'some-stack-name-1'] == {'weight': 1, 'exports': [3]}
+
+
+def test_build_graph_interns_export_names():
+    graph_data = {
+        'some-name-1': NodeData(
+            stack_name='some-stack-name-1',
+            export_name='some-name-1',
+            importing_stacks=[NodeData(stack_name='some-stack-name-2'), NodeData(stack_name='some-stack-name-3')],
+        ),
+        'some-name-2': NodeData(
+            stack_name='some-stack-name-1',
+            export_name='some-name-2',
+            importing_stacks=[NodeData(stack_name='some-stack-name-2')],
+        ),
+    }
+
+    actual_graph = build_graph(graph_data=graph_data)
+
+    assert actual_graph.graph['exports'] == ['some-name-1', 'some-name-2']
+    assert sorted(actual_graph.edges(data='export')) == [
+        ('some-stack-name-1', 'some-stack-name-2', 0),
+        ('some-stack-name-1', 'some-stack-name-2', 1),
+        ('some-stack-name-1', 'some-stack-name-3', 0),
+    ]
+
+
+def test_build_graph_low_memory(mock_get_all_exports, mock_get_all_imports):
+    graph_data = {
+        f'some-name-{i}': NodeData(
+            stack_name=f'some-stack-name-{i}',
+            stack_id=f'arn:aws:cloudformation:us-east-1:000000000000:stack/some-stack-name-{i}/some-uuid',
+            export_name=f'some-name-{i}',
+            importing_stacks=[NodeData(stack_name=f'some-stack-name-{(i + 1) % 3}')],
+        )
+        for i in range(3)
+    }
+    cfn_client = LocalCloudFormationClient(graph_data, page_size=1)
+
+    actual = build_graph(cfn_client=cfn_client, low_memory=True, weighted=True, nodes_to_ignore=['some-stack-name-2'])
+
+    assert sorted(actual.edges(data='weight')) == [('some-stack-name-0', 'some-stack-name-1', 1)]
+    assert sorted(actual.nodes) == ['some-stack-name-0', 'some-stack-name-1']
+    mock_get_all_exports.assert_not_called()
+    mock_get_all_imports.assert_not_called()
+
+
+def test_build_graph_low_memory_offline(mock_boto3, mock_get_assembly_data):
+    mock_get_assembly_data.return_value = (
+        {'some-name-1': NodeData(stack_name='some-cdk-out-stack-name-1', export_name='some-name-1')},
+        {'some-name-1': [NodeData(stack_name='some-cdk-out-stack-name-2', export_name='some-name-1')]},
+    )
+
+    with patch.object(edge_store_module, 'get_assembly_data', mock_get_assembly_data):
+        actual = build_graph(cdk_out_path='some-cdk-out-path', offline=True, low_memory=True)
+
+    assert list(actual.edges(data='export')) == [('some-cdk-out-stack-name-1', 'some-cdk-out-stack-name-2', 0)]
+    mock_get_assembly_data.assert_called_once_with(Path('some-cdk-out-path'), known_export_names=set(), template_cache=None)
+    mock_boto3.client.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ('kwargs', 'expected_conflicts'),
+    [
+        ({'graph_data': {}}, 'graph_data'),
+        ({'collector': 'stacks'}, "collector='stacks'"),
+        ({'collapse_nested': True}, 'collapse_nested'),
+        ({'graph_data': {}, 'collapse_nested': True}, 'graph_data, collapse_nested'),
+    ],
+)
+def test_build_graph_low_memory_raises_on_unsupported_sources(kwargs, expected_conflicts):
+    expected = f'low_memory can not be combined with {expected_conflicts}, it collects with the exports collector'
+
+    with pytest.raises(ValueError, match=f'^{re.escape(expected)}$'):
+        build_graph(low_memory=True, **kwargs)
+
+
+def test_build_graph_low_memory_offline_requires_cdk_out_path():
+    with pytest.raises(ValueError, match=r'^low_memory requires cdk_out_path in offline mode$'):
+        build_graph(low_memory=True, offline=True)
+
+
+@pytest.mark.parametrize(('focus_radius', 'expected_cycles'), [(None, [['a', 'b', 'c']]), (1, [])])
+def test_build_graph_focus(mock_get_all_exports, mock_get_all_imports, focus_radius, expected_cycles):
+    graph_data = {
+        f'some-name-{u}-{v}': NodeData(
+            stack_name=u,
+            stack_id=f'arn:aws:cloudformation:us-east-1:000000000000:stack/{u}/some-uuid',
+            export_name=f'some-name-{u}-{v}',
+            importing_stacks=[NodeData(stack_name=v)],
+        )
+        for u, v in [('a', 'b'), ('b', 'c'), ('c', 'a'), ('d', 'a'), ('b', 'e'), ('e', 'f')]
+    }
+    cfn_client = LocalCloudFormationClient(graph_data)
+
+    actual = build_graph(cfn_client=cfn_client, focus=['a'], focus_radius=focus_radius, weighted=True, nodes_to_ignore=['e'])
+
+    # d only exports to the focused stack, it is never crawled. with a radius of 1, the exports of c are not fetched
+    assert sorted(actual.nodes) == ['a', 'b', 'c']
+    assert find_cycles(actual) == expected_cycles
+    mock_get_all_exports.assert_not_called()
+    mock_get_all_imports.assert_not_called()
+
+
+def test_build_graph_focus_finds_cycles_closed_by_the_assembly(mock_get_assembly_data):
+    graph_data = {
+        f'{u}-export': NodeData(
+            stack_name=u,
+            stack_id=f'arn:aws:cloudformation:us-east-1:000000000000:stack/{u}/some-uuid',
+            export_name=f'{u}-export',
+            importing_stacks=[NodeData(stack_name=v) for v in importers],
+        )
+        for u, importers in [('F', []), ('Z', ['F']), ('Y', ['X'])]
+    }
+    cfn_client = LocalCloudFormationClient(graph_data)
+    # Z only imports from F in the assembly, so it is only reached through the assembly
+    mock_get_assembly_data.return_value = ({}, {'F-export': [NodeData(stack_name='Z', export_name='F-export')]})
+
+    with patch.object(edge_store_module, 'get_assembly_data', mock_get_assembly_data):
+        full_graph = build_graph(cfn_client=cfn_client, cdk_out_path='some-cdk-out-path', low_memory=True)
+        actual = build_graph(cfn_client=cfn_client, cdk_out_path='some-cdk-out-path', focus=['F'])
+
+    assert find_cycles(full_graph) == [['F', 'Z']]
+    assert find_cycles(actual) == [['F', 'Z']]
+    assert sorted(actual.nodes) == ['F', 'Z']
+
+
+@pytest.mark.parametrize(
+    ('kwargs', 'expected_conflicts'),
+    [
+        ({'graph_data': {}}, 'graph_data'),
+        ({'collector': 'stacks'}, "collector='stacks'"),
+        ({'collapse_nested': True}, 'collapse_nested'),
+        ({'offline': True, 'cdk_out_path': 'some-cdk-out-path'}, 'offline'),
+        ({'offline': True, 'low_memory': True}, 'offline'),
+    ],
+)
+def test_build_graph_focus_raises_on_unsupported_sources(kwargs, expected_conflicts):
+    expected = f'focus can not be combined with {expected_conflicts}, it crawls deployed stacks with the exports collector'
+
+    with pytest.raises(ValueError, match=f'^{re.escape(expected)}$'):
+        build_graph(focus=['a'], **kwargs)
+
+
+def test_get_graph_data_only_logs_cdk_out_imports_at_debug(caplog, mock_get_assembly_data):
+    mock_get_assembly_data.return_value = (
+        {},
+        {'some-name-1': [NodeData(stack_name='some-cdk-out-stack-name-2', export_name='some-name-1')]},
+    )
+
+    with caplog.at_level('INFO'):
+        get_graph_data(cdk_out_path='some-cdk-out-path', offline=True)
+    with caplog.at_level('DEBUG'):
+        get_graph_data(cdk_out_path='some-cdk-out-path', offline=True)
+
+    assert [record.levelname for record in caplog.records if 'cdk_out_imports' in record.getMessage()] == ['DEBUG']
+    assert 'found imports of 1 export names in the cloud assembly' in caplog.text
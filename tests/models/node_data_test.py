@@ -4,7 +4,7 @@ import pytest
 from botocore.exceptions import ClientError
 
 import cycl.models.node_data as node_data_module
-from cycl.models.node_data import NodeData
+from cycl.models.node_data import UNDELETED_STACK_STATUSES, NodeData, StackCache
 
 
 @pytest.fixture
@@ -105,6 +105,22 @@ def test_get_all_exports_uses_next_token(mock_boto3, cfn_client_mock):
     assert actual_exports == expected_exports
 
 
+@pytest.mark.usefixtures('mock_parse_name_from_id')
+def test_get_all_exports_calls_on_page_per_page(mock_boto3, cfn_client_mock):  # noqa: ARG001
+    export1 = {'ExportingStackId': 'some-exporting-stack-id-1', 'Name': 'some-name-1', 'Value': 'some-value-1'}
+    export2 = {'ExportingStackId': 'some-exporting-stack-id-2', 'Name': 'some-name-2', 'Value': 'some-value-2'}
+    cfn_client_mock.list_exports.side_effect = [
+        {'Exports': [export1], 'NextToken': 'some-token'},
+        {'Exports': [export2]},
+    ]
+    pages = []
+
+    actual_exports = NodeData.get_all_exports(on_page=lambda page: pages.append(list(page)))
+
+    assert pages == [['some-name-1'], ['some-name-2']]
+    assert list(actual_exports) == ['some-name-1', 'some-name-2']
+
+
 @pytest.mark.parametrize(
     ('list_imports_return', 'expected_imports'),
     [
@@ -219,3 +235,127 @@ def test_from_list_exports(list_exports_resp, expected):
 def test_get_all_imports_handles_undefined_export_name_gracefully():
     actual = NodeData(stack_name='some-stack-name').get_all_imports()
     assert actual.importing_stacks == []
+
+
+def test_from_describe_stacks():
+    describe_stacks_resp = {
+        'Stacks': [
+            {
+                'StackName': 'some-stack-name-1',
+                'StackId': 'some-stack-id-1',
+                'StackStatus': 'UPDATE_COMPLETE',
+                'ParentId': 'some-parent-id',
+                'RootId': 'some-root-id',
+                'Tags': [{'Key': 'some-key', 'Value': 'some-value'}],
+                'Outputs': [
+                    {'OutputKey': 'SomeOutput1', 'OutputValue': 'some-value-1', 'ExportName': 'some-name-1'},
+                    {'OutputKey': 'SomeOutput2', 'OutputValue': 'some-value-2'},
+                ],
+            },
+            {
+                'StackName': 'some-stack-name-2',
+                'StackId': 'some-stack-id-2',
+                'StackStatus': 'ROLLBACK_COMPLETE',
+                'Outputs': [{'OutputKey': 'SomeOutput3', 'OutputValue': 'some-value-3', 'ExportName': 'some-name-3'}],
+            },
+        ]
+    }
+    stack_1 = {
+        'stack_name': 'some-stack-name-1',
+        'stack_id': 'some-stack-id-1',
+        'parent_id': 'some-parent-id',
+        'root_id': 'some-root-id',
+        'tags': {'some-key': 'some-value'},
+        'outputs': ['SomeOutput1', 'SomeOutput2'],
+    }
+
+    actual_exports, actual_stacks = NodeData.from_describe_stacks(describe_stacks_resp)
+
+    assert actual_exports == {
+        'some-name-1': NodeData(**stack_1, export_name='some-name-1', export_value='some-value-1'),
+    }
+    assert actual_stacks == {
+        'some-stack-name-1': NodeData(**stack_1),
+        'some-stack-name-2': NodeData(
+            stack_name='some-stack-name-2', stack_id='some-stack-id-2', tags={}, outputs=['SomeOutput3']
+        ),
+    }
+
+
+def test_get_all_stacks_uses_next_token(mock_boto3, cfn_client_mock):
+    stack1 = {
+        'StackName': 'some-stack-name-1',
+        'StackStatus': 'CREATE_COMPLETE',
+        'Outputs': [{'OutputKey': 'SomeOutput1', 'OutputValue': 'some-value-1', 'ExportName': 'some-name-1'}],
+    }
+    stack2 = {'StackName': 'some-stack-name-2', 'StackStatus': 'CREATE_COMPLETE'}
+    cfn_client_mock.describe_stacks.side_effect = [
+        {'Stacks': [stack1], 'NextToken': 'some-token'},
+        {'Stacks': [stack2]},
+    ]
+
+    actual_exports, actual_stacks = NodeData.get_all_stacks()
+
+    mock_boto3.client.assert_called_once_with('cloudformation')
+    cfn_client_mock.describe_stacks.assert_has_calls([call(), call(NextToken='some-token')])
+    assert list(actual_exports) == ['some-name-1']
+    assert list(actual_stacks) == ['some-stack-name-1', 'some-stack-name-2']
+
+
+def test_hash_supports_tags():
+    node_data = NodeData(stack_name='some-stack-name', tags={'b': '2', 'a': '1'}, outputs=['SomeOutput'])
+
+    assert hash(node_data) == hash(NodeData(stack_name='some-stack-name', tags={'a': '1', 'b': '2'}, outputs=['SomeOutput']))
+    assert {node_data} == {NodeData(stack_name='some-stack-name', tags={'a': '1', 'b': '2'}, outputs=['SomeOutput'])}
+
+
+def test_stack_cache_get_shares_one_instance_per_stack():
+    known_stack = NodeData(stack_name='some-stack-name-1', stack_id='some-stack-id-1')
+    stack_cache = StackCache({'some-stack-name-1': known_stack})
+
+    assert stack_cache.get('some-stack-name-1') is known_stack
+    assert stack_cache.get('some-stack-name-2') is stack_cache.get('some-stack-name-2')
+    assert stack_cache.get('some-stack-name-2') == NodeData(stack_name='some-stack-name-2')
+    assert len(stack_cache) == 2
+
+
+def test_stack_cache_from_list_stacks_uses_next_token(mock_boto3, cfn_client_mock):
+    cfn_client_mock.list_stacks.side_effect = [
+        {
+            'StackSummaries': [
+                {'StackName': 'some-stack-name-1', 'StackId': 'some-stack-id-1', 'StackStatus': 'CREATE_COMPLETE'},
+                {'StackName': 'some-stack-name-2', 'StackId': 'some-stack-id-2', 'StackStatus': 'DELETE_COMPLETE'},
+            ],
+            'NextToken': 'some-token',
+        },
+        {
+            'StackSummaries': [
+                {'StackName': 'some-stack-name-2', 'StackId': 'some-stack-id-3', 'StackStatus': 'UPDATE_COMPLETE'},
+            ]
+        },
+    ]
+
+    actual = StackCache.from_list_stacks()
+
+    mock_boto3.client.assert_called_once_with('cloudformation')
+    cfn_client_mock.list_stacks.assert_has_calls(
+        [
+            call(StackStatusFilter=UNDELETED_STACK_STATUSES),
+            call(NextToken='some-token', StackStatusFilter=UNDELETED_STACK_STATUSES),
+        ]
+    )
+    assert 'DELETE_COMPLETE' not in UNDELETED_STACK_STATUSES
+    # the deleted stack is left out, its name was reused
+    assert actual.stacks == {
+        'some-stack-name-1': NodeData(stack_name='some-stack-name-1', stack_id='some-stack-id-1'),
+        'some-stack-name-2': NodeData(stack_name='some-stack-name-2', stack_id='some-stack-id-3'),
+    }
+
+
+def test_stack_cache_from_list_stacks_excepts_client_error(caplog, cfn_client_mock):
+    cfn_client_mock.list_stacks.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}}, 'ListStacks')
+
+    actual = StackCache.from_list_stacks(cfn_client=cfn_client_mock)
+
+    assert len(actual) == 0
+    assert 'unable to list stacks' in caplog.text
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import networkx as nx
+import pytest
+
+from cycl.utils.backends import (
+    BACKENDS,
+    BackendNotAvailableError,
+    GraphBackend,
+    available_backends,
+    get_backend,
+    index_graph,
+    is_acyclic,
+    topological_generations,
+)
+from cycl.utils.cycles import canonical_cycle, find_cycles, find_cycles_batch
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param != 'networkx':
+        pytest.importorskip(request.param)
+    return get_backend(request.param)
+
+
+def random_graphs():
+    """Small random graphs with self loops and parallel edges, cyclic and acyclic."""
+    graphs = []
+    for seed in range(20):
+        graph = nx.MultiDiGraph(nx.gnp_random_graph(12, 0.15, seed=seed, directed=True))
+        graph.add_edges_from([(seed % 12, seed % 12), (0, 1), (0, 1)])
+        graphs.append(nx.relabel_nodes(graph, {node: f'stack-{node}' for node in graph}))
+    for seed in range(10):
+        dag = nx.gnp_random_graph(15, 0.2, seed=seed, directed=True)
+        graphs.append(nx.DiGraph((u, v) for u, v in dag.edges() if u < v))
+    return graphs
+
+
+@pytest.mark.parametrize('graph', random_graphs())
+def test_backends_find_identical_results(backend, graph):
+    reference = get_backend('networkx')
+    nodes, pairs = index_graph(graph)
+
+    assert sorted(map(sorted, backend.strongly_connected_components(len(nodes), pairs))) == sorted(
+        map(sorted, reference.strongly_connected_components(len(nodes), pairs))
+    )
+    for length_bound in (None, 1, 3):
+        assert sorted(canonical_cycle(list(cycle)) for cycle in backend.simple_cycles(len(nodes), pairs, length_bound)) == (
+            sorted(canonical_cycle(cycle) for cycle in reference.simple_cycles(len(nodes), pairs, length_bound))
+        )
+    assert is_acyclic(graph, backend) == nx.is_directed_acyclic_graph(graph)
+    assert find_cycles(graph, backend=backend.name) == find_cycles(graph, backend='networkx')
+    if nx.is_directed_acyclic_graph(graph):
+        assert list(map(sorted, topological_generations(graph, backend))) == [
+            sorted(generation) for generation in nx.topological_generations(graph)
+        ]
+
+
+def test_backends_find_identical_results_in_batches(backend):
+    graphs = random_graphs()
+
+    assert find_cycles_batch(graphs, max_length=4, backend=backend.name) == find_cycles_batch(
+        graphs, max_length=4, backend='networkx'
+    )
+
+
+def test_topological_generations_raises_on_cyclic_graph(backend):
+    with pytest.raises(nx.NetworkXUnfeasible):
+        topological_generations(nx.DiGraph([('a', 'b'), ('b', 'a')]), backend)
+
+
+def test_topological_generations_of_empty_graph(backend):
+    assert topological_generations(nx.DiGraph(), backend) == []
+
+
+def test_index_graph():
+    graph = nx.MultiDiGraph([('b', 'a'), ('b', 'a'), ('a', 'c')])
+
+    assert index_graph(graph) == (['a', 'b', 'c'], [(0, 2), (1, 0)])
+
+
+def test_get_backend_prefers_compiled_backends():
+    with patch.dict(
+        'cycl.utils.backends._BACKEND_TYPES', {'rustworkx': (GraphBackend, None), 'igraph': (GraphBackend, None)}
+    ):
+        assert get_backend().name == 'networkx'
+        assert get_backend('auto').name == 'networkx'
+        assert available_backends() == ['networkx']
+
+    preferred = [name for name in ('rustworkx', 'igraph', 'networkx') if name in available_backends()]
+    assert get_backend().name == preferred[0]
+
+
+@pytest.mark.parametrize('name', ['rustworkx', 'igraph'])
+def test_get_backend_raises_if_not_installed(name):
+    with (
+        patch.dict('cycl.utils.backends._BACKEND_TYPES', {name: (GraphBackend, None)}),
+        pytest.raises(BackendNotAvailableError, match=f'pip install cycl\\[{name}\\]'),
+    ):
+        get_backend(name)
+
+
+def test_get_backend_raises_on_unknown_backend():
+    with pytest.raises(
+        ValueError, match="backend must be one of \\('networkx', 'rustworkx', 'igraph'\\), not 'some-backend'"
+    ):
+        get_backend('some-backend')
@@ -1,13 +1,14 @@
 import json
 import shutil
 from pathlib import Path
+from textwrap import dedent
 from unittest.mock import patch
 
 import pytest
 
 import cycl.utils.cdk as cdk_module
 from cycl.models.node_data import NodeData
-from cycl.utils.cdk import InvalidCdkOutPathError, get_exports_from_assembly
+from cycl.utils.cdk import InvalidCdkOutPathError, get_assembly_data, get_exports_from_assembly, get_stack_templates
 
 
 @pytest.fixture
@@ -264,3 +265,290 @@ def test_get_exports_from_assembly_grabs_stack_name_first(cdk_out_mock, cdk_mani
 
     actual = get_exports_from_assembly(cdk_out_mock)
     assert actual == expected
+
+
+@pytest.mark.parametrize('suffix', ['yaml', 'yml'])
+@pytest.mark.parametrize(
+    'import_value',
+    [
+        '!ImportValue some-export-name-1',
+        "{'Fn::ImportValue': some-export-name-1}",
+        "{'Fn::ImportValue': 'some-export-name-1'}",
+    ],
+)
+def test_get_exports_from_assembly_yaml_template(cdk_out_mock, suffix, import_value):
+    expected = {
+        'some-export-name-1': [
+            NodeData(
+                export_name='some-export-name-1',
+                stack_name='some-stack-display-name-1',
+            ),
+        ],
+    }
+    (cdk_out_mock / 'test-stack-1.template.json').unlink()
+    template_path = cdk_out_mock / f'test-stack-1.template.{suffix}'
+    template_path.write_text(
+        dedent(f"""\
+        AWSTemplateFormatVersion: 2010-09-09
+        Resources:
+          MyResource:
+            Type: AWS::S3::Bucket
+            Properties:
+              BucketName: {import_value}
+              Tags:
+                - Key: arn
+                  Value: !GetAtt MyOtherResource.Arn
+                - Key: name
+                  Value: !Sub '${{AWS::StackName}}-bucket'
+                - Key: ref
+                  Value: !Ref AWS::Region
+        """)
+    )
+
+    actual = get_exports_from_assembly(cdk_out_mock)
+    assert actual == expected
+
+
+def test_get_exports_from_assembly_yaml_short_form_tags(cdk_out_mock):
+    expected = {
+        'some-export-name-1': [NodeData(export_name='some-export-name-1', stack_name='some-stack-display-name-1')],
+        'some-export-name-2': [NodeData(export_name='some-export-name-2', stack_name='some-stack-display-name-1')],
+    }
+    (cdk_out_mock / 'test-stack-1.template.json').unlink()
+    template_path = cdk_out_mock / 'test-stack-1.template.yaml'
+    template_path.write_text(
+        dedent("""\
+        Conditions:
+          IsProd: !Equals [!Ref Env, prod]
+        Resources:
+          MyResource:
+            Type: AWS::S3::Bucket
+            Condition: IsProd
+            Properties:
+              BucketName: !If
+                - IsProd
+                - !ImportValue some-export-name-1
+                - !Select [0, [!ImportValue some-export-name-2]]
+        """)
+    )
+
+    actual = get_exports_from_assembly(cdk_out_mock)
+    assert actual == expected
+
+
+def test_get_exports_from_assembly_parses_templates_in_parallel(cdk_out_mock, cdk_template_mock, cdk_manifest_mock):
+    expected = {
+        f'some-export-name-{i}': [
+            NodeData(export_name=f'some-export-name-{i}', stack_name=f'some-stack-display-name-{i}'),
+        ]
+        for i in range(1, 5)
+    }
+    for i in range(2, 5):
+        cdk_template_mock['Resources']['MyResource']['Properties']['BucketName']['Fn::ImportValue'] = f'some-export-name-{i}'
+        with (cdk_out_mock / f'test-stack-{i}.template.json').open('w') as f:
+            json.dump(cdk_template_mock, f)
+        cdk_manifest_mock['artifacts'][f'test-stack-{i}'] = {'displayName': f'some-stack-display-name-{i}'}
+    with (cdk_out_mock / 'manifest.json').open('w') as f:
+        json.dump(cdk_manifest_mock, f)
+
+    with (
+        patch.object(cdk_module, 'PARALLEL_PARSE_THRESHOLD', 0),
+        patch.object(cdk_module, 'ProcessPoolExecutor', wraps=cdk_module.ProcessPoolExecutor) as mock_executor,
+    ):
+        actual = get_exports_from_assembly(cdk_out_mock, max_workers=2)
+
+    mock_executor.assert_called_once_with(max_workers=2)
+    assert actual == expected
+
+
+def test_get_exports_from_assembly_skips_yaml_without_pyyaml(caplog, cdk_out_mock):
+    (cdk_out_mock / 'test-stack-2.template.yaml').write_text('Resources: {}')
+
+    with patch.object(cdk_module, 'yaml', None):
+        actual = get_exports_from_assembly(cdk_out_mock)
+
+    assert list(actual) == ['some-export-name-1']
+    assert 'found yaml templates, but pyyaml is not installed' in caplog.text
+
+
+def test_get_exports_from_assembly_resolves_intrinsic_import_values(cdk_out_mock, cdk_template_mock, cdk_manifest_mock):
+    expected = {
+        'some-stack-display-name-1-us-east-1-vpc': [
+            NodeData(export_name='some-stack-display-name-1-us-east-1-vpc', stack_name='some-stack-display-name-1'),
+        ],
+        'prod:123456789012:subnet': [
+            NodeData(export_name='prod:123456789012:subnet', stack_name='some-stack-display-name-1'),
+        ],
+    }
+    cdk_template_mock['Parameters'] = {'Env': {'Type': 'String', 'Default': 'prod'}}
+    cdk_template_mock['Resources']['MyResource']['Properties'] = {
+        'VpcId': {'Fn::ImportValue': {'Fn::Sub': '${AWS::StackName}-${AWS::Region}-vpc'}},
+        'SubnetId': {'Fn::ImportValue': {'Fn::Join': [':', [{'Ref': 'Env'}, {'Ref': 'AWS::AccountId'}, 'subnet']]}},
+        'Unresolvable': {'Fn::ImportValue': {'Fn::GetAtt': ['Resource', 'Arn']}},
+    }
+    with (cdk_out_mock / 'test-stack-1.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+    cdk_manifest_mock['artifacts']['test-stack-1']['environment'] = 'aws://123456789012/us-east-1'
+    with (cdk_out_mock / 'manifest.json').open('w') as f:
+        json.dump(cdk_manifest_mock, f)
+
+    actual = get_exports_from_assembly(cdk_out_mock)
+    assert actual == expected
+
+
+def test_get_exports_from_assembly_resolves_with_known_export_names(cdk_out_mock, cdk_template_mock, cdk_manifest_mock):
+    expected = {
+        'app-123456789012-vpc': [
+            NodeData(export_name='app-123456789012-vpc', stack_name='some-stack-display-name-1'),
+        ],
+    }
+    cdk_template_mock['Resources']['MyResource']['Properties']['BucketName'] = {
+        'Fn::ImportValue': {'Fn::Sub': 'app-${AWS::AccountId}-vpc'},
+    }
+    with (cdk_out_mock / 'test-stack-1.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+    cdk_manifest_mock['artifacts']['test-stack-1']['environment'] = 'aws://unknown-account/unknown-region'
+    with (cdk_out_mock / 'manifest.json').open('w') as f:
+        json.dump(cdk_manifest_mock, f)
+
+    actual = get_exports_from_assembly(cdk_out_mock, known_export_names=['app-123456789012-vpc', 'other-vpc'])
+    assert actual == expected
+
+
+def test_get_exports_from_assembly_resolves_names_resolved_for_exports_with_known_export_names(
+    cdk_out_mock, cdk_template_mock, cdk_manifest_mock
+):
+    # the export name is resolved, and memoized, before the known export names are set for the imports
+    export_name = {'Fn::Sub': 'app-${AWS::AccountId}-vpc'}
+    cdk_template_mock['Resources']['MyResource']['Properties']['BucketName'] = {'Fn::ImportValue': export_name}
+    cdk_template_mock['Outputs'] = {'Vpc': {'Value': 'some-vpc-id', 'Export': {'Name': export_name}}}
+    with (cdk_out_mock / 'test-stack-1.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+    cdk_manifest_mock['artifacts']['test-stack-1']['environment'] = 'aws://unknown-account/unknown-region'
+    with (cdk_out_mock / 'manifest.json').open('w') as f:
+        json.dump(cdk_manifest_mock, f)
+
+    actual = get_exports_from_assembly(cdk_out_mock, known_export_names=['app-123456789012-vpc'])
+
+    assert actual == {
+        'app-123456789012-vpc': [NodeData(export_name='app-123456789012-vpc', stack_name='some-stack-display-name-1')],
+    }
+
+
+def test_get_assembly_data_finds_exports(cdk_out_mock, cdk_template_mock, cdk_manifest_mock):
+    expected_exports = {
+        'some-stack-name-2-bucket': NodeData(
+            stack_name='some-stack-name-2',
+            export_name='some-stack-name-2-bucket',
+            export_value='some-bucket-name',
+        ),
+        'some-stack-name-2-arn': NodeData(stack_name='some-stack-name-2', export_name='some-stack-name-2-arn'),
+    }
+    expected_imports = {
+        'some-export-name-1': [NodeData(export_name='some-export-name-1', stack_name='some-stack-display-name-1')],
+        'some-stack-name-2-arn': [NodeData(export_name='some-stack-name-2-arn', stack_name='some-stack-display-name-1')],
+    }
+    cdk_template_mock['Resources']['MyResource']['Properties']['Arn'] = {
+        'Fn::ImportValue': {'Fn::Sub': '${Stack}-arn'},
+    }
+    cdk_template_mock['Parameters'] = {'Stack': {'Type': 'String'}}
+    with (cdk_out_mock / 'test-stack-1.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+    with (cdk_out_mock / 'test-stack-2.template.json').open('w') as f:
+        json.dump(
+            {
+                'Resources': {},
+                'Outputs': {
+                    'Bucket': {
+                        'Value': 'some-bucket-name',
+                        'Export': {'Name': {'Fn::Sub': '${AWS::StackName}-bucket'}},
+                    },
+                    'Arn': {
+                        'Value': {'Fn::GetAtt': ['Resource', 'Arn']},
+                        'Export': {'Name': {'Fn::Join': ['-', [{'Ref': 'AWS::StackName'}, 'arn']]}},
+                    },
+                    'NotExported': {'Value': 'some-value'},
+                    'Unresolvable': {'Value': 'x', 'Export': {'Name': {'Fn::GetAtt': ['Resource', 'Name']}}},
+                },
+            },
+            f,
+        )
+    cdk_manifest_mock['artifacts']['test-stack-2'] = {'properties': {'stackName': 'some-stack-name-2'}}
+    with (cdk_out_mock / 'manifest.json').open('w') as f:
+        json.dump(cdk_manifest_mock, f)
+
+    actual_exports, actual_imports = get_assembly_data(cdk_out_mock)
+
+    assert actual_exports == expected_exports
+    assert actual_imports == expected_imports
+
+
+def test_get_assembly_data_ignores_invalid_outputs(cdk_out_mock, cdk_template_mock):
+    cdk_template_mock['Outputs'] = ['not', 'a', 'dict']
+    with (cdk_out_mock / 'test-stack-1.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+
+    actual_exports, _ = get_assembly_data(cdk_out_mock)
+
+    assert actual_exports == {}
+
+
+def test_get_assembly_data_only_parses_changed_templates(caplog, cdk_out_mock, cdk_template_mock):
+    template_cache = {}
+    with (cdk_out_mock / 'test-stack-2.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+    get_assembly_data(cdk_out_mock, template_cache=template_cache)
+
+    cdk_template_mock['Resources']['MyResource']['Properties']['BucketName']['Fn::ImportValue'] = 'some-export-name-20'
+    with (cdk_out_mock / 'test-stack-1.template.json').open('w') as f:
+        json.dump(cdk_template_mock, f)
+    (cdk_out_mock / 'test-stack-2.template.json').unlink()
+    with caplog.at_level('INFO'):
+        _, actual_imports = get_assembly_data(cdk_out_mock, template_cache=template_cache)
+
+    assert '1 of 1 templates changed since they were cached' in caplog.text
+    assert list(actual_imports) == ['some-export-name-20']
+    assert list(template_cache) == [cdk_out_mock.resolve() / 'test-stack-1.template.json']
+
+
+@pytest.mark.parametrize('suffix', ['yaml', 'yml'])
+@pytest.mark.parametrize('has_manifest', [True, False])
+def test_get_assembly_data_names_yaml_templates_without_an_artifact_after_the_file(cdk_out_mock, suffix, has_manifest):
+    if not has_manifest:
+        (cdk_out_mock / 'manifest.json').unlink()
+    (cdk_out_mock / 'test-stack-1.template.json').unlink()
+    (cdk_out_mock / f'hand-written-stack.template.{suffix}').write_text(
+        dedent("""\
+        Resources:
+          MyResource:
+            Type: AWS::S3::Bucket
+            Properties:
+              BucketName: !ImportValue some-export-name-1
+        Outputs:
+          BucketName:
+            Value: !Ref MyResource
+            Export:
+              Name: !Sub '${AWS::StackName}-bucket'
+        """)
+    )
+
+    assembly_exports, stack_import_mapping = get_assembly_data(cdk_out_mock)
+
+    assert assembly_exports == {
+        'hand-written-stack-bucket': NodeData(stack_name='hand-written-stack', export_name='hand-written-stack-bucket'),
+    }
+    assert stack_import_mapping == {
+        'some-export-name-1': [NodeData(stack_name='hand-written-stack', export_name='some-export-name-1')],
+    }
+
+
+def test_get_stack_templates(cdk_out_mock):
+    (cdk_out_mock / 'hand-written-stack.template.yaml').write_text('Resources: {}')
+    (cdk_out_mock / 'unknown-stack.template.json').write_text('{}')
+
+    actual = get_stack_templates(cdk_out_mock.parent)
+
+    assert actual == {
+        'hand-written-stack': cdk_out_mock.resolve() / 'hand-written-stack.template.yaml',
+        'some-stack-display-name-1': cdk_out_mock.resolve() / 'test-stack-1.template.json',
+    }
@@ -1,6 +1,6 @@
 import pytest
 
-from cycl.utils.cfn import parse_name_from_id
+from cycl.utils.cfn import parse_account_from_id, parse_name_from_id
 
 
 @pytest.mark.parametrize(
@@ -14,3 +14,16 @@ from cycl.utils.cfn import parse_name_from_id
 def test_parse_name_from_id(stack_id, expected):
     actual = parse_name_from_id(stack_id)
     assert actual == expected
+
+
+@pytest.mark.parametrize(
+    ('stack_id', 'expected'),
+    [
+        ('arn:aws:cloudformation:us-east-1:000000000000:stack/template-1/05a85f80', '000000000000'),
+        ('some-stack-name', ''),
+        ('', ''),
+    ],
+)
+def test_parse_account_from_id(stack_id, expected):
+    actual = parse_account_from_id(stack_id)
+    assert actual == expected
@@ -0,0 +1,178 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import networkx as nx
+import pytest
+from botocore.exceptions import ClientError
+
+from cycl.utils.critical_path import (
+    StackTiming,
+    critical_path,
+    get_deploy_duration,
+    get_deploy_durations,
+    load_durations,
+)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def stack_event(stack_name, status, seconds, logical_id=None, resource_type='AWS::CloudFormation::Stack'):
+    return {
+        'LogicalResourceId': logical_id or stack_name,
+        'ResourceType': resource_type,
+        'ResourceStatus': status,
+        'Timestamp': START + timedelta(seconds=seconds),
+    }
+
+
+def test_critical_path():
+    # a -> b -> d is the longest chain, c can start late
+    graph = nx.DiGraph([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')])
+    durations = {'a': 60.0, 'b': 600.0, 'c': 30.0, 'd': 120.0}
+
+    actual = critical_path(graph, durations)
+
+    assert actual.path == ['a', 'b', 'd']
+    assert actual.duration == 780.0
+    assert actual.timings == {
+        'a': StackTiming(60.0, 0.0, 0.0),
+        'b': StackTiming(600.0, 60.0, 60.0),
+        'c': StackTiming(30.0, 60.0, 630.0),
+        'd': StackTiming(120.0, 660.0, 660.0),
+    }
+    assert actual.timings['c'].slack == 570.0
+    assert all(actual.timings[node].slack == 0 for node in actual.path)
+
+
+def test_critical_path_uses_default_duration(caplog):
+    graph = nx.DiGraph([('a', 'b')])
+    graph.add_node('c')
+
+    actual = critical_path(graph, {'a': 10.0}, default_duration=100.0)
+
+    assert actual.path == ['a', 'b']
+    assert actual.duration == 110.0
+    assert actual.timings['c'] == StackTiming(100.0, 0.0, 10.0)
+    assert '2 of 3 stacks have no deploy duration, using 100.0s' in caplog.text
+
+
+def test_critical_path_of_empty_graph():
+    assert critical_path(nx.DiGraph(), {}) == (([], 0.0, {}))
+
+
+def test_critical_path_raises_on_cyclic_graph():
+    with pytest.raises(nx.NetworkXUnfeasible):
+        critical_path(nx.DiGraph([('a', 'b'), ('b', 'a')]), {})
+
+
+def test_load_durations(tmp_path):
+    path = tmp_path / 'durations.json'
+    path.write_text(json.dumps({'a': 60, 'b': 1.5}))
+
+    assert load_durations(path) == {'a': 60.0, 'b': 1.5}
+
+
+def test_get_deploy_duration_finds_last_successful_deploy():
+    cfn_client = MagicMock()
+    cfn_client.describe_stack_events.side_effect = [
+        {
+            'StackEvents': [
+                stack_event('a', 'UPDATE_ROLLBACK_COMPLETE', 900),
+                stack_event('a', 'UPDATE_IN_PROGRESS', 800),
+                stack_event('a', 'UPDATE_COMPLETE', 500),
+                stack_event('a', 'CREATE_COMPLETE', 450, logical_id='Nested'),
+                stack_event('a', 'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS', 400),
+                stack_event('a', 'UPDATE_IN_PROGRESS', 350, logical_id='Queue', resource_type='AWS::SQS::Queue'),
+            ],
+            'NextToken': 'some-token',
+        },
+        {'StackEvents': [stack_event('a', 'UPDATE_IN_PROGRESS', 200)], 'NextToken': 'some-other-token'},
+    ]
+
+    actual = get_deploy_duration('a', cfn_client)
+
+    assert actual == 300.0
+    assert cfn_client.describe_stack_events.call_count == 2
+
+
+@pytest.mark.parametrize(
+    'side_effect',
+    [
+        [{'StackEvents': [stack_event('a', 'CREATE_FAILED', 10), stack_event('a', 'CREATE_IN_PROGRESS', 0)]}],
+        ClientError({'Error': {'Code': 'ValidationError', 'Message': 'Stack [a] does not exist'}}, 'DescribeStackEvents'),
+    ],
+)
+def test_get_deploy_duration_returns_none_without_successful_deploy(side_effect):
+    cfn_client = MagicMock()
+    cfn_client.describe_stack_events.side_effect = side_effect
+
+    assert get_deploy_duration('a', cfn_client) is None
+
+
+def test_get_deploy_duration_raises_unexpected_errors():
+    cfn_client = MagicMock()
+    cfn_client.describe_stack_events.side_effect = ClientError({'Error': {'Code': 'Throttling'}}, 'DescribeStackEvents')
+
+    with pytest.raises(ClientError, match='Throttling'):
+        get_deploy_duration('a', cfn_client)
+
+
+def test_get_deploy_durations_caches_durations(tmp_path):
+    cfn_client = MagicMock()
+
+    def describe_stack_events(StackName):  # noqa: N803
+        if StackName == 'c':
+            return {'StackEvents': []}
+        return {
+            'StackEvents': [stack_event(StackName, 'CREATE_COMPLETE', 60), stack_event(StackName, 'CREATE_IN_PROGRESS', 0)]
+        }
+
+    cfn_client.describe_stack_events.side_effect = describe_stack_events
+    cache_path = tmp_path / 'durations.json'
+
+    first = get_deploy_durations(['a', 'b', 'c', 'a'], cfn_client=cfn_client, cache_path=cache_path)
+    second = get_deploy_durations(['a', 'b', 'c'], cfn_client=cfn_client, cache_path=cache_path)
+
+    assert first == second == {'a': 60.0, 'b': 60.0}
+    assert cfn_client.describe_stack_events.call_count == 3
+    assert json.loads(cache_path.read_text())['c']['seconds'] is None
+
+
+def test_get_deploy_durations_fetches_stale_and_unreadable_cache_again(tmp_path):
+    cfn_client = MagicMock()
+    cfn_client.describe_stack_events.return_value = {
+        'StackEvents': [stack_event('a', 'UPDATE_COMPLETE', 30), stack_event('a', 'UPDATE_IN_PROGRESS', 0)]
+    }
+    cache_path = tmp_path / 'durations.json'
+    fetched_at = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+    cache_path.write_text(json.dumps({'a': {'seconds': 10.0, 'fetched_at': fetched_at}}))
+
+    assert get_deploy_durations(['a'], cfn_client=cfn_client, cache_path=cache_path) == {'a': 30.0}
+
+    cache_path.write_text('not json')
+    assert get_deploy_durations(['a'], cfn_client=cfn_client, cache_path=cache_path) == {'a': 30.0}
+    assert cfn_client.describe_stack_events.call_count == 2
+
+
+@pytest.mark.parametrize(
+    'entry',
+    [
+        {'seconds': 10.0},
+        {'fetched_at': 'now'},
+        {'seconds': 10.0, 'fetched_at': 'yesterday'},
+        {'seconds': 10.0, 'fetched_at': None},
+        {'seconds': 10.0, 'fetched_at': datetime.now().isoformat()},  # noqa: DTZ005 - a naive timestamp is malformed
+        10.0,
+    ],
+)
+def test_get_deploy_durations_fetches_malformed_cache_entries_again(tmp_path, entry):
+    cfn_client = MagicMock()
+    cfn_client.describe_stack_events.return_value = {
+        'StackEvents': [stack_event('a', 'UPDATE_COMPLETE', 30), stack_event('a', 'UPDATE_IN_PROGRESS', 0)]
+    }
+    cache_path = tmp_path / 'durations.json'
+    cache_path.write_text(json.dumps({'a': entry}))
+
+    assert get_deploy_durations(['a'], cfn_client=cfn_client, cache_path=cache_path) == {'a': 30.0}
+    assert json.loads(cache_path.read_text())['a']['seconds'] == 30.0
@@ -0,0 +1,57 @@
+import networkx as nx
+import pytest
+
+from cycl.utils.cuts import suggest_cuts
+
+
+def test_suggest_cuts_acyclic():
+    assert suggest_cuts(nx.MultiDiGraph([(1, 2), (2, 3), (1, 3)])) == []
+
+
+def test_suggest_cuts_prefers_fewest_imports():
+    graph = nx.MultiDiGraph([('a', 'b'), ('a', 'b'), ('a', 'b'), ('b', 'a')])
+
+    assert suggest_cuts(graph) == [('b', 'a', 1)]
+
+
+def test_suggest_cuts_includes_selfloops():
+    graph = nx.MultiDiGraph([('a', 'a'), ('a', 'a'), ('a', 'b')])
+
+    assert suggest_cuts(graph) == [('a', 'a', 2)]
+
+
+def test_suggest_cuts_shared_edge():
+    # both cycles go through c -> a, cutting it once is enough
+    graph = nx.MultiDiGraph([('a', 'b'), ('b', 'c'), ('c', 'a'), ('a', 'd'), ('d', 'c')])
+
+    assert suggest_cuts(graph) == [('c', 'a', 1)]
+
+
+def test_suggest_cuts_per_component():
+    graph = nx.MultiDiGraph([(1, 2), (2, 1), (2, 3), (3, 4), (4, 3), (4, 4)])
+
+    actual = suggest_cuts(graph)
+
+    assert len(actual) == 3
+    assert (4, 4, 1) in actual
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_suggest_cuts_breaks_every_cycle(seed):
+    graph = nx.MultiDiGraph(nx.gnp_random_graph(50, 0.08, seed=seed, directed=True))
+    graph.add_edges_from(list(graph.edges())[::3])
+
+    cuts = suggest_cuts(graph)
+    for u, v, imports in cuts:
+        assert graph.number_of_edges(u, v) == imports
+        graph.remove_edges_from([(u, v)] * imports)
+
+    assert nx.is_directed_acyclic_graph(graph)
+
+
+def test_suggest_cuts_weighted_graph():
+    graph = nx.DiGraph()
+    graph.add_edge('a', 'b', weight=3, exports=['x', 'y', 'z'])
+    graph.add_edge('b', 'a', weight=1, exports=['w'])
+
+    assert suggest_cuts(graph) == [('b', 'a', 1)]
@@ -0,0 +1,141 @@
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import networkx as nx
+import pytest
+
+import cycl.utils.cycles as cycles_module
+from cycl.utils.cycles import canonical_cycle, find_cycles, find_cycles_batch, iter_cycles
+from cycl.utils.testing import is_circular_reversible_permutation
+
+
+@pytest.fixture
+def graph():
+    graph = nx.MultiDiGraph()
+    # a 2-cycle, a 3-cycle sharing a node with it, a separate 4-cycle, and a self loop
+    graph.add_edges_from([('a', 'b'), ('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'a')])
+    graph.add_edges_from([(1, 2), (2, 3), (3, 4), (4, 1), ('x', 'x'), ('c', 1)])
+    return graph
+
+
+def test_find_cycles_returns_every_cycle(graph):
+    actual = find_cycles(graph)
+
+    assert sorted(sorted(map(str, cycle)) for cycle in actual) == sorted(
+        sorted(map(str, cycle)) for cycle in nx.simple_cycles(graph)
+    )
+
+
+@pytest.mark.parametrize(
+    ('max_length', 'expected_lengths'),
+    [
+        (1, [1]),
+        (2, [1, 2]),
+        (3, [1, 2, 3]),
+        (4, [1, 2, 3, 4]),
+    ],
+)
+def test_find_cycles_bounded(graph, max_length, expected_lengths):
+    actual = find_cycles(graph, max_length=max_length)
+
+    assert sorted(len(cycle) for cycle in actual) == expected_lengths
+
+
+def test_find_cycles_acyclic():
+    assert find_cycles(nx.MultiDiGraph([(1, 2), (2, 3)])) == []
+
+
+def test_find_cycles_in_parallel(graph):
+    with (
+        patch.object(cycles_module, 'PARALLEL_SEARCH_THRESHOLD', 0),
+        patch.object(cycles_module, 'ProcessPoolExecutor', wraps=cycles_module.ProcessPoolExecutor) as mock_executor,
+    ):
+        actual = find_cycles(graph, max_length=3, max_workers=2)
+
+    mock_executor.assert_called_once_with(max_workers=2)
+    assert actual == find_cycles(graph, max_length=3)
+    assert any(is_circular_reversible_permutation(cycle, ['a', 'b', 'c']) for cycle in actual)
+
+
+@pytest.mark.parametrize(
+    ('cycle', 'expected'),
+    [
+        (['c', 'a', 'b'], ['a', 'b', 'c']),
+        (['b', 'c', 'a'], ['a', 'b', 'c']),
+        (['a'], ['a']),
+        ([3, 10, 2], [10, 2, 3]),
+    ],
+)
+def test_canonical_cycle(cycle, expected):
+    assert canonical_cycle(cycle) == expected
+
+
+def test_find_cycles_is_canonical(graph):
+    edges = list(graph.edges())
+    reordered = nx.MultiDiGraph()
+    reordered.add_nodes_from(reversed(list(graph.nodes)))
+    reordered.add_edges_from(reversed(edges))
+
+    actual = find_cycles(graph)
+
+    assert actual == find_cycles(reordered)
+    assert actual == [[1, 2, 3, 4], ['a', 'b'], ['a', 'b', 'c'], ['x']]
+
+
+def test_iter_cycles_is_lazy(graph):
+    cycles = iter_cycles(graph)
+
+    assert next(cycles) == [1, 2, 3, 4]
+
+
+def test_iter_cycles_sends_large_components_to_workers(graph):
+    submitted = []
+
+    class InlineExecutor:
+        def __init__(self, max_workers):
+            self.max_workers = max_workers
+
+        def submit(self, fn, *args):
+            submitted.append(args)
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        def shutdown(self, *, wait, cancel_futures):
+            pass
+
+    with (
+        patch.object(cycles_module, 'PARALLEL_SEARCH_THRESHOLD', 4),
+        patch.object(cycles_module, 'ProcessPoolExecutor', InlineExecutor),
+    ):
+        actual = list(iter_cycles(graph, max_workers=2))
+
+    assert actual == find_cycles(graph)
+    # only the two components with at least 4 distinct edges, as compact edge lists
+    assert [len(edges) // 8 for edges, *_ in submitted] == [4, 4]
+    assert all(isinstance(edges, bytes) for edges, *_ in submitted)
+
+
+def test_find_cycles_batch_searches_shared_components_once(graph):
+    variant = graph.copy()
+    variant.remove_edge('c', 'a')
+
+    with (
+        patch.object(cycles_module, 'PARALLEL_SEARCH_THRESHOLD', 0),
+        patch.object(cycles_module, 'ProcessPoolExecutor', wraps=cycles_module.ProcessPoolExecutor) as mock_executor,
+    ):
+        actual = find_cycles_batch([graph, variant, graph], max_workers=2)
+
+    mock_executor.assert_called_once_with(max_workers=2)
+    assert actual == [find_cycles(graph), find_cycles(variant), find_cycles(graph)]
+    assert actual[1] == [[1, 2, 3, 4], ['a', 'b'], ['x']]
+
+
+def test_find_cycles_batch_in_process(graph):
+    search_component = getattr(cycles_module, '__search_component')
+    with patch.object(cycles_module, '__search_component', wraps=search_component) as mock_search_component:
+        actual = find_cycles_batch([graph, graph], max_length=2)
+
+    assert actual == [find_cycles(graph, max_length=2)] * 2
+    # the graphs share their three cyclic components, each is searched once
+    assert mock_search_component.call_count == 3
@@ -0,0 +1,110 @@
+import networkx as nx
+import pytest
+
+from cycl.utils.diff import GraphDiff, diff_graphs
+
+
+def test_diff_graphs_identical_graphs_have_no_differences():
+    graph = nx.MultiDiGraph([('a', 'b'), ('b', 'c'), ('c', 'a')])
+
+    actual = diff_graphs(graph, graph.copy())
+
+    assert not actual
+    assert list(actual.report()) == []
+
+
+def test_diff_graphs_counts_parallel_edges():
+    old_graph = nx.MultiDiGraph([('a', 'b'), ('a', 'b'), ('b', 'c')])
+    new_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'c'), ('b', 'c'), ('b', 'c')])
+
+    actual = diff_graphs(old_graph, new_graph)
+
+    assert actual.added_edges == {('b', 'c'): 2}
+    assert actual.removed_edges == {('a', 'b'): 1}
+
+
+def test_diff_graphs_finds_new_and_resolved_sccs():
+    old_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'a'), ('c', 'd')])
+    new_graph = nx.MultiDiGraph([('a', 'b'), ('c', 'd'), ('d', 'c')])
+
+    actual = diff_graphs(old_graph, new_graph)
+
+    assert actual.new_sccs == [frozenset({'c', 'd'})]
+    assert actual.resolved_sccs == [frozenset({'a', 'b'})]
+    assert actual.merged_sccs == []
+    assert actual.split_sccs == []
+
+
+def test_diff_graphs_finds_selfloop_scc():
+    old_graph = nx.MultiDiGraph([('a', 'b')])
+    new_graph = nx.MultiDiGraph([('a', 'b'), ('a', 'a')])
+
+    actual = diff_graphs(old_graph, new_graph)
+
+    assert actual.new_sccs == [frozenset({'a'})]
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_diff_graphs_finds_merged_and_split_sccs(reverse):
+    split_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'a'), ('c', 'd'), ('d', 'c'), ('b', 'c')])
+    merged_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'a'), ('c', 'd'), ('d', 'c'), ('b', 'c'), ('d', 'a')])
+    expected = (frozenset({'a', 'b', 'c', 'd'}), {frozenset({'a', 'b'}), frozenset({'c', 'd'})})
+
+    if reverse:
+        actual = diff_graphs(merged_graph, split_graph)
+        scc, parts = actual.split_sccs[0]
+        assert actual.merged_sccs == []
+    else:
+        actual = diff_graphs(split_graph, merged_graph)
+        scc, parts = actual.merged_sccs[0]
+        assert actual.split_sccs == []
+
+    assert (scc, set(parts)) == expected
+    assert actual.new_sccs == []
+    assert actual.resolved_sccs == []
+
+
+def test_diff_graphs_finds_generation_shifts():
+    old_graph = nx.MultiDiGraph([('a', 'b'), ('c', 'd')])
+    new_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'd'), ('c', 'd'), ('e', 'f')])
+
+    actual = diff_graphs(old_graph, new_graph)
+
+    assert actual.generation_shifts == {'d': (1, 2)}
+
+
+def test_diff_graphs_generations_of_cyclic_graph():
+    old_graph = nx.MultiDiGraph([('a', 'b'), ('b', 'a')])
+    new_graph = nx.MultiDiGraph([('c', 'a'), ('a', 'b'), ('b', 'a')])
+
+    actual = diff_graphs(old_graph, new_graph)
+
+    assert actual.generation_shifts == {'a': (0, 1), 'b': (0, 1)}
+
+
+def test_graph_diff_report():
+    graph_diff = GraphDiff(
+        added_edges={('a', 'b'): 2},
+        removed_edges={('b', 'c'): 1},
+        merged_sccs=[(frozenset({'a', 'b', 'c'}), [frozenset({'c'}), frozenset({'a', 'b'})])],
+        split_sccs=[(frozenset({'x', 'y', 'z'}), [frozenset({'y', 'z'}), frozenset({'x'})])],
+        new_sccs=[frozenset({'d', 'e'})],
+        resolved_sccs=[frozenset({'f', 'g'})],
+        generation_shifts={'a': (0, 2)},
+    )
+    expected = [
+        '+ edge a -> b (x2)',
+        '- edge b -> c',
+        '+ scc [d, e]',
+        '- scc [f, g]',
+        'merged scc [a, b, c] from [a, b], [c]',
+        'split scc [x, y, z] into [x], [y, z]',
+        'generation a: 0 -> 2',
+    ]
+
+    assert list(graph_diff.report()) == expected
+    assert graph_diff
+    assert repr(graph_diff) == (
+        'GraphDiff(added_edges=1, removed_edges=1, merged_sccs=1, split_sccs=1, new_sccs=1, resolved_sccs=1, '
+        'generation_shifts=1)'
+    )
@@ -0,0 +1,205 @@
+from unittest.mock import patch
+
+import networkx as nx
+import pytest
+from botocore.exceptions import ClientError
+
+import cycl.utils.edge_store as edge_store_module
+from cycl import build_graph
+from cycl.models.node_data import NodeData
+from cycl.utils.cycles import find_cycles
+from cycl.utils.edge_store import EdgeStore
+from cycl.utils.graph import edge_exports
+from cycl.utils.local_cfn import LocalCloudFormationClient
+
+
+@pytest.fixture
+def graph_data():
+    def export(stack, name, importers):
+        return NodeData(
+            stack_name=stack,
+            stack_id=f'arn:aws:cloudformation:us-east-1:000000000000:stack/{stack}/some-uuid',
+            export_name=name,
+            importing_stacks=[NodeData(stack_name=importer, tags={'team': importer[0]}) for importer in importers],
+            tags={'team': stack[0]},
+        )
+
+    exports = [
+        export('a1', 'a1-vpc', ['b1', 'b2']),
+        export('a1', 'a1-subnet', ['b1']),
+        export('b1', 'b1-role', ['a1', 'c1']),
+        export('b2', 'b2-bucket', ['c1']),
+        export('c1', 'c1-queue', ['c1']),
+        export('d1', 'd1-topic', []),
+    ]
+    return {export.export_name: export for export in exports}
+
+
+def assert_same_edges(actual, expected):
+    assert sorted(actual.edges(data='weight')) == sorted(expected.edges(data='weight'))
+    for u, v in expected.edges():
+        assert sorted(edge_exports(actual, u, v)) == sorted(edge_exports(expected, u, v))
+
+
+@pytest.mark.parametrize('weighted', [True, False])
+@pytest.mark.parametrize(
+    'kwargs',
+    [
+        {},
+        {'nodes_to_ignore': ['b2']},
+        {'edges_to_ignore': [['b1', 'a1']]},
+        {'node_key_fn': lambda x: x.tags['team']},
+        {'node_key_fn': lambda x: x.tags['team'], 'remove_selfloops': True},
+        {'node_key_fn': lambda x: x.tags['team'], 'selfloops': 'drop'},
+        {'node_key_fn': lambda x: x.tags['team'], 'selfloops': 'report'},
+    ],
+)
+def test_build_graph_like_build_graph(graph_data, kwargs, weighted):
+    actual = EdgeStore.from_graph_data(graph_data).build_graph(weighted=weighted, **kwargs)
+
+    expected = build_graph(graph_data, weighted=weighted, **kwargs)
+    assert actual.graph.get('selfloops') == expected.graph.get('selfloops')
+    assert dict(actual.nodes(data='node_data')) == dict(expected.nodes(data='node_data'))
+    assert actual.is_multigraph() == expected.is_multigraph()
+    assert_same_edges(actual, expected)
+
+
+def test_keys_are_computed_once(graph_data):
+    calls = []
+
+    def key_fn(node):
+        calls.append(node)
+        return node.stack_name
+
+    store = EdgeStore.from_graph_data(graph_data)
+    store.build_graph(key_fn)
+    store.build_graph(key_fn, nodes_to_ignore=['c1'])
+
+    # one call per distinct node, importing stacks are deduplicated
+    assert len(calls) == len(graph_data) + 4
+
+
+def test_collect(graph_data):
+    cfn_client = LocalCloudFormationClient(graph_data, page_size=2)
+
+    actual = EdgeStore.collect(cfn_client)
+
+    assert actual.export_names == list(graph_data)
+    # stacks are interned, a1 exports twice but is one exporting and one importing node
+    assert sorted(node.stack_name for node in actual.nodes) == ['a1', 'a1', 'b1', 'b1', 'b2', 'b2', 'c1', 'c1', 'd1']
+    assert sum(len(export_ids) for export_ids in actual.pairs.values()) == 7
+    assert_same_edges(actual.build_graph(weighted=True), build_graph(graph_data, weighted=True))
+
+
+@pytest.mark.parametrize(
+    ('focus', 'radius', 'expected_exports', 'expected_edges'),
+    [
+        (
+            ['a1'],
+            None,
+            ['a1-vpc', 'a1-subnet', 'b1-role', 'b2-bucket', 'c1-queue'],
+            [('a1', 'b1'), ('a1', 'b2'), ('b1', 'a1'), ('b1', 'c1'), ('b2', 'c1'), ('c1', 'c1')],
+        ),
+        (
+            ['a1'],
+            1,
+            ['a1-vpc', 'a1-subnet', 'b1-role', 'b2-bucket'],
+            [('a1', 'b1'), ('a1', 'b2'), ('b1', 'a1'), ('b1', 'c1'), ('b2', 'c1')],
+        ),
+        (['c1', 'c1'], None, ['c1-queue'], [('c1', 'c1')]),
+        (['some-stack-without-exports'], None, [], []),
+    ],
+)
+def test_crawl(graph_data, focus, radius, expected_exports, expected_edges):
+    cfn_client = LocalCloudFormationClient(graph_data, page_size=2)
+
+    with patch.object(cfn_client, 'list_imports', wraps=cfn_client.list_imports) as mock_list_imports:
+        actual = EdgeStore.crawl(cfn_client, focus, radius=radius, max_workers=2)
+
+    assert actual.export_names == expected_exports
+    # only the exports of crawled stacks are fetched
+    assert sorted(call.kwargs['ExportName'] for call in mock_list_imports.call_args_list) == sorted(expected_exports)
+    assert sorted(actual.build_graph(weighted=True).edges()) == expected_edges
+
+
+def test_crawl_merges_the_assembly():
+    graph_data = {
+        'f-vpc': NodeData(
+            stack_name='F',
+            stack_id='arn:aws:cloudformation:us-east-1:000000000000:stack/F/some-uuid',
+            export_name='f-vpc',
+            importing_stacks=[NodeData(stack_name='Z')],
+        ),
+    }
+    cfn_client = LocalCloudFormationClient(graph_data)
+    # the cycle is closed by an export of Z which is only declared in the assembly
+    assembly_exports = {'z-role': NodeData(stack_name='Z', export_name='z-role')}
+    assembly_imports = {'z-role': [NodeData(stack_name='F', export_name='z-role')]}
+
+    with (
+        patch.object(
+            edge_store_module, 'get_assembly_data', return_value=(assembly_exports, assembly_imports)
+        ) as mock_get_assembly_data,
+        patch.object(cfn_client, 'list_imports', wraps=cfn_client.list_imports) as mock_list_imports,
+    ):
+        actual = EdgeStore.crawl(cfn_client, ['F'], cdk_out_path='cdk.out')
+
+    mock_get_assembly_data.assert_called_once_with('cdk.out', known_export_names={'f-vpc'})
+    # exports which are not deployed are not fetched
+    mock_list_imports.assert_called_once_with(ExportName='f-vpc')
+    assert actual.export_names == ['f-vpc', 'z-role']
+    assert find_cycles(actual.build_graph(weighted=True)) == [['F', 'Z']]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_crawl_finds_every_cycle_through_focus(seed):
+    graph = nx.gnp_random_graph(30, 0.06, seed=seed, directed=True)
+    graph_data = {
+        f'export-{u}-{v}': NodeData(
+            stack_name=f's{u}',
+            stack_id=f'arn:aws:cloudformation:us-east-1:000000000000:stack/s{u}/some-uuid',
+            export_name=f'export-{u}-{v}',
+            importing_stacks=[NodeData(stack_name=f's{v}')],
+        )
+        for u, v in graph.edges()
+    }
+    full_graph = build_graph(graph_data, weighted=True)
+    cfn_client = LocalCloudFormationClient(graph_data)
+
+    for focus in ['s0', 's1', 's2']:
+        focused_graph = EdgeStore.crawl(cfn_client, [focus]).build_graph(weighted=True)
+
+        assert [cycle for cycle in find_cycles(focused_graph) if focus in cycle] == [
+            cycle for cycle in find_cycles(full_graph) if focus in cycle
+        ]
+        assert set(focused_graph) <= set(full_graph)
+
+
+def test_collect_raises_unexpected_errors(graph_data):
+    cfn_client = LocalCloudFormationClient(graph_data, page_size=2)
+
+    with (
+        patch.object(cfn_client, 'list_imports', side_effect=ClientError({'Error': {'Code': 'Throttling'}}, 'ListImports')),
+        pytest.raises(ClientError, match='Throttling'),
+    ):
+        EdgeStore.collect(cfn_client, max_workers=2)
+
+
+def test_merge_assembly():
+    store = EdgeStore()
+    store.add_export('some-name-1', NodeData(stack_name='a1'))
+    assembly_exports = {'some-name-2': NodeData(stack_name='b1', export_name='some-name-2', export_value='x')}
+    assembly_imports = {
+        'some-name-1': [NodeData(stack_name='b1', export_name='some-name-1')],
+        'some-name-2': [NodeData(stack_name='a1', export_name='some-name-2')],
+        'some-name-3': [NodeData(stack_name='a1', export_name='some-name-3')],
+    }
+
+    with patch.object(
+        edge_store_module, 'get_assembly_data', return_value=(assembly_exports, assembly_imports)
+    ) as mock_get_assembly_data:
+        store.merge_assembly('cdk.out')
+
+    mock_get_assembly_data.assert_called_once_with('cdk.out', known_export_names={'some-name-1'}, template_cache=None)
+    assert store.export_names == ['some-name-1', 'some-name-2']
+    assert sorted(store.build_graph().edges(data='export')) == [('a1', 'b1', 0), ('b1', 'a1', 1)]
@@ -0,0 +1,69 @@
+import networkx as nx
+import pytest
+
+from cycl.utils.graph import edge_exports, edge_weights, format_cycle, selfloop_policy
+
+
+def test_edge_weights_multidigraph():
+    graph = nx.MultiDiGraph([(1, 2), (1, 2), (2, 1)])
+
+    assert edge_weights(graph) == {(1, 2): 2, (2, 1): 1}
+
+
+def test_edge_weights_weighted_digraph():
+    graph = nx.DiGraph()
+    graph.add_edge(1, 2, weight=2, exports=['a', 'b'])
+    graph.add_edge(2, 1)
+
+    assert edge_weights(graph) == {(1, 2): 2, (2, 1): 1}
+
+
+def make_graph(*, weighted):
+    graph = nx.DiGraph() if weighted else nx.MultiDiGraph()
+    graph.graph['exports'] = ['vpc-id', 'subnet-id', 'role-arn', 'bucket', 'queue']
+    if weighted:
+        graph.add_edge('a', 'b', weight=1, exports=[0])
+        graph.add_edge('b', 'a', weight=4, exports=[1, 2, 3, 4])
+    else:
+        graph.add_edge('a', 'b', export=0)
+        graph.add_edges_from([('b', 'a', {'export': export_id}) for export_id in range(1, 5)])
+    return graph
+
+
+@pytest.mark.parametrize('weighted', [True, False])
+def test_edge_exports(weighted):
+    graph = make_graph(weighted=weighted)
+
+    assert edge_exports(graph, 'a', 'b') == ['vpc-id']
+    assert edge_exports(graph, 'b', 'a') == ['subnet-id', 'role-arn', 'bucket', 'queue']
+    assert edge_exports(graph, 'a', 'c') == []
+
+
+def test_edge_exports_without_export_table():
+    assert edge_exports(nx.MultiDiGraph([('a', 'b')]), 'a', 'b') == []
+
+
+@pytest.mark.parametrize('weighted', [True, False])
+def test_format_cycle(weighted):
+    graph = make_graph(weighted=weighted)
+
+    assert format_cycle(graph, ['a', 'b']) == 'a -[vpc-id]-> b -[bucket, queue, role-arn, +1]-> a'
+
+
+@pytest.mark.parametrize(
+    ('selfloops', 'remove_selfloops', 'expected'),
+    [
+        ('keep', False, 'keep'),
+        ('keep', True, 'drop'),
+        ('drop', False, 'drop'),
+        ('report', False, 'report'),
+        ('report', True, 'report'),
+    ],
+)
+def test_selfloop_policy(selfloops, remove_selfloops, expected):
+    assert selfloop_policy(selfloops, remove_selfloops=remove_selfloops) == expected
+
+
+def test_selfloop_policy_raises_on_unknown_policy():
+    with pytest.raises(ValueError, match="selfloops must be one of \\('keep', 'drop', 'report'\\), not 'some-policy'"):
+        selfloop_policy('some-policy')
@@ -0,0 +1,118 @@
+import pytest
+
+from cycl.utils.intrinsics import UNRESOLVED, IntrinsicResolver, get_pseudo_parameters
+
+
+@pytest.fixture
+def template():
+    return {
+        'Parameters': {
+            'Env': {'Type': 'String', 'Default': 'prod'},
+            'Names': {'Type': 'CommaDelimitedList', 'Default': 'vpc, subnet'},
+            'NoDefault': {'Type': 'String'},
+        },
+        'Mappings': {'EnvMap': {'prod': {'Prefix': 'p'}}},
+    }
+
+
+@pytest.fixture
+def resolver(template):
+    return IntrinsicResolver(
+        template,
+        pseudo_parameters=get_pseudo_parameters(stack_name='some-stack', account_id='123456789012', region='us-east-1'),
+    )
+
+
+@pytest.mark.parametrize(
+    ('region', 'expected_partition', 'expected_url_suffix'),
+    [
+        ('us-east-1', 'aws', 'amazonaws.com'),
+        ('cn-north-1', 'aws-cn', 'amazonaws.com.cn'),
+        ('us-gov-west-1', 'aws-us-gov', 'amazonaws.com'),
+        (None, 'aws', 'amazonaws.com'),
+    ],
+)
+def test_get_pseudo_parameters(region, expected_partition, expected_url_suffix):
+    actual = get_pseudo_parameters(region=region)
+
+    assert actual['AWS::Partition'] == expected_partition
+    assert actual['AWS::URLSuffix'] == expected_url_suffix
+    assert ('AWS::Region' in actual) == (region is not None)
+    assert 'AWS::StackName' not in actual
+    assert 'AWS::AccountId' not in actual
+
+
+@pytest.mark.parametrize(
+    ('expression', 'expected'),
+    [
+        ('some-export', 'some-export'),
+        ({'Fn::Sub': '${Env}-vpc-id'}, 'prod-vpc-id'),
+        ({'Fn::Sub': '${AWS::StackName}:${AWS::Region}:${AWS::AccountId}'}, 'some-stack:us-east-1:123456789012'),
+        ({'Fn::Sub': ['${Prefix}-${Env}', {'Prefix': {'Ref': 'AWS::Partition'}}]}, 'aws-prod'),
+        ({'Fn::Sub': '${!Literal}-x'}, '${Literal}-x'),
+        ({'Fn::Join': [':', [{'Ref': 'Env'}, 'vpc', 1]]}, 'prod:vpc:1'),
+        ({'Fn::Join': ['-', {'Ref': 'Names'}]}, 'vpc-subnet'),
+        ({'Fn::Select': [1, {'Ref': 'Names'}]}, 'subnet'),
+        ({'Fn::Select': ['0', {'Fn::Split': ['/', 'a/b']}]}, 'a'),
+        ({'Fn::Join': ['', [{'Fn::FindInMap': ['EnvMap', {'Ref': 'Env'}, 'Prefix']}, '-x']]}, 'p-x'),
+        ({'Fn::Join': ['-', [True, 1.5]]}, 'true-1.5'),
+    ],
+)
+def test_resolve_export_name(resolver, expression, expected):
+    assert resolver.resolve_export_name(expression) == expected
+
+
+@pytest.mark.parametrize(
+    'expression',
+    [
+        {'Fn::GetAtt': ['Resource', 'Arn']},
+        {'Fn::Sub': '${Resource.Arn}'},
+        {'Fn::Sub': '${NoDefault}-x'},
+        {'Fn::Join': ['-', [{'Ref': 'SomeResource'}, 'x']]},
+        {'Fn::Join': ['-']},
+        {'Fn::Join': ['-', 'not-a-list']},
+        {'Fn::Select': [5, ['a']]},
+        {'Fn::Select': ['x', ['a']]},
+        {'Fn::Select': [0]},
+        {'Fn::Split': ['/', {'Fn::GetAtt': ['Resource', 'Arn']}]},
+        {'Fn::Split': ['/']},
+        {'Fn::FindInMap': ['EnvMap', 'dev', 'Prefix']},
+        {'Fn::FindInMap': ['EnvMap']},
+        {'Fn::Sub': {'not': 'a string'}},
+        {'Ref': ['not', 'a', 'string']},
+        {'Fn::Unknown': 'x'},
+        {'Ref': 'Env', 'Extra': 'key'},
+        ['a', 'list'],
+    ],
+)
+def test_resolve_export_name_unresolvable(resolver, expression):
+    assert resolver.resolve_export_name(expression) is None
+
+
+def test_resolve_export_name_matches_known_export_names():
+    resolver = IntrinsicResolver(known_export_names=sorted(['app-111-vpc', 'app-222-subnet', 'other-111-vpc']))
+
+    assert resolver.resolve_export_name({'Fn::Sub': 'app-${AWS::AccountId}-vpc'}) == 'app-111-vpc'
+    assert resolver.resolve_export_name({'Fn::Sub': '${AWS::AccountId}'}) is None  # ambiguous
+    assert resolver.resolve_export_name({'Fn::Sub': 'missing-${AWS::AccountId}'}) is None
+
+
+def test_resolve_export_name_resolves_again_with_new_known_export_names():
+    resolver = IntrinsicResolver()
+    expression = {'Fn::Sub': 'app-${AWS::AccountId}-vpc'}
+
+    assert resolver.resolve_export_name(expression) is None
+    resolver.known_export_names = ['app-111-vpc']
+    assert resolver.resolve_export_name(expression) == 'app-111-vpc'
+
+
+def test_resolve_export_name_is_memoized(resolver):
+    expression = {'Fn::Sub': '${Env}-vpc-id'}
+
+    assert resolver.resolve_export_name(expression) == 'prod-vpc-id'
+    resolver.parameters['Env'] = 'dev'
+    assert resolver.resolve_export_name({'Fn::Sub': '${Env}-vpc-id'}) == 'prod-vpc-id'
+
+
+def test_resolve_marks_unresolved_parts(resolver):
+    assert resolver.resolve({'Fn::Sub': '${Env}-${Resource.Arn}'}) == f'prod-{UNRESOLVED}'
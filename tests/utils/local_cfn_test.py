@@ -0,0 +1,233 @@
+import threading
+from unittest.mock import patch
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+import cycl.utils.local_cfn as local_cfn_module
+from cycl import build_graph, get_graph_data
+from cycl.models.node_data import NodeData
+from cycl.utils.local_cfn import LocalCloudFormationClient, LocalCloudFormationServer
+from cycl.utils.snapshot import save_snapshot
+
+
+@pytest.fixture
+def graph_data():
+    return {
+        f'some-name-{i}': NodeData(
+            stack_name=f'some-stack-name-{i}',
+            stack_id=f'arn:aws:cloudformation:us-east-1:000000000000:stack/some-stack-name-{i}/some-uuid',
+            export_name=f'some-name-{i}',
+            export_value=f'some-value-{i}',
+            importing_stacks=[NodeData(stack_name=f'some-stack-name-{(i + 1) % 5}')],
+        )
+        for i in range(5)
+    }
+
+
+@pytest.fixture
+def collected_graph_data(graph_data):
+    """The graph data collected from a client serving ``graph_data``, importing stacks are resolved to their ids."""
+    return {
+        export_name: NodeData(
+            **{
+                **vars(export),
+                'importing_stacks': [
+                    NodeData(stack_name=stack.stack_name, stack_id=graph_data[f'some-name-{(i + 1) % 5}'].stack_id)
+                    for stack in export.importing_stacks
+                ],
+            }
+        )
+        for i, (export_name, export) in enumerate(graph_data.items())
+    }
+
+
+@pytest.fixture
+def server(graph_data):
+    server = LocalCloudFormationServer(LocalCloudFormationClient(graph_data, page_size=2))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_list_exports_paginates(graph_data):
+    client = LocalCloudFormationClient(graph_data, page_size=2)
+
+    first_page = client.list_exports()
+    last_page = client.list_exports(NextToken='4')
+
+    assert [export['Name'] for export in first_page['Exports']] == ['some-name-0', 'some-name-1']
+    assert first_page['NextToken'] == '2'
+    assert [export['Name'] for export in last_page['Exports']] == ['some-name-4']
+    assert 'NextToken' not in last_page
+
+
+def test_list_exports_synthesizes_stack_id():
+    client = LocalCloudFormationClient({'some-name-1': NodeData(stack_name='some-stack-name-1')})
+
+    actual = client.list_exports()
+
+    assert actual == {
+        'Exports': [
+            {
+                'ExportingStackId': 'arn:aws:cloudformation:local:000000000000:stack/some-stack-name-1/local',
+                'Name': 'some-name-1',
+                'Value': '',
+            }
+        ]
+    }
+
+
+def test_list_imports_deduplicates_importing_stacks():
+    export = NodeData(
+        stack_name='some-stack-name-1',
+        importing_stacks=[NodeData(stack_name='some-stack-name-2'), NodeData(stack_name='some-stack-name-2')],
+    )
+    client = LocalCloudFormationClient({'some-name-1': export})
+
+    actual = client.list_imports(ExportName='some-name-1')
+
+    assert actual == {'Imports': ['some-stack-name-2']}
+
+
+@pytest.mark.parametrize('export_name', ['some-unknown-name', 'some-unimported-name'])
+def test_list_imports_raises_when_not_imported(export_name):
+    client = LocalCloudFormationClient({'some-unimported-name': NodeData(stack_name='some-stack-name-1')})
+
+    with pytest.raises(ClientError, match=f"Export '{export_name}' is not imported by any stack."):
+        client.list_imports(ExportName=export_name)
+
+
+def test_from_snapshot(tmp_path, graph_data):
+    save_snapshot(graph_data, tmp_path / 'graph.cycl')
+
+    client = LocalCloudFormationClient.from_snapshot(tmp_path / 'graph.cycl', page_size=3)
+
+    assert client.graph_data == graph_data
+    assert client.page_size == 3
+
+
+def test_from_assembly(graph_data):
+    with patch.object(local_cfn_module, 'get_graph_data', return_value=graph_data) as mock_get_graph_data:
+        client = LocalCloudFormationClient.from_assembly('cdk.out')
+
+    assert client.graph_data == graph_data
+    mock_get_graph_data.assert_called_once_with(cdk_out_path=local_cfn_module.Path('cdk.out'), offline=True)
+
+
+def test_list_stacks_paginates(graph_data):
+    client = LocalCloudFormationClient(graph_data, page_size=2)
+
+    first_page = client.list_stacks()
+    last_page = client.list_stacks(NextToken='4')
+
+    assert [stack['StackName'] for stack in first_page['StackSummaries']] == ['some-stack-name-0', 'some-stack-name-1']
+    assert first_page['StackSummaries'][0]['StackId'] == graph_data['some-name-0'].stack_id
+    assert 'Outputs' not in first_page['StackSummaries'][0]
+    assert [stack['StackName'] for stack in last_page['StackSummaries']] == ['some-stack-name-4']
+    assert 'NextToken' not in last_page
+
+
+def test_list_stacks_filters_on_status(graph_data):
+    client = LocalCloudFormationClient(graph_data, page_size=2)
+
+    assert client.list_stacks(StackStatusFilter=['DELETE_COMPLETE']) == {'StackSummaries': []}
+    assert len(client.list_stacks(StackStatusFilter=['CREATE_COMPLETE'])['StackSummaries']) == 2
+
+
+def test_server_parses_list_parameters(server):
+    cfn_client = boto3.client(
+        'cloudformation',
+        endpoint_url=server.url,
+        region_name='us-east-1',
+        aws_access_key_id='testing',
+        aws_secret_access_key='testing',  # noqa: S106
+    )
+
+    assert cfn_client.list_stacks(StackStatusFilter=['DELETE_COMPLETE'])['StackSummaries'] == []
+    assert cfn_client.list_stacks(StackStatusFilter=['DELETE_COMPLETE', 'CREATE_COMPLETE'])['StackSummaries']
+
+
+def test_get_graph_data_from_client(graph_data, collected_graph_data):
+    actual = get_graph_data(cfn_client=LocalCloudFormationClient(graph_data, page_size=2))
+
+    assert actual == collected_graph_data
+
+
+def test_server_round_trip(server, collected_graph_data):
+    cfn_client = boto3.client(
+        'cloudformation',
+        endpoint_url=server.url,
+        region_name='us-east-1',
+        aws_access_key_id='testing',
+        aws_secret_access_key='testing',  # noqa: S106
+    )
+
+    actual = build_graph(cfn_client=cfn_client)
+
+    assert get_graph_data(cfn_client=cfn_client) == collected_graph_data
+    assert sorted(actual.edges()) == [(f'some-stack-name-{i}', f'some-stack-name-{(i + 1) % 5}') for i in range(5)]
+
+
+def test_describe_stacks():
+    importing_stack = NodeData(stack_name='some-stack-name-2', parent_id='some-parent-id', tags={'a': 'b'})
+    client = LocalCloudFormationClient(
+        {
+            'some-name-1': NodeData(
+                stack_name='some-stack-name-1',
+                export_name='some-name-1',
+                export_value='some-value-1',
+                importing_stacks=[importing_stack],
+            )
+        },
+        page_size=1,
+    )
+
+    first_page = client.describe_stacks()
+    last_page = client.describe_stacks(NextToken=first_page['NextToken'])
+
+    assert first_page['Stacks'][0]['Outputs'] == [
+        {'OutputKey': 'some-name-1', 'OutputValue': 'some-value-1', 'ExportName': 'some-name-1'}
+    ]
+    assert last_page['Stacks'][0]['StackName'] == 'some-stack-name-2'
+    assert last_page['Stacks'][0]['ParentId'] == 'some-parent-id'
+    assert last_page['Stacks'][0]['Tags'] == [{'Key': 'a', 'Value': 'b'}]
+    assert 'NextToken' not in last_page
+
+
+def test_server_round_trip_stacks_collector(server, graph_data):
+    cfn_client = boto3.client(
+        'cloudformation',
+        endpoint_url=server.url,
+        region_name='us-east-1',
+        aws_access_key_id='testing',
+        aws_secret_access_key='testing',  # noqa: S106
+    )
+
+    actual = get_graph_data(cfn_client=cfn_client, collector='stacks')
+
+    assert sorted(actual) == sorted(graph_data)
+    assert actual['some-name-1'].export_value == 'some-value-1'
+    assert actual['some-name-1'].outputs == ['some-name-1']
+    assert actual['some-name-1'].importing_stacks[0].stack_id == graph_data['some-name-2'].stack_id
+
+
+def test_server_returns_errors(server):
+    cfn_client = boto3.client(
+        'cloudformation',
+        endpoint_url=server.url,
+        region_name='us-east-1',
+        aws_access_key_id='testing',
+        aws_secret_access_key='testing',  # noqa: S106
+    )
+
+    with pytest.raises(ClientError) as err:
+        cfn_client.list_imports(ExportName='some-unknown-name')
+    assert err.value.response['Error']['Code'] == 'ValidationError'
+
+    with pytest.raises(ClientError) as err:
+        cfn_client.describe_stack_events(StackName='some-stack-name-1')
+    assert err.value.response['Error']['Code'] == 'InvalidAction'
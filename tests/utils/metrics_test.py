@@ -0,0 +1,112 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import networkx as nx
+import pytest
+
+from cycl.models.node_data import NodeData
+from cycl.utils.metrics import MetricsStore, graph_account, graph_metrics
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(tmp_path / 'metrics.db')
+    yield store
+    store.close()
+
+
+def metrics(**kwargs):
+    return {'nodes': 0, 'edges': 0, 'imports': 0, 'largest_scc': 0, 'depth': 0, 'cycles': 0, 'cyclic': False, **kwargs}
+
+
+@pytest.mark.parametrize(
+    ('graph', 'expected'),
+    [
+        (nx.MultiDiGraph(), {'nodes': 0, 'edges': 0, 'imports': 0, 'largest_scc': 0, 'depth': 0}),
+        (
+            nx.MultiDiGraph([('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('c', 'd')]),
+            {'nodes': 4, 'edges': 5, 'imports': 5, 'largest_scc': 2, 'depth': 3},
+        ),
+    ],
+)
+def test_graph_metrics(graph, expected):
+    assert graph_metrics(graph) == expected
+
+
+def test_graph_metrics_counts_weighted_imports():
+    graph = nx.DiGraph()
+    graph.add_edge('a', 'b', weight=3)
+
+    assert graph_metrics(graph)['imports'] == 3
+
+
+def test_graph_account():
+    graph = nx.DiGraph()
+    graph.add_node('a', node_data={NodeData(stack_name='a')})
+    graph.add_node(
+        'b',
+        node_data={NodeData(stack_name='b', stack_id='arn:aws:cloudformation:us-east-1:123456789012:stack/b/some-uuid')},
+    )
+
+    assert graph_account(graph) == '123456789012'
+    assert graph_account(nx.DiGraph([('a', 'b')])) == ''
+
+
+def test_store_batches_writes(tmp_path):
+    store = MetricsStore(tmp_path / 'metrics.db', batch_size=2)
+    reader = sqlite3.connect(tmp_path / 'metrics.db')
+
+    store.record('some-account', 'check', metrics())
+    assert reader.execute('SELECT COUNT(*) FROM runs').fetchone() == (0,)
+    store.record('some-account', 'check', metrics())
+    assert reader.execute('SELECT COUNT(*) FROM runs').fetchone() == (2,)
+    store.record('some-account', 'check', metrics())
+    store.close()
+    assert reader.execute('SELECT COUNT(*) FROM runs').fetchone() == (3,)
+    reader.close()
+
+
+def test_store_indexes_runs_by_account_and_day(store):
+    indexes = store.connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+
+    assert indexes == [('runs_account_day',)]
+
+
+def test_trends(store):
+    day1 = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    day2 = datetime(2024, 1, 2, 12, tzinfo=timezone.utc)
+    store.record('some-account-1', 'check', metrics(nodes=3, cycles=1, cyclic=True), recorded_at=day1)
+    store.record('some-account-1', 'topo', metrics(nodes=5, depth=2), recorded_at=day1)
+    store.record('some-account-1', 'check', metrics(nodes=4), recorded_at=day2)
+    store.record('some-account-2', 'check', metrics(nodes=1), recorded_at=day1)
+
+    actual = store.trends()
+
+    assert [(trend['account'], trend['day'], trend['runs']) for trend in actual] == [
+        ('some-account-1', '2024-01-01', 2),
+        ('some-account-1', '2024-01-02', 1),
+        ('some-account-2', '2024-01-01', 1),
+    ]
+    assert actual[0] == {
+        'account': 'some-account-1',
+        'day': '2024-01-01',
+        'runs': 2,
+        'nodes': 5,
+        'edges': 0,
+        'imports': 0,
+        'largest_scc': 0,
+        'depth': 2,
+        'cycles': 1,
+        'cyclic_runs': 1,
+    }
+    assert [trend['day'] for trend in store.trends(account='some-account-2')] == ['2024-01-01']
+
+
+def test_trends_of_last_days(store):
+    now = datetime.now(timezone.utc)
+    store.record('some-account', 'check', metrics(), recorded_at=now - timedelta(days=2))
+    store.record('some-account', 'check', metrics(), recorded_at=now - timedelta(days=1))
+    store.record('some-account', 'check', metrics(), recorded_at=now)
+
+    assert len(store.trends(days=2)) == 2
+    assert len(store.trends(days=1)) == 1
@@ -0,0 +1,206 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import networkx as nx
+import pytest
+
+from cycl.utils.output import OUTPUT_FORMATS, SARIF_CUT_RULE, SARIF_CYCLE_RULE, OutputWriter, get_writer
+
+
+@pytest.fixture
+def graph():
+    graph = nx.DiGraph()
+    graph.graph['exports'] = ['some-export-1', 'some-export-2', 'some-export-3']
+    graph.add_edge('a', 'b', weight=2, exports=[0, 1])
+    graph.add_edge('b', 'a', weight=1, exports=[2])
+    return graph
+
+
+def write(output_format, graph, *, show_exports=False, generations=False, templates=None):
+    stream = io.StringIO()
+    writer = get_writer(output_format, graph, stream, show_exports=show_exports, templates=templates)
+    if generations:
+        writer.write_generations([['a'], ['b', 'c']])
+    else:
+        writer.write_cycles([['a', 'b']])
+        writer.write_cuts([('b', 'a', 1)])
+    writer.write_stats({'nodes': 2, 'cyclic': not generations})
+    writer.close()
+    return stream.getvalue()
+
+
+def test_get_writer_rejects_unknown_format(graph):
+    with pytest.raises(ValueError, match='Unsupported output format: yaml, expected one of text, json'):
+        get_writer('yaml', graph)
+
+
+def test_output_writer_requires_record(graph):
+    class RecordlessWriter(OutputWriter):
+        pass
+
+    with pytest.raises(TypeError, match='_record'):
+        RecordlessWriter(io.StringIO(), graph)
+
+
+def test_text_writer(graph):
+    actual = write('text', graph, show_exports=True)
+
+    assert actual.splitlines() == [
+        'cycle found: a -[some-export-1, some-export-2]-> b -[some-export-3]-> a',
+        'suggested cut: b -> a (1 imports): some-export-3',
+        '1 cuts removing 1 imports break every cycle',
+    ]
+
+
+@pytest.mark.parametrize('generations', [[], [['a']], [['a'], ['b', 'c']]])
+def test_text_writer_generations_match_json(graph, generations):
+    stream = io.StringIO()
+    writer = get_writer('text', graph, stream)
+
+    writer.write_generations(generations)
+
+    assert stream.getvalue() == json.dumps(generations, indent=2) + '\n'
+
+
+def test_json_writer(graph):
+    actual = json.loads(write('json', graph, show_exports=True))
+
+    assert actual == {
+        'cycles': [{'nodes': ['a', 'b'], 'exports': [['some-export-1', 'some-export-2'], ['some-export-3']]}],
+        'cuts': [{'source': 'b', 'target': 'a', 'imports': 1, 'exports': ['some-export-3']}],
+        'stats': {'nodes': 2, 'cyclic': True},
+    }
+
+
+def test_json_writer_empty(graph):
+    stream = io.StringIO()
+    writer = get_writer('json', graph, stream)
+
+    writer.close()
+
+    assert json.loads(stream.getvalue()) == {}
+
+
+def test_ndjson_writer(graph):
+    actual = [json.loads(line) for line in write('ndjson', graph, generations=True).splitlines()]
+
+    assert actual == [
+        {'type': 'generation', 'generation': 0, 'nodes': ['a']},
+        {'type': 'generation', 'generation': 1, 'nodes': ['b', 'c']},
+        {'type': 'stats', 'nodes': 2, 'cyclic': False},
+    ]
+
+
+def test_sarif_writer(graph):
+    actual = json.loads(write('sarif', graph))
+
+    assert actual['version'] == '2.1.0'
+    (run,) = actual['runs']
+    assert [rule['id'] for rule in run['tool']['driver']['rules']] == [SARIF_CYCLE_RULE, SARIF_CUT_RULE]
+    assert [(result['ruleId'], result['level'], result['message']['text']) for result in run['results']] == [
+        (SARIF_CYCLE_RULE, 'error', 'cycle found: a -[some-export-1, some-export-2]-> b -[some-export-3]-> a'),
+        (SARIF_CUT_RULE, 'note', 'suggested cut: b -> a (1 imports)'),
+    ]
+    assert run['results'][0]['locations'] == [
+        {'logicalLocations': [{'name': 'a', 'kind': 'module'}]},
+        {'logicalLocations': [{'name': 'b', 'kind': 'module'}]},
+    ]
+    assert run['properties'] == {'nodes': 2, 'cyclic': True}
+
+
+def test_sarif_writer_locates_results_at_templates(graph, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outside_path = tmp_path.parent / 'b.template.json'
+    templates = {'a': tmp_path / 'cdk.out' / 'a.template.json', 'b': outside_path}
+
+    actual = json.loads(write('sarif', graph, templates=templates))
+
+    (cycle_result, cut_result) = actual['runs'][0]['results']
+    assert cycle_result['locations'] == [
+        {
+            'logicalLocations': [{'name': 'a', 'kind': 'module'}],
+            'physicalLocation': {'artifactLocation': {'uri': 'cdk.out/a.template.json'}, 'region': {'startLine': 1}},
+        },
+        {
+            'logicalLocations': [{'name': 'b', 'kind': 'module'}],
+            'physicalLocation': {'artifactLocation': {'uri': outside_path.as_uri()}, 'region': {'startLine': 1}},
+        },
+    ]
+    assert [location['logicalLocations'][0]['name'] for location in cut_result['locations']] == ['b', 'a']
+
+
+def test_sarif_writer_skips_physical_location_without_template(graph):
+    actual = json.loads(write('sarif', graph, templates={'a': Path('a.template.json')}))
+
+    (cycle_result, _) = actual['runs'][0]['results']
+    assert [('physicalLocation' in location) for location in cycle_result['locations']] == [True, False]
+
+
+def test_sarif_writer_generations_are_not_results(graph):
+    actual = json.loads(write('sarif', graph, generations=True))
+
+    assert actual['runs'][0]['results'] == []
+
+
+def test_dot_writer(graph):
+    actual = write('dot', graph, show_exports=True)
+
+    assert actual.splitlines() == [
+        'strict digraph cycl {',
+        '  "a" -> "b" [label="some-export-1, some-export-2"];',
+        '  "b" -> "a" [label="some-export-3"];',
+        '  "b" -> "a" [style="dashed", color="red"];',
+        '  // nodes: 2',
+        '  // cyclic: true',
+        '}',
+    ]
+
+
+def test_dot_writer_generations(graph):
+    actual = write('dot', graph, generations=True)
+
+    assert '  { rank=same; "b"; "c"; }' in actual.splitlines()
+
+
+@pytest.mark.parametrize('generations', [False, True])
+def test_graphml_writer_round_trips(graph, generations):
+    actual = nx.parse_graphml(write('graphml', graph, show_exports=True, generations=generations))
+
+    if generations:
+        assert dict(actual.nodes(data='generation')) == {'a': 0, 'b': 1, 'c': 1}
+    else:
+        assert sorted(actual.edges(data='exports')) == [
+            ('a', 'b', 'some-export-1, some-export-2'),
+            ('b', 'a', 'some-export-3'),
+        ]
+
+
+def test_graphml_writer_writes_stats_as_comments(graph):
+    graph.add_node('--<&>')
+
+    stream = io.StringIO()
+    writer = get_writer('graphml', graph, stream)
+    writer.write_cycles([['--<&>', 'a']])
+    writer.write_stats({'name': '--'})
+    writer.close()
+
+    ET.fromstring(stream.getvalue())  # noqa: S314
+    assert '<!-- name: "- -" -->' in stream.getvalue()
+
+
+@pytest.mark.parametrize('output_format', OUTPUT_FORMATS)
+def test_writers_stream_cycles(graph, output_format):
+    def cycles():
+        yield ['a', 'b']
+        # the first cycle was written before the second one is produced
+        assert stream.getvalue()
+        yield ['b', 'a']
+
+    stream = io.StringIO()
+    writer = get_writer(output_format, graph, stream)
+
+    actual = writer.write_cycles(cycles())
+
+    assert actual == 2
@@ -0,0 +1,196 @@
+import struct
+import zlib
+
+import pytest
+
+from cycl.models.node_data import NodeData
+from cycl.utils.snapshot import SNAPSHOT_VERSION, InvalidSnapshotError, load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def graph_data():
+    return {
+        'some-name-2': NodeData(
+            stack_name='some-exporting-stack-name-2',
+            stack_id='some-exporting-stack-id-2',
+            export_name='some-name-2',
+            export_value='some-value-2',
+        ),
+        'some-name-1': NodeData(
+            stack_name='some-exporting-stack-name-1',
+            stack_id='some-exporting-stack-id-1',
+            export_name='some-name-1',
+            export_value='some-value-1',
+            importing_stacks=[
+                NodeData(stack_name='some-importing-stack-name-1'),
+                NodeData(stack_name='some-exporting-stack-name-2', export_name='some-name-1'),
+            ],
+        ),
+    }
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_snapshot_round_trip(tmp_path, graph_data, compress):
+    snapshot_path = tmp_path / 'graph.cycl'
+
+    save_snapshot(graph_data, snapshot_path, compress=compress)
+    actual = load_snapshot(snapshot_path)
+
+    assert actual == graph_data
+
+
+def test_snapshot_round_trip_stack_details(tmp_path):
+    importing_stack = NodeData(
+        stack_name='some-importing-stack-name',
+        parent_id='some-parent-id',
+        root_id='some-root-id',
+        tags={'some-key': 'some-value'},
+        outputs=['SomeOutput'],
+    )
+    graph_data = {
+        'some-name-1': NodeData(
+            stack_name='some-exporting-stack-name', export_name='some-name-1', tags={}, importing_stacks=[importing_stack]
+        )
+    }
+
+    save_snapshot(graph_data, tmp_path / 'graph.cycl')
+    actual = load_snapshot(tmp_path / 'graph.cycl')
+
+    assert actual == graph_data
+    assert actual['some-name-1'].importing_stacks[0].tags == {'some-key': 'some-value'}
+
+
+def test_load_snapshot_reads_version_1(tmp_path):
+    strings = [b'some-exporting-stack-name', b'some-name-1', b'some-importing-stack-name']
+    none = 0xFFFFFFFF
+    payload = struct.pack('<4I', 0, 25, 36, 61)
+    payload += struct.pack('<4I', 0, none, 1, none)
+    payload += struct.pack('<5I', 0, 2, none, none, none)
+    payload += b''.join(strings)
+    header = struct.pack('<4sBBHIIII', b'CYCL', 1, 0, 0, len(strings), 1, 1, 61)
+    (tmp_path / 'graph.cycl').write_bytes(header + payload)
+
+    actual = load_snapshot(tmp_path / 'graph.cycl')
+
+    assert actual == {
+        'some-name-1': NodeData(
+            stack_name='some-exporting-stack-name',
+            export_name='some-name-1',
+            importing_stacks=[NodeData(stack_name='some-importing-stack-name')],
+        )
+    }
+
+
+def test_snapshot_round_trip_empty(tmp_path):
+    snapshot_path = tmp_path / 'graph.cycl'
+
+    save_snapshot({}, snapshot_path)
+
+    assert load_snapshot(snapshot_path) == {}
+
+
+def test_snapshot_is_deterministic(tmp_path, graph_data):
+    reordered = dict(reversed(list(graph_data.items())))
+
+    save_snapshot(graph_data, tmp_path / 'a.cycl')
+    save_snapshot(reordered, tmp_path / 'b.cycl')
+
+    assert (tmp_path / 'a.cycl').read_bytes() == (tmp_path / 'b.cycl').read_bytes()
+
+
+def test_snapshot_interns_strings(tmp_path):
+    graph_data = {
+        f'some-name-{i}': NodeData(
+            stack_name='some-exporting-stack-name',
+            export_name=f'some-name-{i}',
+            importing_stacks=[NodeData(stack_name='some-importing-stack-name')],
+        )
+        for i in range(100)
+    }
+
+    save_snapshot(graph_data, tmp_path / 'graph.cycl')
+
+    assert (tmp_path / 'graph.cycl').read_bytes().count(b'some-importing-stack-name') == 1
+
+
+def test_compressed_snapshot_is_smaller(tmp_path, graph_data):
+    save_snapshot(graph_data, tmp_path / 'raw.cycl')
+    save_snapshot(graph_data, tmp_path / 'compressed.cycl', compress=True)
+
+    assert (tmp_path / 'compressed.cycl').stat().st_size < (tmp_path / 'raw.cycl').stat().st_size
+
+
+def test_load_snapshot_raises_error_if_missing(tmp_path):
+    with pytest.raises(InvalidSnapshotError, match='Snapshot does not exist or is not a file'):
+        load_snapshot(tmp_path / 'missing.cycl')
+
+
+@pytest.mark.parametrize(
+    ('content', 'match'),
+    [
+        (b'', 'File is too small to be a cycl snapshot'),
+        (b'NOPE' + bytes(20), 'File is not a cycl snapshot'),
+        (struct.pack('<4sBBHIIII', b'CYCL', SNAPSHOT_VERSION + 1, 0, 0, 0, 0, 0, 0), 'is newer than the supported version'),
+        (struct.pack('<4sBBHIIII', b'CYCL', 0, 0, 0, 0, 0, 0, 0), 'Snapshot version 0 is not a supported version'),
+        (struct.pack('<4sBBHIIII', b'CYCL', SNAPSHOT_VERSION, 0, 0, 1, 0, 0, 0), 'Snapshot is truncated or corrupt'),
+        (struct.pack('<4sBBHIIII', b'CYCL', SNAPSHOT_VERSION, 1, 0, 0, 0, 0, 0) + b'junk', 'could not be decompressed'),
+        (
+            struct.pack('<4sBBHIIII', b'CYCL', SNAPSHOT_VERSION, 1, 0, 1, 0, 0, 0) + zlib.compress(b''),
+            'Snapshot is truncated or corrupt',
+        ),
+    ],
+)
+def test_load_snapshot_raises_error_if_invalid(tmp_path, content, match):
+    snapshot_path = tmp_path / 'graph.cycl'
+    snapshot_path.write_bytes(content)
+
+    with pytest.raises(InvalidSnapshotError, match=match):
+        load_snapshot(snapshot_path)
+
+
+def corrupt_snapshot(path, compress, table, cell, value):
+    """Overwrite a little-endian u32 cell of a table of a snapshot, ``offsets``, ``exports`` or ``imports``."""
+    content = path.read_bytes()
+    header, payload = content[:24], content[24:]
+    n_strings, n_exports = struct.unpack_from('<II', header, 8)
+    payload = bytearray(zlib.decompress(payload) if compress else payload)
+    start = {'offsets': 0, 'exports': n_strings + 1, 'imports': n_strings + 1 + 8 * n_exports}[table]
+    struct.pack_into('<I', payload, 4 * (start + cell), value)
+    path.write_bytes(header + (zlib.compress(bytes(payload)) if compress else bytes(payload)))
+
+
+@pytest.mark.parametrize('compress', [True, False])
+@pytest.mark.parametrize(
+    'corruption',
+    [
+        ('exports', 0, 9999),  # stack name past the end of the string table
+        ('exports', 0, 0xFFFFFFFF),  # a stack name which is none
+        ('imports', 0, 9999),  # importing an export past the end of the export table
+        ('imports', 2, 9999),  # importing stack id past the end of the string table
+        ('offsets', 0, 1),  # the first string does not start the blob
+        ('offsets', 2, 0),  # a string ending before it starts
+        ('offsets', 1, 9999),  # a string past the end of the blob
+    ],
+)
+def test_load_snapshot_raises_error_if_corrupt(tmp_path, graph_data, compress, corruption):
+    snapshot_path = tmp_path / 'graph.cycl'
+    save_snapshot(graph_data, snapshot_path, compress=compress)
+    corrupt_snapshot(snapshot_path, compress, *corruption)
+
+    with pytest.raises(InvalidSnapshotError, match='Snapshot is truncated or corrupt'):
+        load_snapshot(snapshot_path)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_load_snapshot_raises_error_if_not_utf8(tmp_path, graph_data, compress):
+    snapshot_path = tmp_path / 'graph.cycl'
+    save_snapshot(graph_data, snapshot_path, compress=compress)
+    content = bytearray(zlib.decompress(snapshot_path.read_bytes()[24:]) if compress else snapshot_path.read_bytes()[24:])
+    content[-1] = 0xFF
+    payload = zlib.compress(bytes(content)) if compress else bytes(content)
+    snapshot_path.write_bytes(snapshot_path.read_bytes()[:24] + payload)
+
+    with pytest.raises(InvalidSnapshotError, match='Snapshot is truncated or corrupt') as err:
+        load_snapshot(snapshot_path)
+
+    assert isinstance(err.value.__cause__, UnicodeDecodeError)
@@ -0,0 +1,82 @@
+import networkx as nx
+import pytest
+
+from cycl import Variant, check_variants
+from cycl.models.node_data import NodeData
+
+
+@pytest.fixture
+def graph_data():
+    def export(stack, name, importers):
+        return NodeData(
+            stack_name=stack,
+            export_name=name,
+            importing_stacks=[NodeData(stack_name=importer, tags={'team': importer[0]}) for importer in importers],
+            tags={'team': stack[0]},
+        )
+
+    exports = [
+        export('a1', 'a1-vpc', ['b1', 'b2']),
+        export('a1', 'a1-subnet', ['b1']),
+        export('b1', 'b1-role', ['a1', 'c1']),
+        export('b2', 'b2-bucket', ['c1']),
+        export('c1', 'c1-queue', ['c1']),
+        export('d1', 'd1-topic', []),
+    ]
+    return {export.export_name: export for export in exports}
+
+
+def test_check_variants(graph_data):
+    variants = [
+        Variant('as-is'),
+        Variant('without-b1-role', edges_to_ignore=[['b1', 'a1']]),
+        Variant('without-self-loops', edges_to_ignore=[['b1', 'a1']], remove_selfloops=True),
+        Variant('by-team', node_key_fn=lambda x: x.tags['team']),
+    ]
+
+    actual = check_variants(graph_data, variants)
+
+    assert [result.variant for result in actual] == variants
+    assert [result.cycles for result in actual] == [[['a1', 'b1'], ['c1']], [['c1']], [], [['a', 'b'], ['c']]]
+    assert [result.cyclic for result in actual] == [True, True, False, True]
+    assert actual[2].generations == [['a1', 'd1'], ['b1', 'b2'], ['c1']]
+    assert all(result.generations is None for result in actual if result.cyclic)
+    assert repr(actual[0]) == "VariantResult('as-is', cycles=2, cyclic=True)"
+
+
+@pytest.mark.parametrize(
+    ('variant', 'expected_selfloops'),
+    [
+        (Variant('keep'), None),
+        (Variant('drop', selfloops='drop'), None),
+        (Variant('report', selfloops='report'), {'c1': 1}),
+        (Variant('removed', remove_selfloops=True), None),
+    ],
+)
+def test_check_variants_selfloops(graph_data, variant, expected_selfloops):
+    (actual,) = check_variants(graph_data, [variant])
+
+    assert actual.graph.has_edge('c1', 'c1') == (variant.selfloops == 'keep')
+    assert actual.graph.graph.get('selfloops') == expected_selfloops
+
+
+def test_variant_rejects_unknown_selfloops_policy():
+    with pytest.raises(ValueError, match='selfloops must be one of'):
+        Variant('some-variant', selfloops='some-policy')
+
+
+def test_check_variants_bounded_cycles_are_still_cyclic():
+    graph_data = {
+        f'export-{i}': NodeData(
+            stack_name=f'stack-{i}',
+            export_name=f'export-{i}',
+            importing_stacks=[NodeData(stack_name=f'stack-{(i + 1) % 3}')],
+        )
+        for i in range(3)
+    }
+
+    (actual,) = check_variants(graph_data, [Variant('some-variant')], max_cycle_length=2)
+
+    assert actual.cycles == []
+    assert actual.cyclic
+    assert not nx.is_directed_acyclic_graph(actual.graph)
@@ -0,0 +1,119 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import networkx as nx
+import pytest
+
+import cycl.utils.watch as watch_module
+from cycl.utils.cycles import find_cycles
+from cycl.utils.watch import IncrementalCycleChecker, iter_template_changes
+
+
+@pytest.fixture
+def cdk_out(tmp_path):
+    cdk_out_path = tmp_path / 'cdk.out'
+    cdk_out_path.mkdir()
+    Path(cdk_out_path / 'cdk.out').touch()
+    (cdk_out_path / 'stack-1.template.json').write_text(json.dumps({'Resources': {}}))
+    return cdk_out_path
+
+
+@pytest.fixture(params=['inotify', 'poll'])
+def waiter(request):
+    if request.param == 'inotify' and not sys.platform.startswith('linux'):
+        pytest.skip('inotify is only available on linux')
+    if request.param == 'poll':
+        with patch.object(watch_module, '_Inotify', side_effect=OSError('some-error')):
+            yield request.param
+    else:
+        yield request.param
+
+
+def test_iter_template_changes(cdk_out, waiter):  # noqa: ARG001
+    changes = iter_template_changes(cdk_out, interval=0.05, settle=0.05)
+
+    def synth():
+        time.sleep(0.2)
+        (cdk_out / 'stack-1.template.json').write_text(json.dumps({'Resources': {'a': {}}}))
+        (cdk_out / 'assembly-stage').mkdir()
+        (cdk_out / 'assembly-stage' / 'stack-2.template.json').write_text('{}')
+        (cdk_out / 'manifest.json').write_text('{}')
+
+    thread = threading.Thread(target=synth)
+    thread.start()
+    actual = next(changes)
+    # a poll may land mid synth, in which case the rest of it is reported as the next change
+    if len(actual) == 1:
+        actual = sorted(actual + next(changes))
+    thread.join()
+    changes.close()
+
+    assert actual == [
+        cdk_out.resolve() / 'assembly-stage' / 'stack-2.template.json',
+        cdk_out.resolve() / 'stack-1.template.json',
+    ]
+
+
+def test_iter_template_changes_reports_removed_templates(cdk_out):
+    changes = iter_template_changes(cdk_out, interval=0.05, settle=0.05)
+
+    def clean():
+        time.sleep(0.2)
+        for path in sorted(cdk_out.rglob('*'), reverse=True):
+            path.unlink()
+        cdk_out.rmdir()
+
+    thread = threading.Thread(target=clean)
+    thread.start()
+    actual = next(changes)
+    thread.join()
+    changes.close()
+
+    assert actual == [cdk_out.resolve() / 'stack-1.template.json']
+
+
+def test_iter_template_changes_falls_back_to_polling(caplog, cdk_out):
+    with (
+        patch.object(watch_module, '_Inotify', side_effect=OSError('some-error')),
+        patch.object(watch_module.time, 'sleep') as mock_sleep,
+        caplog.at_level('INFO'),
+    ):
+        changes = iter_template_changes(cdk_out, interval=0.05)
+        mock_sleep.side_effect = lambda _: (cdk_out / 'stack-1.template.json').write_text('{"Resources": {"a": {}}}')
+        actual = next(changes)
+        changes.close()
+
+    mock_sleep.assert_called_once_with(0.05)
+    assert 'inotify is unavailable, polling for changes instead: some-error' in caplog.text
+    assert actual == [cdk_out.resolve() / 'stack-1.template.json']
+
+
+def test_incremental_cycle_checker_only_searches_affected_components():
+    graph = nx.MultiDiGraph([('a', 'b'), ('b', 'a'), ('c', 'd'), ('d', 'c'), ('e', 'e'), ('f', 'a')])
+    checker = IncrementalCycleChecker()
+
+    first, first_searched = checker.check(graph)
+    graph.add_edge('c', 'd')
+    graph.remove_edge('f', 'a')
+    graph.add_edges_from([('d', 'g'), ('g', 'c')])
+    second, second_searched = checker.check(graph)
+    third, third_searched = checker.check(graph)
+
+    assert first == find_cycles(graph.subgraph(['a', 'b', 'c', 'd', 'e']))
+    assert first_searched == 3
+    assert second == find_cycles(graph)
+    assert second_searched == 2  # a-b lost an edge from f, c-d gained edges and an import
+    assert third == second
+    assert third_searched == 0
+
+
+def test_incremental_cycle_checker_bounds_cycle_length():
+    graph = nx.DiGraph([('a', 'b'), ('b', 'c'), ('c', 'a'), ('b', 'a')])
+
+    actual, _ = IncrementalCycleChecker(max_length=2).check(graph)
+
+    assert actual == [['a', 'b']]